@@ -0,0 +1,137 @@
+import re
+import sys
+import time
+import asyncio
+import argparse
+
+from pyton import GameSettings, ComputerPlayer, Match
+
+class TerminalStream():
+    '''File-like adapter letting a Match's ScreenRenderer write to an asyncio StreamWriter.
+       'writer' (asyncio.StreamWriter) : connection to the player's terminal, None discards output'''
+
+    def __init__(self, writer=None):
+        self.writer = writer
+
+    def write(self, text):
+        if self.writer is not None:
+            self.writer.write(text.replace('\n', '\r\n').encode())
+
+    def flush(self):
+        pass                            # Written bytes are drained by AsyncMatch between steps
+
+    async def drain(self):
+        if self.writer is not None:
+            await self.writer.drain()
+
+class AsyncMatch():
+    '''Drives a Match on an asyncio event loop.
+       'match' (Match) : match to play
+       'reader' (asyncio.StreamReader) : human input, one line per prompt, None for computer-only matches
+       'writer' (asyncio.StreamWriter) : frames and prompts
+       'idleTimeout' (float) : seconds to wait for a line before quitting, None waits forever
+
+    Runs the same steps as Match.run, but animation pauses are awaited and input is
+    read from 'reader', so one process can host many matches at once.'''
+
+    telnetPattern = re.compile(b'\xff[\xfb-\xfe].|\xff[\xf0-\xfa]', re.DOTALL)      # Telnet option negotiation
+
+    def __init__(self, match, reader=None, writer=None, idleTimeout=None):
+        self.match = match
+        self.reader = reader
+        self.idleTimeout = idleTimeout
+        self.stream = TerminalStream(writer)
+        for view in match.views:
+            view.setStream(self.stream)
+
+    async def readLine(self, prompt):
+        '''Returns one line of input. Without a reader, or once it closes, Enter breaks
+        pass straight through and any other prompt raises EOFError.'''
+        self.stream.write(prompt)
+        await self.stream.drain()
+        line = b''
+        if self.reader is not None and not self.reader.at_eof():
+            try:
+                line = await asyncio.wait_for(self.reader.readline(), self.idleTimeout)
+            except asyncio.TimeoutError:
+                raise EOFError('Player idle for {}s'.format(self.idleTimeout))
+        if not line:
+            if prompt == '':
+                return ''
+            raise EOFError('No input for this match')
+        return self.telnetPattern.sub(b'', line).decode(errors='replace').strip('\r\n\x00')
+
+    async def drive(self, steps):
+        '''Async counterpart of Match.drive.'''
+        reply = None
+        while True:
+            try:
+                request = steps.send(reply)
+            except StopIteration as stop:
+                return stop.value
+            reply = None
+            if request[0] == 'sleep':
+                await self.stream.drain()
+                await asyncio.sleep(request[1])
+            else:
+                reply = await self.readLine(request[1])
+
+    def abort(self):
+        '''Ends the match without a winner, as if the current player quit.'''
+        match = self.match
+        if match.turn:
+            match.log.append(match.turn[-1], 'q')
+        match.matchAbort = True
+        match.matchComplete = True
+        match.winnerID = 'play1'
+
+    async def run(self, gs):
+        '''Plays the match to completion, returns the same dict as Match.run.
+        A closed input stream quits the match.'''
+        match = self.match
+        try:
+            await self.drive(match.beginSteps())
+            while not match.matchComplete:
+                await self.drive(match.turnSteps())
+                await asyncio.sleep(0)              # Let other matches run between turns
+        except EOFError:
+            self.abort()
+        await self.drive(match.endSteps(gs))
+        await self.stream.drain()
+        return match.getResult()
+
+def newComputerGame(numPlayers=4, speed='fast', simulation=False):
+    gs = GameSettings()
+    gs.computerSimulation = simulation
+    gs.computerSpeed = speed
+    for i in range(numPlayers):
+        i #unused
+        gs.addPlayer(ComputerPlayer(gs.getComputerName()))
+    gs.finalizePlayers()
+    return gs
+
+async def playComputerGame(seed, numPlayers=4, speed='fast'):
+    '''Plays one rendered ComputerPlayer match with its frames discarded.'''
+    gs = newComputerGame(numPlayers, speed)
+    return await AsyncMatch(Match(gs, seed)).run(gs)
+
+async def playMany(numMatches, numPlayers=4, speed='fast', seed=0):
+    '''Plays 'numMatches' rendered matches concurrently on one event loop.'''
+    return await asyncio.gather(*[playComputerGame(seed+i, numPlayers, speed) for i in range(numMatches)])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Host many animated ComputerPlayer matches on one event loop.')
+    parser.add_argument('-n', '--matches', type=int, default=200)
+    parser.add_argument('-p', '--players', type=int, default=4, choices=range(2, GameSettings.maxPlayers+1), metavar='{2-16}')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('--speed', default='fast', choices=('slow','normal','fast'))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = asyncio.run(playMany(args.matches, args.players, args.speed, args.seed))
+    elapsed = time.perf_counter() - start
+    turns = sum(result['turns'] for result in results)
+    sys.stdout.write('{} concurrent matches, {} turns in {:.1f}s\n'.format(len(results), turns, elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from pyton import GameSettings, Card, Deck
+
+### Face Tables ###
+# Face index is color*13+value (Card.colorIndex / Card.valueIndex), with +4 at 52 and W at 53.
+# Hands are stored as (games, seats, 5, 13) so a color row or a value column is one gather.
+
+faceCards = [Card.intern(color, value) for color in ('red','yellow','green','blue') for value in Deck.values]
+faceCards += [Card.intern('wild','+4'), Card.intern('wild','W')]
+drawFourFace = 52
+wildFace = 53
+numFaces = 65
+faceColor = np.full(numFaces, 4, dtype=np.int8)
+faceValue = np.full(numFaces, -1, dtype=np.int8)
+facePoints = np.zeros(numFaces, dtype=np.int32)
+for index, card in enumerate(faceCards):
+    faceColor[index] = card.code >> 4
+    faceValue[index] = card.code & Card.valueMask
+    facePoints[index] = card.getPoints()
+faceIndex = {card.code : index for index, card in enumerate(faceCards)}
+
+def buildDeckTemplate():
+    deck = Deck(False)
+    deck.populate(False)
+    return np.array([faceIndex[card.code] for card in deck], dtype=np.int8)
+
+deckTemplate = buildDeckTemplate()
+deckSize = len(deckTemplate)
+colorValues = np.arange(13)
+wildColorOrder = np.array([0,3,2,1,4])     # ComputerPlayer.colorsInHand order: red, blue, green, yellow, wild
+
+class BatchMatch():
+    ''''numGames' (int) : games simulated side by side
+       'numPlayers' (int) : seats per game (2-16)
+       'policy' (string) : 'first' plays the first legal card, 'computer' follows ComputerPlayer.think
+       'seed' (int) : seed for the numpy Generator
+       'maxTurns' (int) : games still running after this many turns are aborted
+       'decks' (int) : decks shuffled together, one per GameSettings.playersPerDeck seats by default
+
+    Follows the Match rules: 7 card deal, match on color or value, X/R/+2/+4/W effects,
+    draw until playable, the discard pile shuffled back in when the deck runs out, pass when
+    there is nothing left to draw and a random color after passMax passes.'''
+
+    policies = ('first', 'computer')
+    lookahead = 8                   # Deck cards checked at once when drawing until playable
+
+    def __init__(self, numGames, numPlayers=4, policy='computer', seed=None, maxTurns=5000, decks=None):
+        if policy not in self.policies:
+            raise ValueError("Unknown policy {}".format(policy))
+        self.numGames = numGames
+        self.numPlayers = numPlayers
+        self.policy = policy
+        self.maxTurns = maxTurns
+        self.decks = decks or max(1, -(-numPlayers // GameSettings.playersPerDeck))
+        self.rng = np.random.default_rng(seed)
+
+        ### Results (indexed by game) ###
+        self.winner = np.full(numGames, -1, dtype=np.int8)
+        self.points = np.zeros(numGames, dtype=np.int32)
+        self.turnCount = np.zeros(numGames, dtype=np.int32)
+
+    def run(self):
+        '''Plays every game to completion.
+        Returns {'winner':seat per game (-1 if aborted), 'points':tally, 'turns':turns played}.'''
+        self.begin()
+        while len(self.ids) > 0:
+            self.nextTurn()
+            self.compact()
+        return {'winner':self.winner, 'points':self.points, 'turns':self.turnCount}
+
+    def begin(self):
+        N, P = self.numGames, self.numPlayers
+        rows = np.arange(N)
+        size = deckSize*self.decks
+        self.ids = rows.copy()                                          # Live row : game index
+        self.deck = self.rng.permuted(np.tile(deckTemplate, (N,self.decks)), axis=1)
+        self.position = np.zeros(N, dtype=np.int16)                     # Next card to draw
+        self.deckEnd = np.full(N, size, dtype=np.int16)                # Cards in the deck row
+        self.discard = np.zeros((N,numFaces), dtype=np.int16)          # Face : copies under the top card
+        self.hands = np.zeros((N,P,numFaces), dtype=np.int8)
+        self.colorCounts = np.zeros((N,P,5), dtype=np.int16)           # Seat : cards per color, wild = 4
+        self.valueCounts = np.zeros((N,P,15), dtype=np.int16)          # Seat : cards per value index
+        self.live = np.ones(N, dtype=bool)                              # Game still running
+        self.sizes = np.zeros((N,P), dtype=np.int16)
+        self.drew = np.zeros((N,P), dtype=bool)
+        self.turns = np.zeros(N, dtype=np.int32)
+        self.passes = np.zeros(N, dtype=np.int8)
+        self.skip = np.zeros(N, dtype=bool)
+        self.drawAmount = np.zeros(N, dtype=np.int8)
+        self.direction = np.ones(N, dtype=np.int8)
+
+        ### Deal ###
+        # Seat s gets deck cards 7s to 7s+6, as Match deals seat by seat
+        games = np.repeat(rows, 7*P)
+        seats = np.tile(np.repeat(np.arange(P), 7), N)
+        self.addCards(games, seats, self.deck[:, :7*P].ravel())
+        self.sizes[:] = 7
+        self.position[:] = 7*P
+
+        ### First Card ###
+        self.turn = self.rng.integers(0, P, N).astype(np.int8)
+        face = self.deck[rows, self.position]
+        self.position += 1
+        self.top = face.astype(np.int8)
+        self.color = faceColor[face].copy()
+        self.value = faceValue[face].copy()
+        self.applyEffects(rows, face)
+
+    def compact(self):
+        '''Retires games past maxTurns and drops finished games from the arrays
+        once enough of them have piled up to be worth the copy.'''
+        aborted = self.live & (self.turns >= self.maxTurns)
+        if aborted.any():
+            self.turnCount[self.ids[aborted]] = self.turns[aborted]
+            self.live &= ~aborted
+        if self.live.sum() > len(self.ids) * 0.8:
+            return
+        keep = self.live
+        for name in ('ids','live','deck','position','deckEnd','discard','top','hands','colorCounts','valueCounts','sizes','drew','turns','passes','skip','drawAmount','direction','turn','color','value'):
+            setattr(self, name, getattr(self, name)[keep])
+
+    def addCards(self, games, seats, faces):
+        '''Adds one card per entry to the hand and count arrays, repeated (game, seat, face) entries included.'''
+        hands = (games*self.numPlayers + seats).astype(np.intp)     # add.at takes its fast path on 1-D arrays with a matching dtype
+        np.add.at(self.hands.reshape(-1), hands*numFaces + faces, np.int8(1))
+        np.add.at(self.colorCounts.reshape(-1), hands*5 + faceColor[faces], np.int16(1))
+        np.add.at(self.valueCounts.reshape(-1), hands*15 + faceValue[faces], np.int16(1))
+
+    def peek(self, rows, size):
+        '''Returns the next 'size' faces of each deck in 'rows' and which of them are still in the deck.'''
+        index = self.position[rows][:,None] + np.arange(size)
+        inDeck = index < self.deckEnd[rows][:,None]
+        return self.deck[rows[:,None], np.minimum(index, self.deck.shape[1]-1)], inDeck
+
+    def dealCards(self, rows, take, forced=False):
+        '''Deals take[i] cards, at most those left in its deck, to the player on turn in game rows[i].'''
+        faces, inDeck = self.peek(rows, int(take.max()))
+        faces = faces[inDeck & (np.arange(faces.shape[1]) < take[:,None])]
+        games = np.repeat(rows, take)
+        self.addCards(games, self.turn[games], faces)
+        seats = self.turn[rows]
+        self.sizes[rows, seats] += take
+        self.position[rows] += take
+        if not forced:
+            self.drew[rows, seats] = True
+        self.refill(rows)
+
+    def refill(self, rows):
+        '''Deck.refill for the games in 'rows' whose deck ran out: the discard pile is shuffled
+        into a new deck row. Wild faces carry no color here, so nothing needs resetting.'''
+        empty = rows[self.position[rows] >= self.deckEnd[rows]]
+        if len(empty) == 0:
+            return
+        for row in empty[self.discard[empty].any(axis=1)]:
+            faces = self.rng.permutation(np.repeat(np.arange(numFaces, dtype=np.int8), self.discard[row]))
+            self.deck[row, :len(faces)] = faces
+            self.position[row] = 0
+            self.deckEnd[row] = len(faces)
+            self.discard[row] = 0
+
+    def getLegal(self, rows):
+        '''Returns (current color copies by value, current value copies by color, color counts)
+        for the players on turn. Copies of the current value in the current color are left out of
+        the second array, so it only holds value change cards.'''
+        seats = self.turn[rows]
+        color = self.color[rows]
+        value = self.value[rows]
+        hands = self.hands.reshape(len(self.ids), self.numPlayers, 5, 13)
+        own = hands[rows, seats, color]
+        sameValue = hands[rows, seats, :4, np.minimum(value, 12)]
+        sameValue[np.arange(len(rows)), color] = 0
+        sameValue[value >= Card.drawFourValue] = 0
+        return own, sameValue, self.colorCounts[rows, seats]
+
+    def canPlay(self, rows):
+        '''Returns whether each player on turn holds a legal card, from the count arrays alone.'''
+        seats = self.turn[rows]
+        color = self.color[rows]
+        value = self.value[rows]
+        colored = value < Card.drawFourValue
+        sameFace = self.hands[rows, seats, color*13 + np.where(colored, value, 0)]
+        valueChange = colored & (self.valueCounts[rows, seats, value] > sameFace)
+        return (self.colorCounts[rows, seats, color] > 0) | valueChange | (self.colorCounts[rows, seats, 4] > 0)
+
+    def choose(self, rows):
+        '''Returns the face each player on turn plays, -1 to draw.'''
+        own, sameValue, colorCounts = self.getLegal(rows)
+        n = len(rows)
+        local = np.arange(n)
+        seats = self.turn[rows]
+        color = self.color[rows].astype(np.int16)
+        value = self.value[rows].astype(np.int16)
+        sameColorCount = own.sum(axis=1, dtype=np.int16)
+        valueChangeCount = sameValue.sum(axis=1, dtype=np.int16)
+        hasLegal = (sameColorCount + valueChangeCount) > 0
+        hasValueChange = valueChangeCount > 0
+        noLegal = np.where(self.hands[rows, seats, drawFourFace] > 0, drawFourFace,
+                           np.where(self.hands[rows, seats, wildFace] > 0, wildFace, -1))
+        ownFirst = np.where(sameColorCount > 0, color*13 + (own > 0).argmax(axis=1), numFaces)
+        valueChangeFirst = np.where(hasValueChange, (sameValue > 0).argmax(axis=1)*13 + value, numFaces)
+
+        if self.policy == 'first':
+            return np.where(hasLegal, np.minimum(ownFirst, valueChangeFirst), noLegal)
+
+        card = np.full(n, -1, dtype=np.int16)
+
+        ### Two Players, Always Play a Skip or Reverse ###
+        if self.numPlayers == 2:
+            for cardValue in (Card.reverseValue, Card.skipValue):
+                card = np.where((card < 0) & (own[:, cardValue] > 0), color*13 + cardValue, card)
+            for cardValue in (Card.reverseValue, Card.skipValue):
+                card = np.where((card < 0) & (value == cardValue) & hasValueChange, valueChangeFirst, card)
+
+        ### Reverse When The Previous Player Drew ###
+        else:
+            previous = (seats - self.direction[rows]) % self.numPlayers
+            card = np.where(self.drew[rows, previous] & (own[:, Card.reverseValue] > 0), color*13 + Card.reverseValue, card)
+
+        ### Value Change to a Stronger Color ###
+        if hasValueChange.any():
+            strength = np.where(sameValue > 0, colorCounts[:, :4], -1)
+            best = strength.argmax(axis=1)
+            better = (strength[local, best] > colorCounts[local, color]) | (sameColorCount == 0)
+            card = np.where(hasValueChange & better, best*13 + value, card)
+
+        ### Random Card of The Current Color ###
+        pick = hasLegal & (card < 0)
+        if pick.any():
+            weights = own[pick].cumsum(axis=1, dtype=np.int16)
+            target = self.rng.random(len(weights)) * weights[:, -1]
+            card[pick] = color[pick]*13 + (weights > target[:,None]).argmax(axis=1)
+
+        return np.where(hasLegal, card, noLegal)
+
+    def chooseColor(self, rows):
+        '''ComputerPlayer.getWildColor: most held color, random if wilds dominate.'''
+        colorCounts = self.colorCounts[rows, self.turn[rows]][:, wildColorOrder]
+        best = wildColorOrder[colorCounts.argmax(axis=1)]
+        randomColor = self.rng.integers(0, 4, len(rows))
+        return np.where(best == 4, randomColor, best).astype(np.int8)
+
+    def applyEffects(self, rows, face):
+        value = faceValue[face]
+        self.skip[rows] |= value == Card.skipValue
+        if self.numPlayers == 2:
+            self.skip[rows] |= value == Card.reverseValue
+        else:
+            self.direction[rows] = np.where(value == Card.reverseValue, -self.direction[rows], self.direction[rows])
+        self.drawAmount[rows] = np.where(value == Card.drawTwoValue, 2, np.where(value == Card.drawFourValue, 4, self.drawAmount[rows]))
+        wild = value >= Card.drawFourValue
+        if wild.any():
+            self.color[rows[wild]] = self.chooseColor(rows[wild])
+
+    def nextTurn(self):
+        N, P = len(self.ids), self.numPlayers
+        rows = np.arange(N)
+        seats = self.turn
+        self.turns += self.live
+        self.drew[rows, seats] = False
+        self.refill(rows[self.live])
+
+        ### Skip / Forced Draws ###
+        active = self.live & ~self.skip
+        self.skip[:] = False
+        forced = np.where(active, self.drawAmount, 0)
+        self.drawAmount[active] = 0
+        drawing = rows[forced > 0]
+        while len(drawing) > 0:
+            take = np.minimum(forced[drawing], self.deckEnd[drawing] - self.position[drawing])
+            drawing, take = drawing[take > 0], take[take > 0]
+            if len(drawing) == 0:
+                break
+            self.dealCards(drawing, take, True)
+            forced[drawing] -= take
+            drawing = drawing[forced[drawing] > 0]         # Decks that ran out were refilled, keep drawing
+
+        ### Draw Until Playable ###
+        # The hand held nothing playable, so drawing stops at the first deck card playable on the
+        # current one. Each pass deals every drawing game up to that card, or 'lookahead' cards.
+        playable = np.zeros(N, dtype=bool)
+        playable[active] = self.canPlay(rows[active])
+        drawing = rows[active & ~playable & (self.position < self.deckEnd)]
+        while len(drawing) > 0:
+            faces, inDeck = self.peek(drawing, self.lookahead)
+            color = self.color[drawing][:,None]
+            value = self.value[drawing][:,None]
+            hit = inDeck & ((faceColor[faces] == color) | (faceColor[faces] == 4)
+                            | ((faceValue[faces] == value) & (value < Card.drawFourValue)))
+            found = hit.any(axis=1)
+            self.dealCards(drawing, np.where(found, hit.argmax(axis=1)+1, inDeck.sum(axis=1)))
+            playable[drawing[found]] = True
+            drawing = drawing[~found]
+            drawing = drawing[self.position[drawing] < self.deckEnd[drawing]]
+
+        ### Pass ###
+        passing = active & ~playable
+        self.passes[passing] += 1
+        recolor = rows[passing & (self.passes >= P)]
+        self.color[recolor] = self.rng.integers(0, 4, len(recolor))
+        self.passes[recolor] = 0
+
+        ### Play ###
+        playing = rows[playable]
+        if len(playing) > 0:
+            face = self.choose(playing)
+            playSeats = seats[playing]
+            self.hands[playing, playSeats, face] -= 1
+            self.colorCounts[playing, playSeats, faceColor[face]] -= 1
+            self.valueCounts[playing, playSeats, faceValue[face]] -= 1
+            self.sizes[playing, playSeats] -= 1
+            self.passes[playing] = 0
+            self.discard[playing, self.top[playing]] += 1
+            self.top[playing] = face
+            self.color[playing] = np.where(faceColor[face] < 4, faceColor[face], self.color[playing])
+            self.value[playing] = faceValue[face]
+
+            won = self.sizes[playing, playSeats] == 0
+            if won.any():
+                winners = playing[won]
+                self.winner[self.ids[winners]] = seats[winners]
+                self.turnCount[self.ids[winners]] = self.turns[winners]
+                self.live[winners] = False
+                self.points[self.ids[winners]] = (self.hands[winners].astype(np.int32) * facePoints).sum(axis=(1,2))
+            self.applyEffects(playing[~won], face[~won])
+
+        self.turn = ((self.turn + self.direction) % P).astype(np.int8)
+
+def simulate(numGames, numPlayers=4, policy='computer', seed=None, batchSize=100000, decks=None):
+    '''Plays numGames in batches and returns aggregate statistics.'''
+    seeds = np.random.SeedSequence(seed).spawn(max(1, -(-numGames // batchSize)))
+    wins = np.zeros(numPlayers, dtype=np.int64)
+    aborted = 0
+    points = 0
+    turns = 0
+    remaining = numGames
+    for batchSeed in seeds:
+        size = min(batchSize, remaining)
+        remaining -= size
+        result = BatchMatch(size, numPlayers, policy, batchSeed, decks=decks).run()
+        finished = result['winner'] >= 0
+        wins += np.bincount(result['winner'][finished], minlength=numPlayers)
+        aborted += int((~finished).sum())
+        points += int(result['points'].sum())
+        turns += int(result['turns'].sum())
+    return {'games':numGames, 'wins':wins.tolist(), 'aborted':aborted,
+            'meanPoints':points/max(1, numGames-aborted), 'meanTurns':turns/max(1, numGames)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Vectorized batch simulation of computer matches.')
+    parser.add_argument('-n', '--games', type=int, default=1000000)
+    parser.add_argument('-p', '--players', type=int, default=4, choices=range(2, GameSettings.maxPlayers+1), metavar='{2-16}')
+    parser.add_argument('-d', '--decks', type=int, default=None, help='decks per game, one per 8 seats by default')
+    parser.add_argument('--policy', default='computer', choices=BatchMatch.policies)
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    parser.add_argument('-b', '--batch', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    stats = simulate(args.games, args.players, args.policy, args.seed, args.batch, args.decks)
+    elapsed = time.perf_counter() - start
+    sys.stdout.write('{}\n{:.0f} games/s\n'.format(stats, args.games/elapsed))
+
+if __name__ == '__main__':
+    main()
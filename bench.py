@@ -0,0 +1,251 @@
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+from pyton import GameSettings, ComputerPlayer, Card, Deck, Match
+from tournament import playMatch
+
+### Cases ###
+# Each case takes (scale, rng) and returns {name : (seconds, operations)}, timing only the
+# calls it names. Inputs are built from 'rng' before the clock starts, so runs are comparable.
+
+def benchDeck(scale, rng):
+    '''Deck.populate and shuffle, one new 108 card deck per operation.'''
+    ops = 2000*scale
+    start = time.perf_counter()
+    for i in range(ops):
+        i #unused
+        Deck(True, rng)
+    return {'deck.populateShuffle':(time.perf_counter()-start, ops)}
+
+def dealHands(size, count, rng):
+    '''Returns 'count' (player, color, value) positions with 'size' card hands.'''
+    positions = []
+    for i in range(count):
+        i #unused
+        deck = Deck(True, rng)
+        player = ComputerPlayer('Bench')
+        for j in range(size):
+            j #unused
+            player.addCard(deck.draw())
+        top = deck.draw()
+        color = top.getColor() if not top.isWild() else rng.choice(Deck.colors)
+        positions.append((player, color, top.getValue()))
+    return positions
+
+def benchLegalCards(scale, rng):
+    '''Player.getLegalCards over opening, midgame and long hands.'''
+    results = {}
+    for size in (7, 15, 30):
+        positions = dealHands(size, 200, rng)
+        ops = 0
+        start = time.perf_counter()
+        for i in range(20*scale):
+            i #unused
+            for player, color, value in positions:
+                player.getLegalCards(color, value)
+            ops += len(positions)
+        results['player.getLegalCards.{}'.format(size)] = (time.perf_counter()-start, ops)
+    return results
+
+def playPositions(count, rng):
+    '''Returns 'count' live headless matches stopped at a ComputerPlayer's turn.'''
+    positions = []
+    while len(positions) < count:
+        gs = GameSettings()
+        gs.computerSimulation = True
+        for i in range(4):
+            i #unused
+            gs.addPlayer(ComputerPlayer(gs.getComputerName()))
+        gs.finalizePlayers()
+        match = Match(gs, rng.getrandbits(32))
+        match.begin()
+        for i in range(rng.randrange(30)):
+            i #unused
+            match.nextTurn()
+            if match.matchComplete:
+                break
+        if not match.matchComplete and match.event == '' and match.drawAmount == 0:
+            positions.append(match)
+    return positions
+
+def benchThink(scale, rng):
+    '''ComputerPlayer.think on positions from real games. The hand counts think() updates are
+    restored after each call so every repeat sees the same positions, and the shared decision
+    table starts empty so every repeat sees the same misses.'''
+    ComputerPlayer.decisions.clear()
+    positions = [(match, match.players[match.turn]) for match in playPositions(100, rng)]
+    ops = 0
+    elapsed = 0.0
+    for i in range(20*scale):
+        i #unused
+        for match, player in positions:
+            colorsInHand = dict(player.colorsInHand)
+            start = time.perf_counter()
+            player.think(match)
+            elapsed += time.perf_counter() - start
+            player.colorsInHand = colorsInHand
+        ops += len(positions)
+    return {'computer.think':(elapsed, ops)}
+
+def benchRender(scale, rng):
+    '''Hand.show for a full page, face up and hidden, and Card.getBigNum for every face and reverse frame.'''
+    hands = [player.hand for player, color, value in dealHands(10, 50, rng)]
+    results = {}
+    for hide in (False, True):
+        ops = 100*scale*len(hands)
+        start = time.perf_counter()
+        for i in range(100*scale):
+            i #unused
+            for hand in hands:
+                hand.show(0, hide)
+        results['hand.show.{}'.format('hidden' if hide else 'shown')] = (time.perf_counter()-start, ops)
+
+    cards = [Card.intern(color, value) for color in Deck.colors for value in Deck.values]
+    cards += [Card.intern('wild','+4'), Card.intern('wild','W')]
+    ops = 0
+    start = time.perf_counter()
+    for i in range(20*scale):
+        i #unused
+        for card in cards:
+            for reverseSeed in range(10):
+                card.getBigNum(False, reverseSeed)
+        ops += len(cards)*10
+    results['card.getBigNum'] = (time.perf_counter()-start, ops)
+    return results
+
+def benchMatch(scale, rng):
+    '''A headless four player Match split into begin (deal and first card), turns and end (tally).'''
+    gs = GameSettings()
+    gs.computerSimulation = True
+    for i in range(4):
+        i #unused
+        gs.addPlayer(ComputerPlayer(gs.getComputerName()))
+    beginTime = turnTime = endTime = 0.0
+    matches = 50*scale
+    turns = 0
+    for i in range(matches):
+        i #unused
+        gs.finalizePlayers()
+        match = Match(gs, rng.getrandbits(32))
+        start = time.perf_counter()
+        match.begin()
+        beginTime += time.perf_counter() - start
+        start = time.perf_counter()
+        while not match.matchComplete:
+            match.nextTurn()
+        turnTime += time.perf_counter() - start
+        turns += match.turnCount
+        start = time.perf_counter()
+        match.end(gs)
+        endTime += time.perf_counter() - start
+    return {'match.begin':(beginTime, matches), 'match.turn':(turnTime, turns), 'match.end':(endTime, matches)}
+
+def benchSelfPlay(scale, rng):
+    '''Whole ComputerPlayer self-play games, settings and players included, per player count.'''
+    results = {}
+    for numPlayers in (2, 3, 4):
+        seeds = [rng.getrandbits(32) for i in range(50*scale)]
+        start = time.perf_counter()
+        for seed in seeds:
+            playMatch(seed, numPlayers)
+        results['selfplay.{}p'.format(numPlayers)] = (time.perf_counter()-start, len(seeds))
+    return results
+
+cases = (('deck',benchDeck), ('legal',benchLegalCards), ('think',benchThink), ('render',benchRender),
+         ('match',benchMatch), ('selfplay',benchSelfPlay))      # Group : case
+
+### Running / Comparing ###
+
+def runBenchmarks(repeat=5, scale=1, seed=0, select=None):
+    '''Runs the case groups in 'select' (all when None) 'repeat' times, each repeat from the same seed.
+    Returns {name : {'ops', 'best', 'median', 'rate'}} with times in seconds per operation.'''
+    samples = {}
+    operations = {}
+    for group, case in cases:
+        if select and group not in select:
+            continue
+        for i in range(repeat):
+            timings = case(scale, random.Random(seed))
+            for name in timings:
+                seconds, ops = timings[name]
+                samples.setdefault(name, []).append(seconds/ops)
+                operations[name] = ops
+    results = {}
+    for name in samples:
+        times = sorted(samples[name])
+        results[name] = {'ops':operations[name], 'best':times[0], 'median':times[len(times)//2], 'rate':1/times[0]}
+    return results
+
+def buildReport(results, repeat, scale, seed):
+    return {'python':platform.python_version(), 'implementation':platform.python_implementation(),
+            'machine':platform.machine(), 'repeat':repeat, 'scale':scale, 'seed':seed,
+            'created':time.strftime('%Y-%m-%dT%H:%M:%S'), 'results':results}
+
+def compareReports(report, baseline, tolerance=0.10):
+    '''Returns {name : (baseline best, current best, ratio, regressed)} for cases in both reports.
+    A case regresses when its best time exceeds the baseline's by more than 'tolerance'.'''
+    comparison = {}
+    for name in sorted(report['results']):
+        if name in baseline['results']:
+            old = baseline['results'][name]['best']
+            new = report['results'][name]['best']
+            ratio = new/old if old else float('inf')
+            comparison[name] = (old, new, ratio, ratio > 1+tolerance)
+    return comparison
+
+def formatTime(seconds):
+    for unit, factor in (('s',1), ('ms',1e3), ('us',1e6)):
+        if seconds*factor >= 1:
+            return '{:.2f}{}'.format(seconds*factor, unit)
+    return '{:.0f}ns'.format(seconds*1e9)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the hot paths. Save a baseline with --save and check against it with --compare.')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=int, default=1, help='multiplies the operations per repeat')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-k', '--select', action='append', choices=[group for group, case in cases], help='only this case group, may be repeated')
+    parser.add_argument('-o', '--output', help='write the JSON report here')
+    parser.add_argument('--save', help='write the JSON report as the baseline here')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    parser.add_argument('-t', '--tolerance', type=float, default=0.10, help='slowdown allowed before a case counts as regressed')
+    parser.add_argument('--json', action='store_true', help='print the JSON report instead of a table')
+    args = parser.parse_args(argv)
+
+    results = runBenchmarks(args.repeat, args.scale, args.seed, args.select)
+    report = buildReport(results, args.repeat, args.scale, args.seed)
+    for path in (args.output, args.save):
+        if path:
+            with open(path, 'w') as file:
+                json.dump(report, file, indent=1, sort_keys=True)
+
+    comparison = {}
+    if args.compare:
+        with open(args.compare) as file:
+            comparison = compareReports(report, json.load(file), args.tolerance)
+        report['comparison'] = {name:{'baseline':old, 'best':new, 'ratio':ratio, 'regressed':regressed}
+                                for name, (old, new, ratio, regressed) in comparison.items()}
+
+    if args.json:
+        sys.stdout.write(json.dumps(report, indent=1, sort_keys=True)+'\n')
+    else:
+        for name in sorted(results):
+            result = results[name]
+            line = '{:<28}{:>10} best {:>10} median {:>12.0f}/s'.format(name, formatTime(result['best']), formatTime(result['median']), result['rate'])
+            if name in comparison:
+                old, new, ratio, regressed = comparison[name]
+                line += '  {:+6.1%} vs {}{}'.format(ratio-1, formatTime(old), '  REGRESSED' if regressed else '')
+            sys.stdout.write(line+'\n')
+
+    regressions = [name for name in comparison if comparison[name][3]]
+    if regressions:
+        sys.stdout.write('{} regressed: {}\n'.format(len(regressions), ', '.join(regressions)))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import sys
+import json
+import time
+import argparse
+
+from pyton import GameSettings, ComputerPlayer, Match
+
+class MatchProfiler():
+    '''Opt-in wall and CPU timer for the phases of a Match. attach() wraps the phase methods on
+    the match's own objects and detach() removes the wrappers, so unprofiled matches run the
+    plain methods. One profiler can be attached to many matches in turn to aggregate them.
+
+    Phases nest (turn;think;legal), each stack path keeps calls, total and self time.'''
+
+    def __init__(self):
+        self.stats = {}                 # Stack path : [calls, wall, cpu, self wall, self cpu]
+        self.stack = []                 # Open phases : [path, wall start, cpu start, child wall, child cpu]
+        self.matches = 0                # Matches attached
+        self.wrapped = []               # (owner, method name) removed by detach()
+
+    ### -\/-  Timing  -\/- ###
+
+    def enter(self, phase):
+        stack = self.stack
+        path = stack[-1][0]+';'+phase if stack else phase
+        stack.append([path, time.perf_counter(), time.process_time(), 0.0, 0.0])
+
+    def exit(self):
+        wallEnd = time.perf_counter()
+        cpuEnd = time.process_time()
+        path, wallStart, cpuStart, childWall, childCpu = self.stack.pop()
+        wall = wallEnd - wallStart
+        cpu = cpuEnd - cpuStart
+        entry = self.stats.get(path)
+        if entry is None:
+            entry = self.stats[path] = [0, 0.0, 0.0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += wall
+        entry[2] += cpu
+        entry[3] += wall - childWall
+        entry[4] += cpu - childCpu
+        if self.stack:
+            parent = self.stack[-1]
+            parent[3] += wall
+            parent[4] += cpu
+
+    def wrap(self, owner, name, phase):
+        '''Times calls to owner.name as 'phase' until detach().'''
+        method = getattr(owner, name)
+        profiler = self
+        def timed(*args, **kwargs):
+            profiler.enter(phase)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                profiler.exit()
+        setattr(owner, name, timed)
+        self.wrapped.append((owner, name))
+
+    def attach(self, match):
+        '''Times the match's phases:
+           begin, turn, end : Match.begin, nextTurn and end (blocking driver only)
+           deal : Match.dealCard
+           think : ComputerPlayer.think
+           legal : legal move generation (ComputerPlayer.countLegalCards, Player.getLegalCards)
+           render : MatchView.drawScreen, with hand (Hand.show) inside it
+           io : ScreenRenderer.render writing the frame, screen clears included
+           sleep, input : animation pauses and prompts in Match.drive'''
+        self.matches += 1
+        self.wrap(match, 'begin', 'begin')
+        self.wrap(match, 'nextTurn', 'turn')
+        self.wrap(match, 'end', 'end')
+        self.wrap(match, 'dealCard', 'deal')
+        self.wrap(match, 'sleep', 'sleep')
+        self.wrap(match, 'readInput', 'input')
+        for player in match.players.values():
+            self.wrap(player.hand, 'show', 'hand')
+            if player.getType() == 'Computer':
+                self.wrap(player, 'think', 'think')
+                self.wrap(player, 'countLegalCards', 'legal')
+            else:
+                self.wrap(player, 'getLegalCards', 'legal')
+        for view in match.views:
+            self.wrap(view, 'drawScreen', 'render')
+            self.wrap(view.renderer, 'render', 'io')
+
+    def detach(self):
+        '''Removes every wrapper, players and views go back to their plain methods.'''
+        for owner, name in reversed(self.wrapped):
+            vars(owner).pop(name, None)
+        self.wrapped = []
+        self.stack = []
+
+    def merge(self, other):
+        for path in other.stats:
+            entry = self.stats.setdefault(path, [0, 0.0, 0.0, 0.0, 0.0])
+            for i, value in enumerate(other.stats[path]):
+                entry[i] += value
+        self.matches += other.matches
+        return self
+
+    def __getstate__(self):
+        '''Only the totals cross process boundaries, wrappers stay with their matches.'''
+        return {'stats':self.stats, 'matches':self.matches}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.stats = state['stats']
+        self.matches = state['matches']
+
+    ### -\/-  Output  -\/- ###
+
+    def asDict(self):
+        phases = {}
+        for path in sorted(self.stats):
+            calls, wall, cpu, selfWall, selfCpu = self.stats[path]
+            phases[path] = {'calls':calls, 'wall':wall, 'cpu':cpu, 'selfWall':selfWall, 'selfCpu':selfCpu}
+        return {'matches':self.matches, 'phases':phases}
+
+    def dumps(self):
+        return json.dumps(self.asDict(), indent=1)
+
+    def collapsed(self, cpu=False):
+        '''Returns collapsed stack lines ("turn;think;legal 1234") of self time in microseconds,
+        the input format of flamegraph.pl and speedscope.'''
+        index = 4 if cpu else 3
+        lines = []
+        for path in sorted(self.stats):
+            micros = int(round(self.stats[path][index]*1e6))
+            if micros > 0:
+                lines.append('{} {}\n'.format(path, micros))
+        return ''.join(lines)
+
+    def save(self, path, cpu=False):
+        '''Writes JSON for a .json path, collapsed stacks otherwise.'''
+        with open(path, 'w') as file:
+            if path.endswith('.json'):
+                file.write(self.dumps())
+            else:
+                file.write(self.collapsed(cpu))
+
+    def __str__(self):
+        output = '{:<28}{:>10}{:>12}{:>12}{:>12}\n'.format('phase', 'calls', 'wall ms', 'self ms', 'cpu ms')
+        for path in sorted(self.stats):
+            calls, wall, cpu, selfWall, selfCpu = self.stats[path]
+            name = '  '*path.count(';') + path.rsplit(';', 1)[-1]
+            output += '{:<28}{:>10}{:>12.2f}{:>12.2f}{:>12.2f}\n'.format(name, calls, wall*1e3, selfWall*1e3, cpu*1e3)
+        return output
+
+def profileMatch(match, gs, profiler=None):
+    '''Runs 'match' with a profiler attached, returns (result dict, profiler).'''
+    profiler = profiler or MatchProfiler()
+    profiler.attach(match)
+    try:
+        result = match.run(gs)
+    finally:
+        profiler.detach()
+    return result, profiler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile headless ComputerPlayer matches by phase.')
+    parser.add_argument('-n', '--matches', type=int, default=100)
+    parser.add_argument('-p', '--players', type=int, default=4, choices=range(2, GameSettings.maxPlayers+1), metavar='{2-16}')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='.json for the totals, any other name for collapsed stacks')
+    parser.add_argument('--cpu', action='store_true', help='collapsed stacks of CPU instead of wall time')
+    args = parser.parse_args(argv)
+
+    profiler = MatchProfiler()
+    for i in range(args.matches):
+        gs = GameSettings()
+        gs.computerSimulation = True
+        for j in range(args.players):
+            j #unused
+            gs.addPlayer(ComputerPlayer(gs.getComputerName()))
+        gs.finalizePlayers()
+        profileMatch(Match(gs, args.seed+i), gs, profiler)
+    if args.output:
+        profiler.save(args.output, args.cpu)
+    sys.stdout.write(str(profiler))
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,20 @@
 import os
+import re
 import sys
+import json
 import random
 import math
 import time
+import shutil
+from bisect import bisect_left
+from collections import OrderedDict
 
 class BadInputError(Exception):
     pass
 
+class ReplayError(Exception):
+    pass
+
 class Player():
 
     def __init__(self, name):
@@ -23,8 +31,12 @@ class Player():
         self.canDrawTwo = False
         self.canDrawFour = False
         self.canValueChange = False
+        self.canZeroChange = False
+        self.legalCount = 0
+        self.valueChangeCount = 0
+        self.wildCount = 0
+        self.zeroCount = 0
         self.drew = False
-        self.scrollMax = 0
         self.points = 0
         self.forceDraw = 0
 
@@ -41,41 +53,64 @@ class Player():
     def didDraw(self):
         return self.drew
 
+    def countLegalCards(self, color, value, zeroChange=False):
+        '''Sets the can* flags and legal/wild counts from the hand's count vectors in O(1).'''
+        hand = self.hand
+        counts = hand.counts
+        valueCounts = hand.valueCounts
+        colorIndex = Card.colorIndex[color]
+        colorBits = colorIndex << 4
+        valueBits = Card.valueIndex[value]
+
+        sameColor = 0
+        if colorIndex < 4:
+            sameColor = hand.colorCounts[colorIndex]
+        valueChange = 0
+        if valueBits < Card.drawFourValue:
+            valueChange = valueCounts[valueBits] - counts[colorBits|valueBits]
+        zeroCount = 0
+        if zeroChange:
+            zeroCount = valueCounts[0]
+            sameColor -= counts[colorBits]
+            if valueBits == 0:
+                valueChange = 0
+
+        self.legalCount = sameColor + valueChange
+        self.valueChangeCount = valueChange
+        self.zeroCount = zeroCount
+        self.canValueChange = valueChange > 0
+        self.canZeroChange = zeroCount > 0
+        self.canSkip = counts[colorBits|Card.skipValue] > 0 or (valueBits == Card.skipValue and valueCounts[valueBits] > 0)
+        self.canReverse = counts[colorBits|Card.reverseValue] > 0 or (valueBits == Card.reverseValue and valueCounts[valueBits] > 0)
+        self.canDrawTwo = counts[colorBits|Card.drawTwoValue] > 0 or (valueBits == Card.drawTwoValue and valueCounts[valueBits] > 0)
+        self.canDrawFour = self.legalCount == 0 and valueCounts[Card.drawFourValue] > 0
+        self.wildCount = valueCounts[Card.wildValue]
+        if self.canDrawFour:
+            self.wildCount += valueCounts[Card.drawFourValue]
+        return self.legalCount
+
     def getLegalCards(self, color, value, zeroChange=False):
-        self.canSkip = False
-        self.canReverse = False
-        self.canDrawTwo = False
-        self.canDrawFour = False
-        self.canValueChange = False
-        self.canZeroChange = False
+        self.countLegalCards(color, value, zeroChange)
+        hand = self.hand
+        colorIndex = Card.colorIndex[color]
+        valueBits = Card.valueIndex[value]
+
         self.legalCards = []
-        self.wildCards = []
+        if colorIndex < 4:
+            self.legalCards = hand.getColorCards(colorIndex, 0 if zeroChange else -1)
         self.valueChangeCards = []
+        if self.canValueChange:
+            for otherColor in range(4):
+                if otherColor != colorIndex:
+                    self.valueChangeCards += hand.getCopies((otherColor << 4) | valueBits)
+            self.legalCards += self.valueChangeCards
         self.zeroCards = []
-        plusFours = []
-        for card in self.hand:
-            if card.isWild():
-                if card.getValue() == '+4':
-                    plusFours.append(card)
-                else:
-                    self.wildCards.append(card)
-            elif zeroChange and card.isZero():
-                self.canZero = True
-                self.zeroCards.append(card)
-            elif card.getColor() == color or card.getValue() == value:
-                if card.getColor() != color:
-                    self.canValueChange = True
-                    self.valueChangeCards.append(card)
-                if card.getValue() == "+2":
-                    self.canDrawTwo = True
-                elif card.getValue() == 'R':
-                    self.canReverse = True
-                elif card.getValue() == 'X':
-                    self.canSkip = True
-                self.legalCards.append(card)
-        if len(self.legalCards) == 0 and len(plusFours) > 0:
-            self.canDrawFour = True
-            self.wildCards += plusFours
+        if self.canZeroChange:
+            for otherColor in range(4):
+                self.zeroCards += hand.getCopies(otherColor << 4)
+        self.wildCards = hand.getCopies((4 << 4) | Card.wildValue)
+        if self.canDrawFour:
+            self.wildCards += hand.getCopies((4 << 4) | Card.drawFourValue)
 
     def getValidCards(self):
         return self.legalCards
@@ -114,6 +149,10 @@ class Player():
     def getHand(self, scrollNum=0, hide=False):
         return self.hand.show(scrollNum, hide)
 
+    def getMaxScroll(self):
+        '''Returns the index of the hand's last page, -1 when it is empty.'''
+        return self.hand.maxScroll
+
     def getForceDraws(self):
         return self.forceDraw
 
@@ -140,10 +179,27 @@ class Player():
 
 class Hand():
     ''''deck' (Deck) : Card's Color (rgby)
-       'numberOfCards' (int) : Card's Value (0-9, R, X, W, +2, +4)'''
+       'numberOfCards' (int) : Card's Value (0-9, R, X, W, +2, +4)
+
+    Cards stay in the order they arrived. Each card code keeps the arrival numbers of its
+    copies, so finding a card is a bisect over the arrival numbers instead of a scan, and
+    pages drawn by show() are kept until the hand changes.'''
+
+    footers = tuple(''.join('({})--'.format(k) for k in range(num))+'-----'*(10-num) for num in range(11))    # Cards on page : Index footer
 
     def __init__(self, deck=None,numberOfCards=0):
         self.hand = []
+        self.arrivals = []              # Arrival number of each card in 'hand', ascending
+        self.arrived = 0                # Cards ever added, the next arrival number
+        self.slots = {}                 # Card code : Arrival numbers of the copies held, ascending
+        self.faces = {}                 # Card code : Card
+        self.counts = [0]*80            # Card code : Copies held
+        self.colorCounts = [0]*5        # Color index : Cards held
+        self.valueCounts = [0]*15       # Value index : Cards held
+        self.colorMasks = [0]*5         # Color index : Bitmask of value indexes held
+        self.valueColors = [0]*15       # Value index : Bitmask of color indexes held
+        self.maxScroll = -1             # Last page index, -1 when empty
+        self.pages = {}                 # (page, hide) : Text from show()
         if deck != None:
             self.draw(deck,numberOfCards)
 
@@ -161,63 +217,125 @@ class Hand():
 
     def addCard(self, card):
         self.hand.append(card)
+        self.arrivals.append(self.arrived)
+        code = card.code
+        slots = self.slots.get(code)
+        if slots is None:
+            self.slots[code] = [self.arrived]
+        else:
+            slots.append(self.arrived)
+        self.arrived += 1
+        self.faces[code] = card
+        self.counts[code] += 1
+        self.colorCounts[code >> 4] += 1
+        self.valueCounts[code & 0x0F] += 1
+        self.colorMasks[code >> 4] |= 1 << (code & 0x0F)
+        self.valueColors[code & 0x0F] |= 1 << (code >> 4)
+        self.maxScroll = (len(self.hand)+9)//10 - 1
+        if self.pages:
+            self.pages = {}
 
     def removeCard(self, index):
         index = int(index)
         if (0 <= index < len(self)):
-            return self.hand.pop(index)
+            card = self.hand.pop(index)
+            code = card.code
+            self.slots[code].remove(self.arrivals.pop(index))
+            self.counts[code] -= 1
+            self.colorCounts[code >> 4] -= 1
+            self.valueCounts[code & 0x0F] -= 1
+            if self.counts[code] == 0:
+                self.colorMasks[code >> 4] &= ~(1 << (code & 0x0F))
+                self.valueColors[code & 0x0F] &= ~(1 << (code >> 4))
+            self.maxScroll = (len(self.hand)+9)//10 - 1
+            if self.pages:
+                self.pages = {}
+            return card
 
     def discard(self):
         self.hand = []
+        self.arrivals = []
+        self.arrived = 0
+        self.slots = {}
+        self.faces = {}
+        self.counts = [0]*80
+        self.colorCounts = [0]*5
+        self.valueCounts = [0]*15
+        self.colorMasks = [0]*5
+        self.valueColors = [0]*15
+        self.maxScroll = -1
+        self.pages = {}
+
+    def count(self, code):
+        '''Returns copies held of the card with this code.'''
+        return self.counts[code]
+
+    def find(self, code):
+        '''Returns the index of the first held copy of the card with this code.'''
+        if self.counts[code] == 0:
+            raise ValueError("Card Cannot Be Found")
+        return bisect_left(self.arrivals, self.slots[code][0])
+
+    def getFace(self, code):
+        '''Returns a held card with this code.'''
+        return self.faces[code]
+
+    def getCopies(self, code):
+        '''Returns one entry per held copy of the card with this code.'''
+        if self.counts[code] == 0:
+            return []
+        return [self.faces[code]] * self.counts[code]
+
+    def getColorCards(self, colorIndex, skipValue=-1):
+        '''Returns every held card of a color in value order, one entry per copy.'''
+        cards = []
+        mask = self.colorMasks[colorIndex]
+        if skipValue >= 0:
+            mask &= ~(1 << skipValue)
+        base = colorIndex << 4
+        value = 0
+        while mask:
+            if mask & 1:
+                cards += [self.faces[base|value]] * self.counts[base|value]
+            mask >>= 1
+            value += 1
+        return cards
 
     def show(self, scrollNum=0, hide=False):
         if scrollNum == -1:
             scrollNum = 0
-        output = ''
-        num = 0
-        header, footer, upper, lower = '', '', '', ''
-        header +=   ('\033[97m\u2666--\u2666\033[0m ')
-        upper +=    ('\033[97m|<-|\033[0m ')
-        lower +=    ('\033[97m|<-|\033[0m ')
-        footer +=   ('\033[97m\u2666--\u2666\033[0m ')
-        for i in range(10):
-            indexNum = i+(10*scrollNum)
-            if indexNum < len(self):
-                header += (self[indexNum].getRow(0,hide)+' ')
-                upper += (self[indexNum].getRow(1,hide)+' ')
-                lower += (self[indexNum].getRow(2,hide)+' ')
-                footer += (self[indexNum].getRow(3,hide)+' ')
-                num += 1
-        for j in range(10-num):
-            j #unused
-            header += ('     ')
-            footer += ('     ')
-            upper += ('     ')
-            lower += ('     ')
-        header +=   ('\033[97m\u2666--\u2666\033[0m ')
-        upper +=    ('\033[97m|->|\033[0m ')
-        lower +=    ('\033[97m|->|\033[0m ')
-        footer +=   ('\033[97m\u2666--\u2666\033[0m ')
-        output += ('  '+header+'\n  '+upper+'\n  '+lower+'\n  '+footer+'\n\033[97m|-(<)--')
-        for k in range(num):
-            output += '({})'.format(k)
-            output += '--'
-        for l in range(10-num):
-            l #unused
-            output += '-----'
-        output += '(>)--|\033[0m\n'
-        return output
+        key = (scrollNum, hide)
+        text = self.pages.get(key)
+        if text is None:
+            text = self.pages[key] = self.buildPage(scrollNum, hide)
+        return text
+
+    def buildPage(self, scrollNum, hide):
+        page = self.hand[10*scrollNum:10*scrollNum+10]
+        num = len(page)
+        rows = [card.getRows(hide) for card in page]
+        blanks = '     '*(10-num)
+        output = ['  \033[97m\u2666--\u2666\033[0m ', ''.join([row[0]+' ' for row in rows]), blanks, '\033[97m\u2666--\u2666\033[0m \n',
+                  '  \033[97m|<-|\033[0m ', ''.join([row[1]+' ' for row in rows]), blanks, '\033[97m|->|\033[0m \n',
+                  '  \033[97m|<-|\033[0m ', ''.join([row[2]+' ' for row in rows]), blanks, '\033[97m|->|\033[0m \n',
+                  '  \033[97m\u2666--\u2666\033[0m ', ''.join([row[3]+' ' for row in rows]), blanks, '\033[97m\u2666--\u2666\033[0m \n',
+                  '\033[97m|-(<)--', self.footers[num], '(>)--|\033[0m\n']
+        return ''.join(output)
 
     def getCard(self, index):
         return self.hand[index]
 
     def indexCard(self, card):
-        return self.hand.index(card)
+        return self.find(card.code)
 
 class GameSettings():
 
-    playerIdentities = ('play1','play2','play3','play4')
-    computerNames = ('Watson','SkyNet','Hal','Metal Gear')
+    maxPlayers = 16
+    seatCodes = '123456789abcdefg'          # Seat : One character, the last of its identity and its MatchLog seat
+    playerIdentities = tuple('play'+code for code in seatCodes)
+    computerNames = ('Watson','SkyNet','Hal','Metal Gear','Deep Blue','Joshua','Mother','Jarvis',
+                     'Ultron','Bender','Marvin','Gerty','TARS','Eddie','Data','Ava')
+    playersPerDeck = 8                      # Seats one 108 card deck deals to before another is shuffled in
 
     def __init__(self):
         self.playerStaging = []                  #    Where Player Objs Are Stored Before Game Starts
@@ -230,9 +348,13 @@ class GameSettings():
         self.computerSimulation = False
         self.mainMenuError = ''
         self.computerSpeed = 'normal'
+        self.altScreen = False                   #    Draw matches on the terminal's alternate screen
+        self.scoreStore = None                   #    Records finished matches when set (see scores.ScoreStore)
+        self.tableID = None                      #    Table number recorded with each match
+        self.decks = None                        #    Decks shuffled together, None to scale with the table (see getDeckCount)
 
     def canAddPlayer(self):
-        return (self.numPlayers < 4)
+        return (self.numPlayers < self.maxPlayers)
 
     def canRemovePlayer(self):
         return (self.numPlayers > 0)
@@ -265,6 +387,12 @@ class GameSettings():
     def getPlayerNum(self):
         return self.numPlayers
 
+    def getDeckCount(self):
+        '''Returns the decks a match with the finalized players uses, one per 'playersPerDeck' seats.'''
+        if self.decks:
+            return self.decks
+        return max(1, -(-len(self.players) // self.playersPerDeck))
+
     def getComputerName(self):
         complete = False
         index = self.numPlayers
@@ -282,7 +410,7 @@ class GameSettings():
 
     def getRandomIdentity(self):
         '''For Getting a Random Player for First Turn.'''
-        return random.choice(self.players.keys())
+        return random.choice(list(self.players.keys()))
 
     def compileMainMenuElements(self):
         def getBlankSpace(word, total):
@@ -296,26 +424,17 @@ class GameSettings():
                 points = self.playerStaging[playerNum-1].getPoints()
                 return 'Points: {}{}'.format(points, getBlankSpace(str(points), 21))
 
-        self.mainMenuElements= {'play1row1':'No Player                    ','play1row2':'                             ',
-                                'play2row1':'No Player                    ',
-                                'play2row2':'                             ',
-                                'play3row1':'No Player                    ','play3row2':'                             ',
-                                'play4row1':'No Player                    ',
-                                'play4row2':'                             ',
-                                'play1box':'\033[90m','play2box':'\033[90m','play3box':'\033[90m','play4box':'\033[90m',
-                                'beginBox':'\033[90m','addBox':'\033[97m','removeBox':'\033[90m'
-                                }
-        playerBoxKey = 'play{}box'
-        playerRowKey = 'play{}row{}'
-        i = 1
-        for j in self.playerStaging:
-            j
-            colorCode = ['\033[91m','\033[94m','\033[92m','\033[93m']
-            key = playerBoxKey.format(i)
-            self.mainMenuElements[key] = colorCode[i-1]
-            self.mainMenuElements[playerRowKey.format(i,1)] = getPlayerBox(i, 1)
-            self.mainMenuElements[playerRowKey.format(i,2)] = getPlayerBox(i, 2)
-            i+=1
+        self.mainMenuElements = {'beginBox':'\033[90m','addBox':'\033[97m','removeBox':'\033[90m'}
+        for identity in self.playerIdentities:
+            self.mainMenuElements[identity+'row1'] = 'No Player                    '
+            self.mainMenuElements[identity+'row2'] = '                             '
+            self.mainMenuElements[identity+'box'] = '\033[90m'
+        colorCode = ['\033[91m','\033[94m','\033[92m','\033[93m']
+        for i in range(1, len(self.playerStaging)+1):
+            identity = self.playerIdentities[i-1]
+            self.mainMenuElements[identity+'box'] = colorCode[(i-1) % 4]
+            self.mainMenuElements[identity+'row1'] = getPlayerBox(i, 1)
+            self.mainMenuElements[identity+'row2'] = getPlayerBox(i, 2)
         if self.canBegin():
             self.mainMenuElements['beginBox'] = '\033[95m'
         if not self.canAddPlayer():
@@ -335,179 +454,513 @@ class GameSettings():
         return self.mainMenuElements
 
 class Deck():
-    ''''shuffle' (bool) : shuffle deck.'''
+    ''''populate' (bool) : fill with 108 shuffled cards per deck.
+       'rng' (random.Random) : source for shuffles, defaults to the random module.
+       'capacity' (int) : cards the buffer holds before it has to grow.
+       'decks' (int) : full decks populate() shuffles together, for large tables.
+
+    A ring buffer over a preallocated list: deck[0] is the bottom for draw() and place(),
+    insert() puts a card at deck[0], all in O(1).'''
 
     colors =     ('red','yellow','green','blue')
     values =     ('0','1','2','3','4','5','6','7','8','9','X','R','+2')
 
-    def __init__(self, populate):
+    def __init__(self, populate, rng=None, capacity=108, decks=1):
         '''Initializes proper deck of 108 Uno Cards.'''
-        self.deck = []
+        self.cards = [None]*capacity    # Ring buffer, deck[i] is cards[(start+i) % capacity]
+        self.start = 0
+        self.size = 0
+        self.rng = rng or random
+        self.decks = decks
         if populate:
             self.populate(True)
 
     def __getitem__(self, index):
-        return self.deck[index]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('Deck index out of range')
+        return self.cards[(self.start+index) % len(self.cards)]
+
+    def __setitem__(self, index, card):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('Deck index out of range')
+        self.cards[(self.start+index) % len(self.cards)] = card
 
     def populate(self, shuffle=True):
+        cards = []
         for color in self.colors:
             for value in self.values:
-                self.deck.append(Card(color, value))
+                card = Card.intern(color, value)
+                cards.append(card)
                 if value != '0':
-                    self.deck.append(Card(color, value))
+                    cards.append(card)
+        plusFour = Card.intern('wild', '+4')
+        wild = Card.intern('wild', 'W')
         for i in range(4):
             i #unused
-            self.deck.append(Card('wild', '+4'))
-            self.deck.append(Card('wild', 'W'))
+            cards.append(plusFour)
+            cards.append(wild)
+        cards *= self.decks
+        if self.size == 0 and len(cards) <= len(self.cards):
+            self.start = 0
+            self.size = len(cards)
+            self.cards[:len(cards)] = cards
+        else:
+            for card in cards:
+                self.place(card)
         if shuffle:
             self.shuffle()
 
     def __iter__(self):
-        return iter(self.deck)
+        cards = self.cards
+        capacity = len(cards)
+        for index in range(self.start, self.start+self.size):
+            yield cards[index % capacity]
 
     def __len__(self):
-        return len(self.deck)
+        return self.size
+
+    def grow(self):
+        '''Doubles the buffer, only needed when more cards are added than the capacity given.'''
+        self.cards = list(self) + [None]*max(len(self.cards), 1)
+        self.start = 0
 
     def draw(self):
-        return self.deck.pop()
+        if self.size == 0:
+            raise IndexError('draw from an empty Deck')
+        self.size -= 1
+        return self.cards[(self.start+self.size) % len(self.cards)]      # Cards are shared flyweights, the slot is left as is
 
     def place(self, card):
-        return self.deck.append(card)
+        if self.size == len(self.cards):
+            self.grow()
+        self.cards[(self.start+self.size) % len(self.cards)] = card
+        self.size += 1
 
     def insert(self, card):
-        self.deck.insert(0, card)
+        if self.size == len(self.cards):
+            self.grow()
+        self.start = (self.start-1) % len(self.cards)
+        self.cards[self.start] = card
+        self.size += 1
+
+    def truncate(self, size):
+        '''Drops every card from deck[size] on.'''
+        cards = self.cards
+        capacity = len(cards)
+        for index in range(self.start+size, self.start+self.size):
+            cards[index % capacity] = None
+        self.size = min(self.size, size)
 
     def shuffle(self):
-        random.shuffle(self.deck)
+        cards = self.cards
+        if self.start == 0 and self.size == len(cards):
+            self.rng.shuffle(cards)
+            return
+        ### Same swaps as random.shuffle over the ring, so GameState can mirror it on a list ###
+        randrange = self.rng.randrange
+        start = self.start
+        capacity = len(cards)
+        for i in range(self.size-1, 0, -1):
+            j = randrange(i+1)
+            a = (start+i) % capacity
+            b = (start+j) % capacity
+            cards[a], cards[b] = cards[b], cards[a]
+
+    def refill(self, pile):
+        '''Moves every card under the top of 'pile' (pile[0]) here, bottom card first and wilds
+        back to their uncolored face, then shuffles. Neither buffer is reallocated.'''
+        for index in range(len(pile)-1, 0, -1):
+            card = pile[index]
+            if card.isWild():
+                card = Card.intern('wild', card.value)
+            self.place(card)
+        pile.truncate(1)
+        self.shuffle()
+
+class DecisionTable():
+    '''Bounded memo of decisions, the least recently used entry is evicted when full.
+       'capacity' (int) : entries kept'''
+
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        '''Returns the decision stored for 'key', None if there is none.'''
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+class CardTracker():
+    '''What every seat of a Match has seen: copies of each card code not yet face up on the
+    pile, and the colors each seat has shown it lacks by drawing or passing on them.
+    Every play and draw is O(1), nothing rescans the pile.
+       'seats' (list) : seat identities, as Match.turnList
+       'decks' (int) : decks shuffled together'''
+
+    composition = None              # Card code : Copies in one deck, built on first use
+
+    def __init__(self, seats, decks=1):
+        if CardTracker.composition is None:
+            CardTracker.composition = self.buildComposition()
+        self.unseen = [copies*decks for copies in self.composition]     # Card code : Copies not face up, wilds uncolored
+        self.colorUnseen = [0]*5                # Color index : Cards not face up
+        for code, copies in enumerate(self.unseen):
+            self.colorUnseen[code >> 4] += copies
+        self.pile = [0]*80                      # Card code : Copies under the top card
+        self.top = -1
+        self.weakness = {seat:0 for seat in seats}     # Seat : Bitmask of color indexes it lacks
+
+    @staticmethod
+    def buildComposition():
+        counts = [0]*80
+        deck = Deck(False)
+        deck.populate(False)
+        for card in deck:
+            counts[card.code] += 1
+        return counts
+
+    ### -\/-  Events  -\/- ###
+
+    def place(self, code, seat=None):
+        '''A card was put on the pile, by 'seat' or by the match for the first card.'''
+        if code & 15 >= Card.drawFourValue:
+            code = (4 << 4) | (code & 15)
+        elif seat is not None:
+            self.weakness[seat] &= ~(1 << (code >> 4))
+        if self.top >= 0:
+            self.pile[self.top] += 1
+        self.top = code
+        self.unseen[code] -= 1
+        self.colorUnseen[code >> 4] -= 1
+
+    def draw(self, seat, colorIndex, forced=False):
+        ''''seat' drew while 'colorIndex' was the current color. A draw it chose shows it lacks the
+        color, cards it was forced to take may hold any color so they clear what was inferred.'''
+        if forced:
+            self.weakness[seat] = 0
+        elif colorIndex < 4:
+            self.weakness[seat] |= 1 << colorIndex
+
+    def reshuffle(self):
+        '''The pile under the top card went back into the deck, so those cards are unseen again.'''
+        unseen = self.unseen
+        colorUnseen = self.colorUnseen
+        for code, copies in enumerate(self.pile):
+            if copies:
+                unseen[code] += copies
+                colorUnseen[code >> 4] += copies
+        self.pile = [0]*80
+
+    ### -\/-  Queries  -\/- ###
+
+    def getUnseen(self, code, hand=None):
+        '''Returns copies of 'code' neither face up nor in 'hand' (a Hand), wilds by their uncolored code.'''
+        if hand is None:
+            return self.unseen[code]
+        return self.unseen[code] - hand.counts[code]
+
+    def getColorUnseen(self, colorIndex, hand=None):
+        if hand is None:
+            return self.colorUnseen[colorIndex]
+        return self.colorUnseen[colorIndex] - hand.colorCounts[colorIndex]
+
+    def getUnseenCodes(self, hand=None):
+        '''Returns every unseen card as a code, one entry per copy, in code order.'''
+        counts = self.unseen
+        if hand is not None:
+            counts = [copies - held for copies, held in zip(counts, hand.counts)]
+        return [code for code in range(80) for i in range(counts[code])]
+
+    def getWeakness(self, seat):
+        '''Returns the bitmask of color indexes 'seat' is inferred to lack.'''
+        return self.weakness[seat]
+
+    def isWeak(self, seat, colorIndex):
+        return self.weakness[seat] >> colorIndex & 1 == 1
 
 class ComputerPlayer(Player):
+    '''
+    'name' (string) : Player's name
+    'config' (dict) : strategy parameters overriding ComputerPlayer.defaults
+        'skipFirst' (bool) : always lead with a skip (or reverse) in two player games
+        'reverseOnDraw' (bool) : reverse when the previous player drew
+        'valueChangeMargin' (int) : change color by value when the new color has more than
+                                    this many cards over the current color in hand
+        'wildColor' (string) : 'most' held color, 'random', or 'tracked': the held color the next
+                               seat is known to lack, else the most held with the fewest unseen
+    '''
 
-    def __init__(self, name):
+    defaults = {'skipFirst':True, 'reverseOnDraw':True, 'valueChangeMargin':0, 'wildColor':'most'}
+    wildColorRules = ('most', 'random', 'tracked')
+    decisions = DecisionTable()     # Decision key : card code, for the default configuration
+    tables = {tuple(sorted(defaults.items())):decisions}       # Configuration : DecisionTable shared by its players
+    drawDecision = -1
+    randomDecision = -2
+
+    def __init__(self, name, config=None):
         super().__init__(name)
         self.type = 'Computer'
         self.begun = False
         self.colorsInHand = {'red':0, 'blue':0, 'green':0, 'yellow':0, 'wild':0}
-        self.colorsOutHand = {}
+        self.colorsOutHand = {'red':0, 'blue':0, 'green':0, 'yellow':0, 'wild':0}     # Cards of each color not seen, from the Match's CardTracker
         self.currentColor = ""
+        self.tracker = None
+        self.nextSeat = None
+        self.config = dict(self.defaults)
+        if config:
+            self.setConfig(config)
+
+    def setConfig(self, config):
+        '''Updates the strategy parameters, players with equal configurations share a DecisionTable.'''
+        for key in config:
+            if key not in self.defaults:
+                raise ValueError("Unknown ComputerPlayer parameter {}".format(key))
+            kind = type(self.defaults[key])
+            if type(config[key]) is not kind:        # Exact, so True is no margin and 1 no flag
+                raise ValueError("{} must be {}, not {!r}".format(key, kind.__name__, config[key]))
+        if config.get('wildColor', 'most') not in self.wildColorRules:
+            raise ValueError("wildColor must be one of {}".format(', '.join(self.wildColorRules)))
+        self.config.update(config)
+        items = tuple(sorted(self.config.items()))
+        if items not in self.tables:
+            self.tables[items] = DecisionTable()
+        self.decisions = self.tables[items]
+
+    def getConfigName(self):
+        '''Returns the parameters that differ from the defaults as "name=value,...", '' for the defaults.'''
+        return ','.join('{}={}'.format(key, self.config[key]) for key in sorted(self.config) if self.config[key] != self.defaults[key])
 
     def addCard(self, card):
         Player.addCard(self, card)
-        color = card.getColor()
-        self.colorsInHand[color] += 1
+        self.colorsInHand[card.color] += 1
+
+    def discardHand(self):
+        Player.discardHand(self)
+        for color in self.colorsInHand:
+            self.colorsInHand[color] = 0
+            self.colorsOutHand[color] = 0
+        self.tracker = None
+        self.nextSeat = None
 
     def indexCard(self, cardColor, cardValue):
-        for card in self.hand:
-            if card.getValue() == cardValue:
-                if cardValue in ('+4', 'W'):
-                    return self.hand.indexCard(card)
-                else:
-                    if card.getColor() == cardColor:
-                        return self.hand.indexCard(card)
-        raise ValueError("Card Cannot Be Found")
+        valueBits = Card.valueIndex[cardValue]
+        if valueBits >= Card.drawFourValue:
+            return self.hand.find((4 << 4) | valueBits)        # Held wilds are uncolored, whatever color is asked for
+        return self.hand.find((Card.colorIndex[cardColor] << 4) | valueBits)
 
     def think(self, match):
-        card = None
         self.currentColor = match.currentColor
         currentValue = match.currentValue
+        colorIndex = Card.colorIndex[self.currentColor]
+        valueBits = Card.valueIndex[currentValue]
         zeroChangeRule = match.zeroChange
-        twoPlayers = False
         previousTurnID = match.getNextTurn(True)
-        nextTurnID = match.getNextTurn(False)
-        previousPlayer = match.getPlayer(previousTurnID)
-        #nextPlayer = match.getPlayer(nextTurnID)
-        if previousTurnID == nextTurnID:
-            twoPlayers = True
+        twoPlayers = len(match.turnList) == 2
+        previousDrew = match.getPlayer(previousTurnID).didDraw()
+        hand = self.hand
+        if self.config['wildColor'] == 'tracked':       # Only getTrackedColor reads the tracker
+            self.tracker = match.tracker
+            self.nextSeat = match.getNextTurn()
+
+        ### Decision Key ###
+        # decide() only reads which current color cards (skip, reverse, any) and wilds are held,
+        # which colors hold the current value and zeros, and how the color counts compare.
+        # The parameters are fixed per DecisionTable so they stay out of the key.
+        same = hand.colorMasks[colorIndex] if colorIndex < 4 else 0
+        if zeroChangeRule:
+            same &= ~1
+        column = hand.valueColors[valueBits] if valueBits < Card.drawFourValue else 0
+        zeros = hand.valueColors[0] if zeroChangeRule else 0
+        key = (colorIndex | valueBits << 3 | zeroChangeRule << 7 | twoPlayers << 8 | previousDrew << 9 | (same != 0) << 10
+               | (same >> 10 & 3) << 11 | (hand.colorMasks[4] >> 13) << 13 | column << 15 | zeros << 20)
+        if (column & ~(1 << colorIndex)) or zeros:
+            c0, c1, c2, c3 = hand.colorCounts[:4]
+            if self.config['valueChangeMargin']:
+                # A margin needs the counts, not just their order. Fields are sized for the match's
+                # decks and the size goes in the key too, so tables shared across matches stay exact.
+                bits = match.countBits
+                key |= (bits | (c0 | c1 << bits | c2 << 2*bits | c3 << 3*bits) << 6) << 25
+            else:
+                key |= ((c0 > c1) | (c0 < c1) << 1 | (c0 > c2) << 2 | (c0 < c2) << 3 | (c0 > c3) << 4 | (c0 < c3) << 5
+                    | (c1 > c2) << 6 | (c1 < c2) << 7 | (c1 > c3) << 8 | (c1 < c3) << 9 | (c2 > c3) << 10 | (c2 < c3) << 11) << 25
+
+        code = self.decisions.get(key)
+        if code is None:
+            code = self.decide(currentValue, zeroChangeRule, twoPlayers, previousDrew)
+            self.decisions.put(key, code)
+
+        if code == self.drawDecision:
+            return "d"
+        if code == self.randomDecision:
+            card = match.playerRandom.choice(hand.getColorCards(colorIndex, 0 if zeroChangeRule else -1))
+        else:
+            card = hand.getFace(code)
+        self.colorsInHand[card.color] -= 1
+        return str(hand.find(card.code))
+
+    def decide(self, currentValue, zeroChangeRule, twoPlayers, previousDrew):
+        '''Returns the code of the card to play, drawDecision or randomDecision (any card of the current color).'''
+        card = None
+        hand = self.hand
+        config = self.config
+        self.countLegalCards(self.currentColor, currentValue, zeroChangeRule)
+        colorIndex = Card.colorIndex[self.currentColor]
+        colorBits = colorIndex << 4
+        valueBits = Card.valueIndex[currentValue]
+
+        if twoPlayers:
             if self.canSkip == False and self.canReverse == True:
                 self.canSkip = True
             self.canReverse = False
 
-        self.getLegalCards(self.currentColor, currentValue, zeroChangeRule)
-
         ### DRAW CASE ###
 
-        if len(self.legalCards) == 0 and len(self.wildCards) == 0:
-            return "d"
+        if self.legalCount == 0 and self.wildCount == 0:
+            return self.drawDecision
 
         else:
 
             ### NO LEGAL CARD, USE WILD CARD ###
 
-            if len(self.legalCards) == 0:
+            if self.legalCount == 0:
 
                 if zeroChangeRule and self.canZeroChange:
-                    bestZeroColor = self.getBestColor(self.zeroCards)
-                    card = self.getCardByColor(self.zeroCards, bestZeroColor)
+                    card = self.getBestFace(0)
 
                 else:
 
                     if self.canDrawFour:
-                        card = self.getCardByValue(self.wildCards, "+4")
-                        print(card)
+                        card = hand.getFace((4 << 4) | Card.drawFourValue)
 
                     else:
-                        card = random.choice(self.wildCards)
+                        card = hand.getFace((4 << 4) | Card.wildValue)
 
             else:
 
                 ### HAS LEGAL CARD ###
 
-                if twoPlayers and self.canSkip: #Always play a skip card in a two player game
-                    #print("Shed Skip Strategy")
-                    card = self.getCardByValue(self.legalCards,"R", "X")
+                if twoPlayers and self.canSkip and config['skipFirst']: #Always play a skip card in a two player game
+                    card = self.getLegalFace(colorBits, valueBits, Card.reverseValue, Card.skipValue)
 
-                if self.canReverse and previousPlayer.didDraw():
-                    #print("Reverse Strategy")
-                    reverseCards = self.getAllCardsByValue(self.legalCards, "R")
-                    for reverseCard in reverseCards:
-                        if reverseCard.getColor() == self.currentColor:
-                            card = reverseCard
+                if self.canReverse and previousDrew and config['reverseOnDraw']:
+                    if hand.count(colorBits|Card.reverseValue) > 0:
+                        card = hand.getFace(colorBits|Card.reverseValue)
 
                 if self.canValueChange:
                     # Computer Can Value Change, However, Should it?
                     # Computer Checks to See if Value Change Color is Better Than Current
                     currentColorNum = self.colorsInHand[self.currentColor]
-                    bestValueChangeColor = self.getBestColor(self.valueChangeCards)
-                    if self.colorsInHand[bestValueChangeColor] > currentColorNum or len(self.valueChangeCards) == len(self.legalCards):
-                        card = self.getCardByColor(self.valueChangeCards, bestValueChangeColor)
+                    bestValueChangeCard = self.getBestFace(valueBits, colorIndex)
+                    if self.colorsInHand[bestValueChangeCard.color] > currentColorNum + config['valueChangeMargin'] or self.valueChangeCount == self.legalCount:
+                        card = bestValueChangeCard
 
 
                 if card == None:
-                    #print("Random Strategy")
-                    card = random.choice(list(set(self.legalCards) - set(self.valueChangeCards)))
-
-        color = card.getColor()
-        self.colorsInHand[color] -= 1
-        return str(self.indexCard(card.getColor(), card.getValue()))
-
-    def getWildColor(self):
+                    return self.randomDecision
+
+        return card.code
+
+    def getLegalFace(self, colorBits, valueBits, *values):
+        '''Returns the first held legal card with one of the value indexes, current color first.'''
+        for value in values:
+            if self.hand.count(colorBits|value) > 0:
+                return self.hand.getFace(colorBits|value)
+        for value in values:
+            if value == valueBits:
+                for colorIndex in range(4):
+                    if self.hand.count((colorIndex << 4)|value) > 0:
+                        return self.hand.getFace((colorIndex << 4)|value)
+
+    def getBestFace(self, valueBits, skipColor=-1):
+        '''Returns the held card with this value index in the color the computer holds most of.'''
+        bestCard = None
+        bestColorNum = 0
+        for colorIndex in range(4):
+            code = (colorIndex << 4) | valueBits
+            if colorIndex != skipColor and self.hand.count(code) > 0:
+                card = self.hand.getFace(code)
+                if self.colorsInHand[card.color] > bestColorNum:
+                    bestCard = card
+                    bestColorNum = self.colorsInHand[card.color]
+        return bestCard
+
+    def getWildColor(self, rng=None):
         maxKey = max(self.colorsInHand, key=self.colorsInHand.get)
-        if maxKey == 'wild':
-            return random.choice(('r','g','b','y'))
+        if self.config['wildColor'] == 'tracked' and self.tracker is not None:
+            return self.getTrackedColor(rng)
+        if maxKey == 'wild' or self.config['wildColor'] == 'random':
+            return (rng or random).choice(('r','g','b','y'))
         else:
             return maxKey
 
+    def getTrackedColor(self, rng=None):
+        '''Returns the held color the next seat lacks, else the most held color, fewest unseen
+        cards of it breaking ties. Random with no colored card in hand.'''
+        weakness = self.tracker.getWeakness(self.nextSeat)
+        for color in self.colorsOutHand:
+            self.colorsOutHand[color] = self.tracker.getColorUnseen(Card.colorIndex[color], self.hand)
+        best = None
+        bestScore = None
+        for color in ('red','yellow','green','blue'):
+            held = self.colorsInHand[color]
+            if held == 0:
+                continue
+            score = (weakness >> Card.colorIndex[color] & 1, held, -self.colorsOutHand[color])
+            if best is None or score > bestScore:
+                best = color
+                bestScore = score
+        if best is None:
+            return (rng or random).choice(('r','g','b','y'))
+        return best
+
     def getCardByValue(self, cardList, *values):
+        values = [Card.valueIndex[value] for value in values]
         for card in cardList:
-            if card.getValue() in values:
+            if card.code & Card.valueMask in values:
                 return card
 
     def getAllCardsByValue(self, cardList, *values):
+        values = [Card.valueIndex[value] for value in values]
         cards = []
         for card in cardList:
-            if card.getValue() in values:
+            if card.code & Card.valueMask in values:
                 cards.append(card)
         return cards
 
     def getCardByColor(self, cardList, *colors):
+        colors = [Card.colorIndex[color] << 4 for color in colors if color in Card.colorIndex]
         for card in cardList:
-            if card.getColor() in colors:
+            if card.code & Card.colorMask in colors:
                 return card
 
     def getBestColor(self, cardList):
         bestColor = None
         bestColorNum = 0
         for card in cardList:
-            color = card.getColor()
+            color = card.color
             if self.colorsInHand[color] > bestColorNum:
                 bestColor = color
                 bestColorNum = self.colorsInHand[color]
@@ -517,8 +970,27 @@ class Card():
     '''
     'suit' (string) : Card's Color (rgby)
     'rank' (string) : Card's Value (0-9, R, X, W, +2, +4)
+
+    Cards are immutable flyweights, use Card.intern() to share one instance per face.
+    'code' packs the color index into bits 4-6 and the value index into bits 0-3.
     '''
 
+    __slots__ = ('code','color','value','cardID','colorCode','colorCodeDark','displaySpace','points','wild','zero')
+
+    colorIndex = {'red':0, 'yellow':1, 'green':2, 'blue':3, 'wild':4}
+    valueIndex = {'0':0,'1':1,'2':2,'3':3,'4':4,'5':5,'6':6,'7':7,'8':8,'9':9,'X':10,'R':11,'+2':12,'+4':13,'W':14}
+    colorMask = 0x70
+    valueMask = 0x0F
+    skipValue = 10
+    reverseValue = 11
+    drawTwoValue = 12
+    drawFourValue = 13      # Value indexes at or above this are wild cards
+    wildValue = 14
+
+    faces = {}              # (color, value) : interned Card
+    rowCache = {}           # (code, hide) : hand rows
+    glyphCache = {}         # (colorCode, colorCodeDark, bigNums key) : pile rows
+
     colors = {
         'red'       :   '\033[91m',
         'green'     :   '\033[92m',
@@ -580,7 +1052,19 @@ class Card():
         self.setColor(color)
         self.setValue(value)
         self.setPoints(value)
+        self.code = (self.colorIndex[self.color] << 4) | self.valueIndex[self.value]
 
+    def __reduce__(self):
+        return (Card.intern, (self.color, self.value))
+
+    @classmethod
+    def intern(cls, color, value):
+        '''Returns the shared Card for a face, creating it on first use.'''
+        try:
+            return cls.faces[(color, value)]
+        except KeyError:
+            card = cls.faces[(color, value)] = cls(color, value)
+            return card
 
     #############################################
 
@@ -590,20 +1074,26 @@ class Card():
         return "{},{}".format(self.color, self.value)
 
     def getBigNum(self, reverse, reverseSeed=0):
-        '''Returns list of strings to draw card's value on the pile.'''
-        bigNums = []
-        colorCode = self.colorCode
-        colorCodeDark = self.colorCodeDark
+        '''Returns tuple of strings to draw card's value on the pile.'''
         value = self.value
         if value == 'R':
             if not reverse:
                 value += str(reverseSeed)
             else:
                 value += str(9-reverseSeed)
-        for mid in self.bigNums[value]:
-            bigNums += ['{}| |{}'.format(colorCode,colorCodeDark)+mid+'{}| |\033[0m\t'.format(colorCode)]
+        return self.getGlyph(self.colorCode, self.colorCodeDark, value)
 
-        return bigNums
+    @classmethod
+    def getGlyph(cls, colorCode, colorCodeDark, value):
+        '''Returns the cached pile rows for a big number drawn in the given colors.'''
+        key = (colorCode, colorCodeDark, value)
+        try:
+            return cls.glyphCache[key]
+        except KeyError:
+            prefix = '{}| |{}'.format(colorCode,colorCodeDark)
+            suffix = '{}| |\033[0m\t'.format(colorCode)
+            glyph = cls.glyphCache[key] = tuple(prefix+mid+suffix for mid in cls.bigNums[value])
+            return glyph
 
     def getColor(self):
         '''Returns card's color.'''
@@ -622,6 +1112,18 @@ class Card():
         return self.points
 
     def getRow(self,rowNum,hide=False):
+        return self.getRows(hide)[rowNum]
+
+    def getRows(self, hide=False):
+        '''Returns the cached tuple of the four hand rows for this face.'''
+        key = (self.code, hide)
+        try:
+            return self.rowCache[key]
+        except KeyError:
+            rows = self.rowCache[key] = tuple(self.buildRow(rowNum, hide) for rowNum in range(4))
+            return rows
+
+    def buildRow(self,rowNum,hide=False):
         value = self.value
         displaySpace = self.displaySpace
         if hide:
@@ -688,6 +1190,8 @@ class Card():
                 self.displaySpace = ''
             if value == '0':
                 self.zero = True
+            elif value in ('+4', 'W'):
+                self.wild = True
 
     def setPoints(self, value):
         if value in ('0','1','2','3','4','5','6','7','8','9'):
@@ -703,8 +1207,12 @@ class Card():
     ### -\/-  Wild Card Methods  -\/- ###
 
     def changeColor(self, color):
-        '''Changes Card's Color, Intended for Wild Cards.'''
-        self.setColor(color)
+        '''Returns this face in another color, Intended for Wild Cards.'''
+        return Card.intern(color, self.value)
+
+    def getCode(self):
+        '''Returns card's packed color/value code.'''
+        return self.code
 
     def isWild(self):
         '''Returns if card is a wild card.'''
@@ -713,15 +1221,175 @@ class Card():
     def isZero(self):
         return self.zero
 
-class Match():
+class Terminal():
+    '''In-process screen control with escape sequences, nothing is spawned to clear the screen.
+       'stream' (file) : output, defaults to sys.stdout
+       'dumb' (bool) : no cursor control, frames are scrolled instead. None detects it from
+                       TERM=dumb, or a Windows console that will not take escape sequences.'''
+
+    clearSequence = '\033[H\033[2J'            # Home, erase screen
+    altScreenOn = '\033[?1049h'
+    altScreenOff = '\033[?1049l'
+
+    def __init__(self, stream=None, dumb=None):
+        self.stream = stream
+        if dumb is None:
+            dumb = self.detectDumb()
+        self.dumb = dumb
+        self.altScreen = False              # Is the alternate screen showing
+
+    @classmethod
+    def detectDumb(cls):
+        if os.environ.get('TERM') == 'dumb':
+            return True
+        if os.name == 'nt':
+            return not cls.enableWindowsAnsi()
+        return False
+
+    @staticmethod
+    def enableWindowsAnsi():
+        '''Turns on escape sequence processing for the Windows console, returns if it took.'''
+        try:
+            import ctypes
+            kernel = ctypes.windll.kernel32
+            handle = kernel.GetStdHandle(-11)           # STD_OUTPUT_HANDLE
+            mode = ctypes.c_uint32()
+            if not kernel.GetConsoleMode(handle, ctypes.byref(mode)):
+                return False
+            return bool(kernel.SetConsoleMode(handle, mode.value | 0x0004))     # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        except (ImportError, AttributeError, OSError):
+            return False
+
+    def write(self, text):
+        '''Writes 'text' in a single write and flushes.'''
+        stream = self.stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+
+    def getClear(self):
+        '''Returns the text that clears the screen and homes the cursor.'''
+        if self.dumb:
+            return '\n' * shutil.get_terminal_size().lines
+        return self.clearSequence
+
+    def clear(self):
+        self.write(self.getClear())
+
+    def enterAltScreen(self):
+        '''Switches to the alternate screen, leaving the shell's scrollback untouched.'''
+        if not self.dumb and not self.altScreen:
+            self.altScreen = True
+            self.write(self.altScreenOn)
+
+    def leaveAltScreen(self):
+        if self.altScreen:
+            self.altScreen = False
+            self.write('\033[0m' + self.altScreenOff)
+
+class ScreenRenderer():
+    '''Writes frames to a terminal, sending only the cells that changed since the last frame.
+    The first frame clears the screen and is written in full, on a dumb terminal every frame is.
+       'terminal' (Terminal) : output, defaults to a Terminal on sys.stdout'''
+
+    escapePattern = re.compile('(\033\\[[0-9;]*m)')
+    foregroundPattern = re.compile('\033\\[(?:3|9)[0-7]m')
+    runGap = 4              # Unchanged cells worth rewriting rather than moving the cursor
+
+    def __init__(self, terminal=None):
+        self.terminal = terminal or Terminal()
+        self.previous = None                # Lines of the last frame written
+
+    def needsRedraw(self):
+        '''Returns if the next frame will be written in full.'''
+        return self.previous is None
+
+    def reset(self):
+        '''Forgets the last frame, call when something else wrote over the screen.'''
+        self.previous = None
+
+    def parseLine(self, line):
+        '''Splits a line into (style, character) cells, expanding tabs.'''
+        cells = []
+        style = ''
+        for part in self.escapePattern.split(line):
+            if part.startswith('\033'):
+                if part in ('\033[0m', '\033[m'):
+                    style = ''
+                elif self.foregroundPattern.match(part):
+                    style = self.foregroundPattern.sub('', style) + part     # Later colors replace earlier ones
+                else:
+                    style += part
+                continue
+            for character in part:
+                if character == '\t':
+                    cells += [(style, ' ')] * (8 - len(cells) % 8)
+                else:
+                    cells.append((style, character))
+        return cells
+
+    def diffLine(self, row, old, new):
+        '''Returns the escape sequences turning line 'old' into 'new' on screen row 'row'.'''
+        oldCells = self.parseLine(old)
+        newCells = self.parseLine(new)
+        output = []
+        col = 0
+        while col < len(newCells):
+            if col < len(oldCells) and oldCells[col] == newCells[col]:
+                col += 1
+                continue
+            start = col
+            end = col + 1
+            gap = 0
+            while end < len(newCells) and gap < self.runGap:
+                if end < len(oldCells) and oldCells[end] == newCells[end]:
+                    gap += 1
+                else:
+                    gap = 0
+                end += 1
+            end -= gap
+            output.append('\033[{};{}H'.format(row+1, start+1))
+            style = None
+            for cellStyle, character in newCells[start:end]:
+                if cellStyle != style:
+                    output.append('\033[0m'+cellStyle)
+                    style = cellStyle
+                output.append(character)
+            output.append('\033[0m')
+            col = end
+        if len(newCells) < len(oldCells):
+            output.append('\033[{};{}H\033[K'.format(row+1, len(newCells)+1))
+        return ''.join(output)
+
+    def render(self, frame):
+        lines = frame.split('\n')
+        previous = self.previous
+        if self.terminal.dumb:
+            output = [self.terminal.getClear(), self.escapePattern.sub('', frame), '\n']     # No colors either
+        elif previous is None:
+            output = [self.terminal.getClear(), frame, '\n']
+        else:
+            output = []
+            for row, line in enumerate(lines):
+                if row >= len(previous):
+                    output.append('\033[{};1H{}'.format(row+1, line))
+                elif previous[row] != line:
+                    output.append(self.diffLine(row, previous[row], line))
+            for row in range(len(lines), len(previous)):
+                output.append('\033[{};1H\033[K'.format(row+1))
+            output.append('\033[{};1H\033[J'.format(len(lines)+1))     # Park below frame, clear old prompts
+        self.terminal.write(''.join(output))
+        self.previous = lines
+
+class MatchView():
+    '''Terminal UI for a Match. Subscribes to the Match's events and keeps the
+    'elements' screen model, hand pages and animations out of the rules.
+       'match' (Match) : match to draw
+       'gs' (GameSettings) : display settings'''
 
     elementsInit = {
-        ### Names (final) ###
-        'P1Name':'           ', 'P2Name':'           ', 'P3Name':'           ', 'P4Name':'           ',
-        ### Card Values ###
-        'P1Cards':'           ', 'P2Cards':'           ', 'P3Cards':'           ', 'P4Cards':'           ',
-        ### Turn Colors / Hand###
-        'P1Turn':'', 'P2Turn':'', 'P3Turn':'', 'P4Turn':'',
+        ### Seats ###
+        # P<seat>Name, P<seat>Cards and P<seat>Turn for every seat code are added by __init__
+        ### Hand ###
         'HName':'\t\t', 'HVisual':'' ,'Hand':'',
         ### Deck ###
         'DNum':'', 'Deck':['','','','','','','','',''],
@@ -734,175 +1402,546 @@ class Match():
         }
 
     speeds = {'slow':2,'normal':1,'fast':0}
+    visibleSeats = 6                # Seat rows drawn, larger tables show the seats around the one acting
+
+    def __init__(self, match, gs):
+        self.match = match
+        self.displayEffects = gs.displayEffects
+        self.hideComputerHands = gs.hideComputerHands
+        self.computerSpeed = self.speeds[gs.computerSpeed]
+        self.altScreen = gs.altScreen
+        self.handTitles = {identity:'' for identity in match.turnList}
+        self.renderer = ScreenRenderer()
+        self.broadcaster = None             # Gets the public frame of every screen drawn (see spectate.Broadcaster)
+        self.elements = dict(self.elementsInit)
+        self.elements['Deck'] = list(self.elementsInit['Deck'])
+        self.elements['oMiddle'] = list(self.elementsInit['oMiddle'])
+
+        keyStringName = 'P{}Name'
+        keyStringCards = 'P{}Cards'
+        players = match.players
+        for code in GameSettings.seatCodes:           # Empty seats keep blank rows, small tables draw four
+            identity = 'play'+code
+            if identity in players:
+                name = players[identity].getName()
+                self.elements[keyStringName.format(code)] = name+(' '*(11-len(name)))
+                self.elements[keyStringCards.format(code)] = '  '+(' '*(3-len(str(players[identity].getCardNum()))))+str(players[identity].getCardNum())+' Cards'
+            else:
+                self.elements[keyStringName.format(code)] = ' '*11
+                self.elements[keyStringCards.format(code)] = ' '*11
+            self.elements['P{}Turn'.format(code)] = ''
+        self.buildDeckVisual()
+        for identity in match.turnList:
+            self.buildHandString(identity)
+
+    def notify(self, event, args):
+        '''Runs the on<Event> handler, yielding any steps it makes.'''
+        handler = getattr(self, 'on'+event[0].upper()+event[1:], None)
+        if handler is not None:
+            steps = handler(*args)
+            if steps is not None:
+                yield from steps
+
+    def setStream(self, stream):
+        '''Draws to 'stream' instead of the local terminal, e.g. a remote player's connection.'''
+        self.renderer.terminal = Terminal(stream, False)
+
+    def isHidden(self, playerID):
+        '''Returns if the player's hand is drawn face down.'''
+        return self.match.players[playerID].getType() == 'Computer' and self.hideComputerHands
+
+    ### -\/-  Screen Model  -\/- ###
+
+    def enterBreak(self):
+        yield ('input', '')
+
+    def adjustCardAmount(self, playerID):
+        match = self.match
+        keyStringCards = 'P{}Cards'
+        self.elements[keyStringCards.format(playerID[-1])] = '  '+(' '*(3-len(str(match.players[playerID].getCardNum()))))+str(match.players[playerID].getCardNum())+' Cards'
+        if match.handPosition > match.players[playerID].getMaxScroll():
+            match.handPosition -= 1
+        self.buildHandVisual(playerID)
+
+    def buildDeckVisual(self):
+        deck = self.match.deck
+        self.elements['DNum'] = len(deck)
+        self.elements['PostDNum'] = ''
+        if len(str(len(deck))) < 2:
+            self.elements['PostDNum'] = '\t'
+        self.elements['Deck'] = ['','','','','','','','','']
+        j = 8
+        for i in range(int(math.ceil(len(deck)/(12*self.match.decks)))):      # Nine bars hold every deck
+            i #unused
+            self.elements['Deck'][j] = '='
+            j -= 1
+
+    def buildHandString(self, playerID):
+        playerName = self.match.players[playerID].getName()
+        if len(playerName) < 9:
+            self.handTitles[playerID] = "{}'s Hand\t".format(playerName)
+        else:
+            self.handTitles[playerID] = "{}'s Hand".format(playerName)
+
+    def buildHandVisual(self, playerID):
+        string ='['
+        for i in range(self.match.players[playerID].getMaxScroll()+1):
+            if i == self.match.handPosition:
+                string += '|'
+            else:
+                string += '-'
+        string +=']'
+        self.elements['HVisual'] = string
+
+    def updateCards(self, playerID):
+        '''Updates the hand page, card count and deck after a card is drawn.'''
+        match = self.match
+        player = match.players[playerID]
+
+        ### Adjust Hand Visual ###
+        match.handPosition = player.getMaxScroll()
+        self.buildHandVisual(playerID)
+
+        ### Ajust Player Title ###
+        keyStringCards = 'P{}Cards'
+        self.elements[keyStringCards.format(playerID[-1])] = '  '+(' '*(3-len(str(player.getCardNum()))))+str(player.getCardNum())+' Cards'
+
+        ### Adjust Deck ###
+        self.buildDeckVisual()
 
+    ### -\/-  Match Events  -\/- ###
+
+    def onBegin(self):
+        if self.altScreen:
+            self.renderer.terminal.enterAltScreen()
+        self.elements['Console'] = 'Beginning Game, Press Enter'
+        self.showScreen()
+        yield from self.enterBreak()
+
+    def onDealStart(self):
+        if self.displayEffects:
+            self.elements['Console'] = 'Dealing Cards...'
+
+    def onDeal(self, playerID):
+        self.updateCards(playerID)
+        if self.displayEffects:
+            self.showScreen(True)
+            yield ('sleep', .1)
+
+    def onFirstTurn(self):
+        self.elements['Console'] = 'First turn will be {}. Press Enter.' .format(self.match.players[self.match.turn].getName())
+        self.showScreen(True)
+        yield from self.enterBreak()
+
+    def onPlace(self, card, playerID):
+        '''Card placed on the pile by 'playerID', None for the first card from the deck.'''
+        pile = self.match.pile
+        if playerID is None:
+            self.buildDeckVisual()
+        if len(pile) > 1:
+            self.elements['uHeader'] = '\t      {}\u2666\u2666\u2666=========\u2666\u2666\u2666\033[0m'.format(pile[1].getColorCode())
+        else:
+            self.elements['uHeader'] = '\t\t\t\t'
+        self.elements['oHeader'] = '{}\u2666\u2666\u2666=========\u2666\u2666\u2666\033[0m\t'.format(card.getColorCode())
+        self.elements['oMiddle'] = card.getBigNum(self.match.reverse)
+        if playerID is not None:
+            self.adjustCardAmount(playerID)
+
+    def onTurnChange(self, previous, current):
+        if previous is not None:
+            self.elements['P{}Turn'.format(previous[-1])] = ''
+        if current is not None:
+            self.elements['P{}Turn'.format(current[-1])] = '\033[93m'
+
+    def onReshuffle(self):
+        self.buildDeckVisual()
+
+    def onTurn(self, playerID):
+        self.elements['HName'] = self.handTitles[playerID]
+        self.buildHandVisual(playerID)
+
+    def onSkip(self):
+        if not self.displayEffects:
+            return
+        match = self.match
+        hide = self.isHidden(match.turn)
+        self.elements['Console'] = "Skip Card Placed! Skipping {}'s Turn.".format(match.players[match.turn].getName())
+        self.showScreen(hide)
+        yield ('sleep', 1)
+        for i in range(2):
+            i #unused
+            self.elements['P{}Turn'.format(match.turn[-1])] = '\033[91m'
+            self.showScreen(hide)
+            yield ('sleep', .3)
+            self.elements['P{}Turn'.format(match.turn[-1])] = ''
+            self.showScreen(hide)
+            yield ('sleep', .3)
+
+    def onReverse(self):
+        match = self.match
+        if self.displayEffects:
+            hide = self.isHidden(match.turn)
+            self.elements['Console'] = "Reverse Card Played! Reversing Turn Order."
+            self.showScreen(hide)
+            yield ('sleep', 1)
+            for i in range(10):
+                self.elements['oMiddle'] = match.pile[0].getBigNum(match.reverse,i)
+                self.showScreen(hide)
+                yield ('sleep', .1)
+        self.elements['oMiddle'] = match.pile[0].getBigNum(match.reverse,9)
+
+    def onColorPrompt(self):
+        self.elements['Console'] = 'Wild Card! Specifiy a Color: (B)lue, (R)ed, (G)reen, (Y)ellow'
+        self.elements['Error'] = 'Specifiy A Color'
+        self.showScreen()
+
+    def onWild(self, card, playerID):
+        '''Color changed to 'card', chosen by 'playerID' or None when forced by passes.'''
+        hide = False
+        if playerID is not None:
+            hide = self.isHidden(playerID)
+        self.elements['Error'] = ""
+        if self.displayEffects:
+            self.elements['Console'] = 'Wild Card! Changing Color.'
+            seed = 1
+            for i in range(10):
+                i #unused
+                if seed > 4:
+                    seed = 1
+                self.showScreen(hide,wildSeed=seed)
+                yield ('sleep', .1)
+                seed += 1
+        self.elements['oHeader'] = '{}\u2666\u2666\u2666=========\u2666\u2666\u2666\033[0m\t'.format(card.getColorCode())
+        self.elements['oMiddle'] = card.getBigNum(self.match.reverse)
+
+    def onHumanTurn(self, playerID):
+        player = self.match.players[playerID]
+        if len(self.match.deck) > 0:
+            self.elements['Console'] = 'Select a card, (D)raw, or (P)ause.'
+        else:
+            self.elements['Console'] = 'Select a card, (D)raw, (P)ause, or Pas(s).'
+        if player.getForceDraws() > 0:
+            self.elements['Error'] = 'Draw Card Played! Draw {} cards.'.format(player.getForceDraws())
+        self.showScreen()
+
+    def onScroll(self, direction):
+        match = self.match
+        maxScroll = match.players[match.turn].getMaxScroll()
+        if direction == '<':
+            match.handPosition -= 1
+            if match.handPosition == -1:
+                match.handPosition = maxScroll
+        else:
+            match.handPosition += 1
+            if match.handPosition > maxScroll:
+                match.handPosition = 0
+        self.buildHandVisual(match.turn)
+
+    def onShow(self):
+        self.showScreen()
+
+    def onError(self, message):
+        self.elements['Error'] = message
+
+    def onDraw(self, playerID):
+        self.updateCards(playerID)
+        if self.displayEffects and self.match.players[playerID].getType() == 'Computer':
+            self.showScreen(self.hideComputerHands)
+
+    def onPause(self):
+        self.elements['Console'] = 'Game Paused. (Q)uit Match or Press Enter to Resume.'
+        self.showScreen(True)
+
+    def onResume(self):
+        self.elements['Console'] = ''
+
+    def onComputerTurn(self, playerID):
+        self.elements['Console'] = '{}\'s Turn'.format(self.match.players[playerID].getName())
+        self.showScreen(self.hideComputerHands)
+        yield ('sleep', self.computerSpeed)
+
+    def onComputerThink(self):
+        if self.displayEffects:
+            yield ('sleep', .2)
+
+    def onWin(self):
+        match = self.match
+        self.elements['P{}Turn'.format(match.turn[-1])] = ''
+        self.elements['Console'] = '{} Wins! Press Enter to Begin Point Tally'.format(match.players[match.winnerID].getName())
+        self.showScreen()
+        yield from self.enterBreak()
+
+    def onTallyTurn(self, playerID):
+        self.elements['HName'] = self.handTitles[playerID]
+        self.onTurnChange(None, playerID)
+
+    def onTally(self, playerID, points):
+        self.elements['Console'] = '{} Won {} Points!'.format(self.match.players[self.match.winnerID].getName(),points)
+        self.adjustCardAmount(playerID)
+        if self.displayEffects:
+            self.showScreen()
+            yield ('sleep', .1)
+
+    def onTallyDone(self, points):
+        self.elements['Console'] = '{} Won {} Points! Press Enter'.format(self.match.players[self.match.winnerID].getName(),points)
+        self.showScreen()
+        yield from self.enterBreak()
+
+    def onClose(self):
+        self.renderer.terminal.leaveAltScreen()
+
+    ### -\/-  Drawing  -\/- ###
+
+    def showScreen(self, hide=False, wildSeed=0):
+        frame = self.drawScreen(hide, wildSeed)
+        self.renderer.render(frame)
+        if self.broadcaster is not None:
+            if self.broadcaster.hideHands and not hide:
+                frame = self.drawScreen(True, wildSeed)        # One public frame however many are watching
+            self.broadcaster.publish(frame)
+
+    def drawScreen(self, hide=False, wildSeed=0):
+        match = self.match
+        wildColors = ('\033[91m','\033[93m','\033[92m','\033[94m')
+        oHeader = self.elements['oHeader']
+        oMiddle = self.elements['oMiddle']
+        if wildSeed and len(match.pile) > 0:
+            colorCode = wildColors[wildSeed-1]
+            oHeader = '{}\u2666\u2666\u2666=========\u2666\u2666\u2666\033[0m\t'.format(colorCode)
+            oMiddle = Card.getGlyph(colorCode, colorCode, match.pile[0].getValue())
+
+        hand = ''
+        if match.turn in match.players:
+            if self.isHidden(match.turn):
+                hide = True
+            hand = match.players[match.turn].getHand(match.handPosition, hide)
+
+        screenout = ''
+        ring = match.ring
+        if len(ring) <= 4:
+            seats = GameSettings.seatCodes[:4]          # A row for every seat a small table could have
+            screenout += '\t\033[4m\033[97mPlayers\033[0m\n'
+        else:
+            seats = [identity[-1] for identity in ring.getWindow(match.turn, self.visibleSeats)]
+            screenout += '\t\033[4m\033[97mPlayers\033[0m \033[90m{} of {}\033[0m\n'.format(len(seats), len(ring))
+        for i in seats:
+            screenout += '\t{}{}\033[0m{}\n'.format(self.elements['P{}Turn'.format(i)], self.elements['P{}Name'.format(i)], self.elements['P{}Cards'.format(i)])
+        screenout += '\n\t\033[97mDeck [{}] {} Cards{}\033[0m\n'.format(''.join(self.elements['Deck']).rjust(9), self.elements['DNum'], self.elements['PostDNum'])
+        screenout += self.elements['uHeader']+'\n'
+        screenout += '\t      {}\n'.format(oHeader)
+        for mid in oMiddle:
+            screenout += '\t      {}\n'.format(mid)
+        screenout += '\t      {}\n'.format(oHeader)
+        screenout += '\n\t\033[97m{}\033[0m\t{}\n'.format(self.elements['HName'], self.elements['HVisual'])
+        screenout += hand
+        screenout += '\n\033[97m{}\033[0m\n\033[91m{}\033[0m'.format(self.elements['Console'], self.elements['Error'])
+        return screenout
+
+class TurnRing():
+    '''Seats in turn order. The seat after, before or any number past a seat, and reversing
+    the direction, are O(1) however many seats the table has.
+       'seats' (list) : seat identities in clockwise order'''
+
+    def __init__(self, seats):
+        self.seats = list(seats)
+        self.positions = {seat:index for index, seat in enumerate(self.seats)}     # Seat : Index in 'seats'
+        self.step = 1                       # 1 clockwise, -1 reversed
+
+    def __len__(self):
+        return len(self.seats)
+
+    def __iter__(self):
+        return iter(self.seats)
+
+    def getPosition(self, seat):
+        return self.positions[seat]
+
+    def getNext(self, seat, count=1):
+        '''Returns the seat 'count' turns after 'seat' in the current direction, 2 for the seat after a skip.'''
+        seats = self.seats
+        return seats[(self.positions[seat] + self.step*count) % len(seats)]
+
+    def getPrevious(self, seat, count=1):
+        return self.getNext(seat, -count)
+
+    def reverse(self):
+        '''Flips the direction, returns True when play now runs counterclockwise.'''
+        self.step = -self.step
+        return self.step < 0
+
+    def getWindow(self, seat, size):
+        '''Returns at most 'size' seats in clockwise order, starting one before 'seat'.'''
+        seats = self.seats
+        if len(seats) <= size:
+            return seats
+        start = self.positions[seat] - 1 if seat in self.positions else -1
+        return [seats[(start+index) % len(seats)] for index in range(size)]
+
+class Match():
+    '''Rules and turn flow of one game. UI subscribers (see MatchView) are told about
+    each step through emit(), headless matches have none and skip all drawing.'''
+
+    def __init__(self, gs, seed=None):
+        ### Randomness ###
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.random = random.Random(seed)                               # Shuffles, first turn, forced colors
+        self.playerRandom = random.Random('{}:players'.format(seed))    # Player decisions
 
-    def __init__(self, gs):
         ### Decks ###
-        self.deck = Deck(True)
-        self.pile = Deck(False)
+        self.decks = gs.getDeckCount()
+        self.deck = Deck(True, self.random, 108*self.decks, self.decks)
+        self.countBits = ((2*len(Deck.values)-1)*self.decks).bit_length()    # Enough for every card of one color
+        self.pile = Deck(False, self.random, 108*self.decks)
 
         ### Player Information ###
         self.players = gs.players
-        self.turnList = []
-        self.handTitles =  {'play1':'','play2':'','play3':'','play4':''}
+        self.ring = TurnRing(identity for identity in GameSettings.playerIdentities if identity in self.players)
+        self.turnList = self.ring.seats                     # Seats in turn order
+        self.tracker = CardTracker(self.turnList, self.decks)   # Cards seen and seats' inferred weak colors, public to every player
 
         ### Carry Information ###
-        self.displayEffects = gs.displayEffects
-        self.hideComputerHands = gs.hideComputerHands
         self.zeroChange = gs.zeroChange
-        self.computerSpeed = self.speeds[gs.computerSpeed]
-        self.simulation = gs.computerSimulation
+        self.simulation = gs.computerSimulation         # Headless: no rendering, input or shell calls
 
         ### Data ###
-        self.handPosition = 0               # For hand displays
+        self.handPosition = 0               # Hand page shown, digits entered are relative to it
         self.drawAmount = 0                 # Used for force draws
         self.passes = 0                     # Keep track of consecutive passes for emergency color change
-        self.passMax = 0                    # Max passes before color change
+        self.passMax = len(self.turnList)   # Max passes before color change
         self.turn = ''                      # Current turn
+        self.turnCount = 0                  # Number of turns played
         self.event = ''                     # Wild, Reverse, Skip, etc
         self.wildColorChange = ''           # Specifies color to change wild card to
         self.currentColor = ''              # Current color
         self.currentValue = ''              # Current value
         self.winnerID = ''                  # ID of Player who Won
+        self.points = 0                     # Points won by the winner in the tally
         self.reverse = False                # Is turn order reversed
         self.turnComplete = False           # Is turn complete
         self.matchComplete = False          # Is the Game over?
         self.matchAbort = False             # Did the match conclude without a winner?
         self.forcedWild = False             # Force change wild
 
-        ### Initialize Names / Cards / Deck (Assuming New Game) ###
-        self.elements = dict(self.elementsInit)
-
-        keyStringName = 'P{}Name'
-        keyStringCards = 'P{}Cards'
-
-        for i in self.players:
-            self.elements[keyStringName.format(i[-1])] = self.players[i].getName()+(' '*(11-len(self.players[i].getName())))
-            self.elements[keyStringCards.format(i[-1])] = '  '+(' '*(3-len(str(self.players[i].getCardNum()))))+str(self.players[i].getCardNum())+' Cards'
-
-        self.elements['DNum'] = len(self.deck)
-
-        if len(str(len(self.deck))) < 2:
-            self.elements['PostDNum'] = '\t'
+        self.views = []                     # Subscribers to emit()
+        if not self.simulation:
+            self.subscribe(MatchView(self, gs))
 
-        j = 8
-        for i in range(int(math.ceil(len(self.deck)/12))):
-            self.elements['Deck'][j] = '='
-            j -= 1
+        self.log = MatchLog(seed, [self.players[identity].getName() for identity in self.turnList], self.zeroChange, self.decks)
 
-        for key in GameSettings.playerIdentities:
-            try:
-                self.buildHandString(key)
-                self.turnList += [key]
-            except KeyError:
-                pass
+    def subscribe(self, view):
+        '''Adds a subscriber. emit() calls view.notify(event, args), which yields steps like the Match's own.'''
+        self.views.append(view)
 
-        self.passMax = len(self.turnList)
+    def emit(self, event, *args):
+        '''Tells every subscriber about 'event', use with yield from. Free when there are none.'''
+        if not self.views:
+            return ()
+        return self.notifyViews(event, args)
 
-    def clearShell(self):
-        os.system('cls' if os.name == 'nt' else 'clear')
+    def notifyViews(self, event, args):
+        for view in self.views:
+            yield from view.notify(event, args)
 
     def begin(self):
-        self.elements['Console'] = 'Beginning Game, Press Enter'
-        print(self.drawScreen())
-        self.enterBreak()
-        self.eventDealCards()
-        self.turn = random.choice(self.turnList)
-        self.elements['Console'] = 'First turn will be {}. Press Enter.' .format(self.players[self.turn].getName())
-        print(self.drawScreen(True))
-        self.enterBreak()
-        self.placeCard()
-        self.elements['P{}Turn'.format(self.turn[-1])] = '\033[93m'
+        return self.drive(self.beginSteps())
+
+    def beginSteps(self):
+        yield from self.emit('begin')
+        yield from self.eventDealCards()
+        self.turn = self.random.choice(self.turnList)
+        yield from self.emit('firstTurn')
+        card = self.placeCard()
+        yield from self.emit('place', card, None)
+        yield from self.emit('turnChange', None, self.turn)
         if self.event == 'wild':
-            self.eventWildCard()
+            yield from self.eventWildCard()
         elif self.event == 'reverse':
-            self.eventReverse()
+            yield from self.eventReverse()
 
     def end(self, gs):
+        return self.drive(self.endSteps(gs))
+
+    def endSteps(self, gs):
         if not self.matchAbort:
             points = 0
-            self.elements['P{}Turn'.format(self.turn[-1])] = ''
-            self.elements['Console'] = '{} Wins! Press Enter to Begin Point Tally'.format(self.players[self.winnerID].getName())
-            print(self.drawScreen())
-            self.enterBreak()
+            yield from self.emit('win')
 
             for identity in self.turnList:
                 if identity != self.winnerID:
                     self.turn = identity
-                    self.elements['HName'] = self.handTitles[self.turn]
-                    self.elements['P{}Turn'.format(self.turn[-1])] = '\033[93m'
+                    yield from self.emit('tallyTurn', identity)
                     while self.players[identity].getCardNum() > 0:
                         card = self.players[identity].removeCard(0)
                         points += card.getPoints()
-                        self.elements['Console'] = '{} Won {} Points!'.format(self.players[self.winnerID].getName(),points)
-
-                        keyStringCards = 'P{}Cards'
-                        self.elements[keyStringCards.format(identity[-1])] = '  '+(' '*(3-len(str(self.players[identity].getCardNum()))))+str(self.players[identity].getCardNum())+' Cards'
-                        self.players[identity].maxScroll = math.ceil((self.players[identity].getCardNum() / 10)-1)
-                        if self.handPosition > self.players[identity].maxScroll:
-                            self.handPosition -= 1
-                        self.buildHandVisual(identity)
-
-                        if self.displayEffects and not self.simulation:
-                            print(self.drawScreen())
-                            time.sleep(.1)
-                    self.elements['P{}Turn'.format(self.turn[-1])] = ''
+                        yield from self.emit('tally', identity, points)
+                    yield from self.emit('turnChange', identity, None)
 
+            self.points = points
             self.players[self.winnerID].addPoints(points)
-            self.elements['Console'] = '{} Won {} Points! Press Enter'.format(self.players[self.winnerID].getName(),points)
-            print(self.drawScreen())
-            self.enterBreak()
+            yield from self.emit('tallyDone', points)
 
+        if gs.scoreStore is not None:
+            gs.scoreStore.recordMatch(self, gs.tableID)
+        yield from self.emit('close')
         gs.clearStaging()
         for identity in self.turnList:
             self.players[identity].discardHand()
             gs.addPlayer(self.players[identity])
         return gs
 
-    def adjustCardAmount(self, playerID):
-        keyStringCards = 'P{}Cards'
-        self.elements[keyStringCards.format(playerID[-1])] = '  '+(' '*(3-len(str(self.players[playerID].getCardNum()))))+str(self.players[playerID].getCardNum())+' Cards'
-        self.players[playerID].maxScroll = math.ceil((self.players[player].getCardNum() / 10)-1)
-        if self.handPosition > self.players[playerID].maxScroll:
-            self.handPosition -= 1
-        self.buildHandVisual(playerID)
+    def run(self, gs):
+        '''Plays the match to completion.
+        Returns {'winner':ID, 'points':tally from end(), 'turns':turns played}.'''
+        self.begin()
+        while not self.matchComplete:
+            self.nextTurn()
+        self.end(gs)
+        return self.getResult()
+
+    def getResult(self):
+        return {'winner':self.winnerID, 'points':self.points, 'turns':self.turnCount, 'seed':self.seed}
+
+    def drive(self, steps):
+        '''Runs a step generator to completion, blocking on each request it yields.
+        Steps yield ('sleep', seconds) to pause an animation or ('input', prompt) to read a line,
+        so other drivers (see asyncmatch.py) can run the same flow without blocking.'''
+        reply = None
+        while True:
+            try:
+                request = steps.send(reply)
+            except StopIteration as stop:
+                return stop.value
+            if request[0] == 'sleep':
+                self.sleep(request[1])
+                reply = None
+            else:
+                reply = self.readInput(request[1])
 
-    def buildHandString(self, playerID):
-        playerName = self.players[playerID].getName()
-        if len(playerName) < 9:
-            self.handTitles[playerID] = "{}'s Hand\t".format(self.players[playerID].getName())
-        else:
-            self.handTitles[playerID] = "{}'s Hand".format(self.players[playerID].getName())
+    def sleep(self, seconds):
+        time.sleep(seconds)
 
-    def buildHandVisual(self, playerID):
-        string ='['
-        for i in range(self.players[playerID].maxScroll+1):
-            if i == self.handPosition:
-                string += '|'
-            else:
-                string += '-'
-        string +=']'
-        self.elements['HVisual'] = string
+    def readInput(self, prompt):
+        return str(input(prompt))
 
     def checkInput(self, playerInput):
         if playerInput == '':
             return {'valid':False,'entry':playerInput}
         if playerInput.isnumeric():
             if int(playerInput)+(10*self.handPosition) < self.players[self.turn].getCardNum():
-                return {'valid':True,'entery':str(int(playerInput)+(10self.handPosition)),'type':'card'}
+                return {'valid':True,'entry':str(int(playerInput)+(10*self.handPosition)),'type':'card'}
             else:
-                self.elements['Error'] = '{} is not a card.'.format(playerInput)
-                return {'valid': False,'entry':playerInput}
+                return {'valid': False,'entry':playerInput,'error':'{} is not a card.'.format(playerInput)}
         else:
             playerInput = playerInput.lower()[0]
             if playerInput in ['<','>','u','d','p','q','s']:
                 return {'valid':True, 'entry':playerInput}
             else:
-                self.elements['Error'] = '{} is not a valid selection.'.format(playerInput)
-                return {'valid':False,'entry':playerInput}
+                return {'valid':False,'entry':playerInput,'error':'{} is not a valid selection.'.format(playerInput)}
 
     def checkColorInput(self, playerInput):
-        if playerInput = '':
+        if playerInput == '':
             return {'valid':False,'entry':playerInput}
         playerInput = str(playerInput).lower()[0]
         if playerInput[0] == 'b':
@@ -916,102 +1955,51 @@ class Match():
         return {'valid':False,'entry':playerInput}
 
     def eventDealCards(self):
-        if self.displayEffects and not self.simulation:
-            self.elements['Console'] = 'Dealing Cards...'
-        for i in ('play1','play2','play3','play4'):
-            if i in self.players:
-                for j in range(7):
-                    j #unused
-                    self.dealCard(i)
-                    if self.displayEffects and not self.simulation:
-                        print(self.drawScreen(True))
-                        time.sleep(.1)
+        yield from self.emit('dealStart')
+        for i in self.turnList:
+            for j in range(7):
+                j #unused
+                self.dealCard(i)
+                yield from self.emit('deal', i)
 
     def eventReverse(self):
-        if self.displayEffects and not self.simulation:
-            hide = False
-            if self.players[self.turn].getType() == "Computer":
-                hide = self.hideComputerHands
-            self.elements['Console'] = "Reverse Card Played! Reversing Turn Order.".format(self.players[self.turn].getName())
-            print(self.drawScreen(hide))
-            time.sleep(1)
-            for i in range(10):
-                cardBigNums = self.pile[0].getBigNum(self.reverse,i)
-                self.elements['oMiddle'] = cardBigNums
-                print(self.drawScreen(hide))
-                if self.displayEffects and not self.simulation:
-                    time.sleep(.1)
-        cardBigNums = self.pile[0].getBigNum(self.reverse,9)
-        self.elements['oMiddle'] = cardBigNums
-        self.reverse = not self.reverse
+        yield from self.emit('reverse')
+        self.reverse = self.ring.reverse()
         self.event = ''
 
     def eventSkip(self):
-        if self.displayEffects and not self.simulation:
-            hide = False
-            if self.players[self.turn].getType() == "Computer":
-                hide = self.hideComputerHands
-            self.elements['Console'] = "Skip Card Placed! Skipping {}'s Turn.".format(self.players[self.turn].getName())
-            print(self.drawScreen(hide))
-            time.sleep(1)
-            for i in range(2):
-                i #unused
-                self.elements['P{}Turn'.format(self.turn[-1])] = '\033[91m'
-                print(self.drawScreen(hide))
-                time.sleep(.3)
-                self.elements['P{}Turn'.format(self.turn[-1])] = ''
-                print(self.drawScreen(hide))
-                time.sleep(.3)
+        yield from self.emit('skip')
         self.turnComplete = True
         self.event = ''
 
     def eventWildCard(self):
-        hide = False
+        chooser = None
         if not self.forcedWild:
+            chooser = self.turn
             if self.players[self.turn].getType() == 'Human':
-                self.elements['Console'] = 'Wild Card! Specifiy a Color: (B)lue, (R)ed, (G)reen, (Y)ellow'
-                self.elements['Error'] = 'Specifiy A Color'
-                print(self.drawScreen())
-                playerInput = str(input("Color Change: "))
+                yield from self.emit('colorPrompt')
+                playerInput = yield ('input', 'Color Change: ')
                 checked = self.checkColorInput(playerInput)
                 while not checked['valid']:
-                    if checked['entry'] == '<':
-                        self.handPosition -= 1
-                        if self.handPosition == -1:
-                            self.handPosition = self.players[self.turn].maxScroll
-                        self.buildHandVisual(self.turn)
-                    elif checked['entry'] == '>':
-                        self.handPosition += 1
-                        if self.handPosition > self.players[self.turn].maxScroll:
-                            self.handPosition = 0
-                        self.buildHandVisual(self.turn)
-                    print(self.drawScreen())
-                    playerInput = str(input("Color Change: "))
+                    if checked['entry'] in ('<', '>'):
+                        yield from self.emit('scroll', checked['entry'])
+                    yield from self.emit('show')
+                    playerInput = yield ('input', 'Color Change: ')
                     checked = self.checkColorInput(playerInput)
             else:
-                hide = self.hideComputerHands
-                checked = self.checkColorInput(self.player[self.turn].getWildColor())
+                checked = self.checkColorInput(self.players[self.turn].getWildColor(self.playerRandom))
             self.wildColorChange = checked['entry']
+            self.log.append(self.turn[-1], '=', self.wildColorChange[0])
         else:
-            self.wildColorChange = self.checkColorInput(random.choice(('r','b','g','y')))['entry']
+            self.wildColorChange = self.checkColorInput(self.random.choice(('r','b','g','y')))['entry']
             self.forcedWild = False
+            self.log.append('0', '=', self.wildColorChange[0])
         self.currentColor = self.wildColorChange
-        self.elements['Error'] = ""
-        if self.displayEffects and not self.simulation:
-            self.elements['Console'] = 'Wild Card! Changing Color.'
-            seed = 1
-            for i in range(10):
-                i #unused
-                if seed > 4:
-                    seed = 1
-                print(self.drawScreen(hide,wildSeed=seed))
-                time.sleep(.1)
-                seed += 1
-        self.pile[0].changeColor(self.wildColorChange)
+        card = self.pile[0].changeColor(self.wildColorChange)
+        if card.isWild():
+            self.pile[0] = card
         self.wildColorChange = ''
-        cardBigNums = self.pile[0].getBigNum(self.reverse)
-        self.elements['oHeader'] = '{}\u2666\u2666\u2666=========\u2666\u2666\u2666\033[0m\t'.format(self.pile[0].getColorCode())
-        self.elements['oHeader'] = cardBigNums
+        yield from self.emit('wild', card, chooser)
         self.event = ''
 
     def eventDraw(self):
@@ -1019,15 +2007,562 @@ class Match():
         self.drawAmount = 0
         self.event = ''
 
-    def dealCard(self. playerID):
-
+    def dealCard(self, playerID):
         card = self.deck.draw()
-        self.players[playerID].addCard(card)
+        player = self.players[playerID]
+        if self.turnCount > 0:
+            self.log.append(playerID[-1], '-', card.cardID)
+            self.tracker.draw(playerID, Card.colorIndex[self.currentColor], player.getForceDraws() > 0)
+        player.addCard(card)
+        if self.deck.size == 0:
+            self.deck.refill(self.pile)
+            self.tracker.reshuffle()
+        return card
+
+    def placeCard(self, card=None):
+        if card == None:
+            ### Used At Beginning For First Card ###
+            card = self.deck.draw()
+            self.log.append('0', '+', card.cardID)
+            self.tracker.place(card.code)
+        else:
+            self.log.append(self.turn[-1], '+', card.cardID)
+            self.tracker.place(card.code, self.turn)
 
-        ### Adjust Hand Visual ###
-        self.players[playerID].maxScroll = math.ceil((self.players[playerID].getCardNum() / 10)-1)
-        self.handPosition = self.players[playerID].maxScroll
-        self.buildHandVisual(playerID)
+        self.currentColor = card.getColor()
+        self.currentValue = card.getValue()
 
-        ### Ajust Player Title ###
-        
+        self.pile.insert(card)
+        self.passes = 0
+
+        if card.isWild():
+            self.event = 'wild'
+
+        if card.getValue() == 'X':
+            self.event = 'skip'
+        elif card.getValue() == 'R':
+            if len(self.ring) == 2:
+                self.event = 'skip'
+            else:
+                self.event = 'reverse'
+        elif card.getValue() == '+2':
+            self.drawAmount = 2
+        elif card.getValue() == '+4':
+            self.drawAmount = 4
+        return card
+
+    def pauseScreen(self):
+        yield from self.emit('pause')
+        playerInput = yield ('input', '\033[97mSelection: \033[92m')
+        yield from self.emit('resume')
+        if playerInput.lower()[:1] == 'q':
+            return 'quit'
+        return 'resume'
+
+    def eventPass(self):
+        self.log.append(self.turn[-1], 's')
+        self.tracker.draw(self.turn, Card.colorIndex[self.currentColor])     # Passing shows the color is lacking too
+        self.turnComplete = True
+        self.players[self.turn].removeForceDraw()
+        self.passes += 1
+        if self.passes == self.passMax:
+            self.forcedWild = True
+            self.event = 'wild'
+            self.passes = 0
+
+    def nextTurn(self):
+        return self.drive(self.turnSteps())
+
+    def turnSteps(self):
+        self.turnComplete = False
+        self.turnCount += 1
+        self.handPosition = 0
+        turnType = self.players[self.turn].getType()
+        self.players[self.turn].beginTurn()
+        if len(self.deck) == 0 and len(self.pile) > 1:
+            self.deck.refill(self.pile)
+            self.tracker.reshuffle()
+            yield from self.emit('reshuffle')
+        yield from self.emit('turn', self.turn)
+
+        if self.event == 'skip':
+            yield from self.eventSkip()
+        elif self.drawAmount > 0:
+            self.eventDraw()
+
+        while not self.turnComplete:
+            if turnType == 'Human':
+                self.players[self.turn].getLegalCards(self.currentColor, self.currentValue, self.zeroChange)
+                if len(self.deck) == 0:
+                    self.players[self.turn].removeForceDraw()
+                yield from self.emit('humanTurn', self.turn)
+                playerInput = yield ('input', '\033[97mSelection: \033[92m')
+                checked = self.checkInput(playerInput)
+                while not checked['valid']:
+                    if 'error' in checked:
+                        yield from self.emit('error', checked['error'])
+                    yield from self.emit('show')
+                    playerInput = yield ('input', '\033[97mSelection: \033[92m')
+                    checked = self.checkInput(playerInput)
+
+                playerInput = checked['entry']
+
+                if playerInput in ('<', '>'):
+                    yield from self.emit('scroll', playerInput)
+                elif playerInput == 'd':
+                    if len(self.deck) > 0:
+                        yield from self.emit('error', '')
+                        self.dealCard(self.turn)
+                        yield from self.emit('draw', self.turn)
+                    else:
+                        yield from self.emit('error', "Cannot Draw. Deck is Empty")
+                elif playerInput in ('p', 'q'):
+                    if playerInput == 'q' or (yield from self.pauseScreen()) == 'quit':
+                        self.log.append(self.turn[-1], 'q')
+                        self.matchComplete = True
+                        self.turnComplete = True
+                        self.winnerID = 'play1'
+                        self.matchAbort = True
+                elif playerInput == 's':
+                    if len(self.deck) > 0:
+                        yield from self.emit('error', "Cannot pass until Deck is empty.")
+                    elif len(self.players[self.turn].getAllValidCards()) > 0:
+                        yield from self.emit('error', "Cannot pass while having playable cards.")
+                    else:
+                        self.eventPass()
+                elif playerInput.isnumeric():
+                    if self.players[self.turn].getForceDraws() == 0:
+                        cardCheck = self.players[self.turn].checkCard(playerInput)
+                        if cardCheck in self.players[self.turn].getAllValidCards():
+                            card = self.players[self.turn].removeCard(playerInput)
+                            self.placeCard(card)
+                            yield from self.emit('place', card, self.turn)
+                            yield from self.emit('error', "")
+                            self.turnComplete = True
+                        else:
+                            yield from self.emit('error', "Card Doesn't Match The Color {} or Value {}!".format(self.currentColor, self.currentValue))
+                    else:
+                        yield from self.emit('error', 'Draw Card Played! Draw {} cards.'.format(self.players[self.turn].getForceDraws()))
+
+            elif turnType == 'Computer':
+                yield from self.emit('computerTurn', self.turn)
+                while True:
+                    yield from self.emit('computerThink')
+                    if self.players[self.turn].getForceDraws() > 0 and len(self.deck) > 0:
+                        cardIndex = 'd'
+                    else:
+                        cardIndex = self.players[self.turn].think(self)
+                    if cardIndex.isnumeric():
+                        card = self.players[self.turn].removeCard(int(cardIndex))
+                        self.placeCard(card)
+                        yield from self.emit('place', card, self.turn)
+                        self.turnComplete = True
+                        break
+                    elif len(self.deck) > 0:
+                        self.dealCard(self.turn)
+                        yield from self.emit('draw', self.turn)
+                    else:
+                        self.eventPass()
+                        break
+
+        if self.players[self.turn].getCardNum() == 0 and not self.matchAbort:
+            self.matchComplete = True
+            self.winnerID = self.turn
+            return
+
+        if self.event == 'reverse':
+            yield from self.eventReverse()
+        elif self.event == 'wild':
+            yield from self.eventWildCard()
+
+        previous = self.turn
+        self.turn = self.getNextTurn()
+        yield from self.emit('turnChange', previous, self.turn)
+
+    def getNextTurn(self, forceReverse=False):
+        '''Returns the seat after the current one, the one before it with 'forceReverse'.'''
+        if forceReverse:
+            return self.ring.getPrevious(self.turn)
+        return self.ring.getNext(self.turn)
+
+    def getPlayer(self, playerID):
+        return self.players[playerID]
+
+    def getState(self):
+        '''Returns a GameState snapshot of the match, see GameState.fromMatch.'''
+        return GameState.fromMatch(self)
+
+class MatchLog():
+    '''Compact append-only record of a Match.
+       'seed' (int) : Match seed
+       'players' (list) : player names in seat order
+       'zeroChange' (bool) : zero change rule in effect
+       'decks' (int) : decks shuffled together, only written when more than one
+
+    Each move is "<seat><op><arg>", seat 1-9 then a-g (GameSettings.seatCodes) or 0 for the match itself.
+    Ops: '+' card placed, '-' card drawn (args are Card.cardID), '=' wild color (r/g/b/y),
+    's' pass, 'q' quit. Initial deals are implied by the seed and not recorded.'''
+
+    def __init__(self, seed, players, zeroChange=False, decks=1):
+        self.seed = seed
+        self.players = list(players)
+        self.zeroChange = zeroChange
+        self.decks = decks
+        self.moves = []
+        self.expected = None                # Moves a replay must reproduce
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __iter__(self):
+        return iter(self.moves)
+
+    def append(self, seat, op, arg=''):
+        move = seat+op+arg
+        if self.expected is not None:
+            index = len(self.moves)
+            if index >= len(self.expected) or self.expected[index] != move:
+                raise ReplayError('Move {}: log has {} but replay made {}'.format(index, self.peek() or 'nothing', move))
+        self.moves.append(move)
+
+    def peek(self):
+        '''Returns the next move a replay must make, None if the log is exhausted.'''
+        if self.expected is not None and len(self.moves) < len(self.expected):
+            return self.expected[len(self.moves)]
+        return None
+
+    def dumps(self):
+        header = {'seed':self.seed, 'players':self.players, 'zeroChange':self.zeroChange}
+        if self.decks != 1:
+            header['decks'] = self.decks
+        header = json.dumps(header)
+        return '{}\n{}\n'.format(header, ' '.join(self.moves))
+
+    @classmethod
+    def loads(cls, text):
+        header, moves = (text.strip('\n').split('\n', 1) + [''])[:2]
+        header = json.loads(header)
+        log = cls(header['seed'], header['players'], header['zeroChange'], header.get('decks', 1))
+        log.moves = moves.split()
+        return log
+
+    def save(self, path):
+        with open(path, 'w') as logFile:
+            logFile.write(self.dumps())
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as logFile:
+            return cls.loads(logFile.read())
+
+class GameState():
+    '''Compact, render-free copy of a Match's rules state. Cards are Card.code ints.
+       'numSeats' (int) : players in the match, seats follow Match.turnList
+       'zeroChange' (bool) : zero change rule in effect
+
+    Actions are card codes to play, with the chosen color index in bits 7-8 for wild
+    cards, or GameState.drawAction / GameState.passAction. apply() runs the rules up to
+    the next decision, push() does the same and can be reverted with undo().'''
+
+    __slots__ = ('hands','deck','pile','top','color','value','turn','reverse','skip','drawAmount',
+                 'forceDraw','passes','numSeats','zeroChange','winner','turnCount','rng','history')
+
+    drawAction = -1
+    passAction = -2
+    forcedColors = (0, 3, 2, 1)         # Color indexes in the order Match picks forced colors (r, b, g, y)
+
+    def __init__(self, numSeats, zeroChange=False):
+        self.hands = [[] for i in range(numSeats)]
+        self.deck = []                  # Draws pop from the end, as Deck.draw
+        self.pile = []                  # Codes under the top card, bottom first
+        self.top = -1                   # Code of the pile's top card, wilds take the chosen color
+        self.color = 0                  # Color index of the current color
+        self.value = 0                  # Value index of the top card
+        self.turn = 0                   # Seat to act
+        self.reverse = False
+        self.skip = False               # Next turn is skipped
+        self.drawAmount = 0             # Cards the next player must draw
+        self.forceDraw = [0]*numSeats
+        self.passes = 0
+        self.numSeats = numSeats
+        self.zeroChange = zeroChange
+        self.winner = -1
+        self.turnCount = 0
+        self.rng = random               # Forced wild colors
+        self.history = []               # Undo records for push()
+
+    @classmethod
+    def fromMatch(cls, match):
+        '''Returns the state of a Match waiting on its current player.'''
+        turnList = match.turnList
+        state = cls(len(turnList), match.zeroChange)
+        state.hands = [[card.code for card in match.players[identity].hand] for identity in turnList]
+        state.deck = [card.code for card in match.deck]
+        pile = match.pile
+        state.pile = [pile[index].code for index in range(len(pile)-1, 0, -1)]
+        if len(pile) > 0:
+            state.top = pile[0].code
+        state.color = Card.colorIndex[match.currentColor]
+        state.value = Card.valueIndex[match.currentValue]
+        state.turn = match.ring.getPosition(match.turn)
+        state.reverse = match.reverse
+        state.skip = match.event == 'skip'
+        state.drawAmount = match.drawAmount
+        state.forceDraw = [match.players[identity].getForceDraws() for identity in turnList]
+        state.passes = match.passes
+        state.turnCount = match.turnCount
+        state.rng = match.random
+        return state
+
+    def clone(self):
+        '''Returns an independent copy, without undo history.'''
+        state = GameState.__new__(GameState)
+        state.hands = [list(hand) for hand in self.hands]
+        state.deck = list(self.deck)
+        state.pile = list(self.pile)
+        state.top = self.top
+        state.color = self.color
+        state.value = self.value
+        state.turn = self.turn
+        state.reverse = self.reverse
+        state.skip = self.skip
+        state.drawAmount = self.drawAmount
+        state.forceDraw = list(self.forceDraw)
+        state.passes = self.passes
+        state.numSeats = self.numSeats
+        state.zeroChange = self.zeroChange
+        state.winner = self.winner
+        state.turnCount = self.turnCount
+        state.rng = self.rng
+        state.history = []
+        return state
+
+    def getActions(self):
+        '''Returns the distinct legal actions for the seat to act.'''
+        color = self.color
+        value = self.value
+        zeroChange = self.zeroChange
+        actions = []
+        seen = 0
+        legal = 0
+        wilds = 0
+        for code in self.hands[self.turn]:
+            if seen >> code & 1:
+                continue
+            seen |= 1 << code
+            if code >> 4 == 4:
+                wilds |= 1 << (code & 15)
+            elif zeroChange and code & 15 == 0:
+                actions.append(code)
+            elif code >> 4 == color or code & 15 == value:
+                actions.append(code)
+                legal += 1
+        if wilds >> Card.wildValue & 1:
+            code = (4 << 4) | Card.wildValue
+            actions += [code | colorIndex << 7 for colorIndex in range(4)]
+        if wilds >> Card.drawFourValue & 1 and legal == 0:
+            code = (4 << 4) | Card.drawFourValue
+            actions += [code | colorIndex << 7 for colorIndex in range(4)]
+        if not actions:
+            actions.append(self.drawAction if self.deck else self.passAction)
+        return actions
+
+    def apply(self, action):
+        '''Plays 'action' for the seat to act and advances to the next decision.'''
+        turn = self.turn
+        if action == -1:
+            self.hands[turn].append(self.deck.pop())
+            if not self.deck:
+                self.refill()
+            return
+        if action == -2:
+            self.forceDraw[turn] = 0
+            self.passes += 1
+            if self.passes == self.numSeats:
+                self.color = self.forcedColors[self.rng.randrange(4)]      # Forced wild
+                if self.top & 15 >= Card.drawFourValue:
+                    self.top = (self.color << 4) | (self.top & 15)
+                self.passes = 0
+            self.nextTurn()
+            return
+
+        code = action & 127
+        hand = self.hands[turn]
+        hand.remove(code)
+        self.passes = 0
+        if self.top >= 0:
+            self.pile.append(self.top)
+        value = code & 15
+        self.value = value
+        if code >> 4 == 4:
+            self.color = action >> 7
+            self.top = (self.color << 4) | value
+        else:
+            self.color = code >> 4
+            self.top = code
+        if not hand:
+            self.winner = turn
+            return
+        if value == Card.skipValue:
+            self.skip = True
+        elif value == Card.reverseValue:
+            if self.numSeats == 2:
+                self.skip = True
+            else:
+                self.reverse = not self.reverse
+        elif value == Card.drawTwoValue:
+            self.drawAmount = 2
+        elif value == Card.drawFourValue:
+            self.drawAmount = 4
+        self.nextTurn()
+
+    def nextTurn(self):
+        '''Moves to the next seat, skipping and force drawing as Match.nextTurn does.'''
+        step = -1 if self.reverse else 1
+        if not self.deck:
+            self.refill()
+        self.turnCount += 1
+        self.turn = (self.turn + step) % self.numSeats
+        if self.skip:
+            self.skip = False
+            self.turnCount += 1
+            self.turn = (self.turn + step) % self.numSeats
+        turn = self.turn
+        if self.drawAmount:
+            self.forceDraw[turn] += self.drawAmount
+            self.drawAmount = 0
+        forceDraw = self.forceDraw[turn]
+        if forceDraw:
+            deck = self.deck
+            hand = self.hands[turn]
+            while forceDraw and deck:
+                hand.append(deck.pop())
+                forceDraw -= 1
+                if not deck:
+                    self.refill()
+                    deck = self.deck
+            self.forceDraw[turn] = forceDraw
+
+    def refill(self):
+        '''Deck.refill: the pile under the top card, wilds uncolored, shuffled into the empty deck.'''
+        if not self.pile:
+            return
+        deck = self.deck
+        for code in self.pile:
+            if code & 15 >= Card.drawFourValue:
+                code = (4 << 4) | (code & 15)
+            deck.append(code)
+        self.pile = []
+        self.rng.shuffle(deck)
+
+    def push(self, action):
+        '''apply() that records what undo() needs to revert it.'''
+        turn = self.turn
+        index = -1
+        if action >= 0:
+            index = self.hands[turn].index(action & 127)
+        deckSize = len(self.deck)
+        pileSize = len(self.pile)
+        snapshot = None
+        if deckSize <= 5 + sum(self.forceDraw):                 # Could run out and refill from the pile
+            snapshot = ([list(hand) for hand in self.hands], list(self.deck), list(self.pile))
+        record = (action, turn, index, self.top, self.color, self.value, self.reverse, self.skip,
+                  self.drawAmount, list(self.forceDraw), self.passes, self.winner, self.turnCount)
+        self.apply(action)
+        drawn = deckSize - len(self.deck) - (action == -1)     # Forced draws at the next turn
+        self.history.append((record, drawn, pileSize, snapshot))
+
+    def undo(self):
+        '''Reverts the last push().'''
+        record, drawn, pileSize, snapshot = self.history.pop()
+        action, turn, index = record[:3]
+        if snapshot is not None:
+            self.hands, self.deck, self.pile = snapshot
+        else:
+            hand = self.hands[self.turn]
+            deck = self.deck
+            for i in range(drawn):
+                deck.append(hand.pop())
+            if action == -1:
+                deck.append(self.hands[turn].pop())
+            elif action >= 0:
+                self.hands[turn].insert(index, action & 127)
+            del self.pile[pileSize:]
+        (self.top, self.color, self.value, self.reverse, self.skip, self.drawAmount,
+         self.forceDraw, self.passes, self.winner, self.turnCount) = record[3:]
+        self.turn = turn
+
+    def rollout(self, policy, maxTurns=1000):
+        '''Plays 'policy(state)' actions to the end of the match, at most 'maxTurns' turns past the
+        current one. Returns the winning seat, -1 if the match was still going.'''
+        limit = self.turnCount + maxTurns
+        while self.winner < 0 and self.turnCount < limit:
+            self.apply(policy(self))
+        return self.winner
+
+class ReplayPlayer(Player):
+    '''Plays the moves recorded for its seat in the Match's log.'''
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.type = 'Computer'
+        self.match = None                   # Set by MatchReplayer
+
+    def think(self, match):
+        move = match.log.peek()
+        if move is None or move[0] != self.id[-1]:
+            raise ReplayError('Move {}: log has {} but it is seat {}\'s turn'.format(len(match.log), move or 'nothing', self.id[-1]))
+        if move[1] == '+':
+            for index, card in enumerate(self.hand):
+                if card.cardID == move[2:]:
+                    return str(index)
+            raise ReplayError('Move {}: {} is not in {}\'s hand'.format(len(match.log), move[2:], self.name))
+        return 'd'
+
+    def getWildColor(self, rng=None):
+        move = self.match.log.peek()
+        if move is None or move[1] != '=':
+            raise ReplayError('Expected a wild color, log has {}'.format(move or 'nothing'))
+        return move[2]
+
+class MatchReplayer():
+    '''Re-executes a MatchLog headless at full speed.
+       'log' (MatchLog) : log to replay'''
+
+    def __init__(self, log):
+        self.log = log
+
+    def replay(self, stopAt=None):
+        '''Replays the log, raising ReplayError at the first move that diverges.
+        Stops at the first turn boundary after 'stopAt' moves when given. Returns the Match.'''
+        gs = GameSettings()
+        gs.computerSimulation = True
+        gs.zeroChange = self.log.zeroChange
+        gs.decks = self.log.decks
+        for name in self.log.players:
+            gs.addPlayer(ReplayPlayer(name))
+        gs.finalizePlayers()
+        match = Match(gs, self.log.seed)
+        match.log.expected = self.log.moves
+        for identity in match.turnList:
+            match.players[identity].match = match
+
+        match.begin()
+        while not match.matchComplete:
+            if stopAt is not None and len(match.log) >= stopAt:
+                return match
+            move = match.log.peek()
+            if move is not None and move[1] == 'q':
+                match.log.append(move[0], 'q')
+                match.matchAbort = True
+                match.matchComplete = True
+                break
+            match.nextTurn()
+        if len(match.log) != len(self.log):
+            raise ReplayError('Replay ended after {} of {} moves'.format(len(match.log), len(self.log)))
+        match.end(gs)
+        return match
+
+    def run(self):
+        match = self.replay()
+        return {'winner':match.winnerID, 'points':match.points, 'turns':match.turnCount, 'seed':match.seed}
@@ -0,0 +1,184 @@
+import sys
+import time
+import sqlite3
+import argparse
+
+class ScoreStore():
+    '''Players, match results and cumulative points kept in a SQLite database in WAL mode.
+       'path' (string) : database file, ':memory:' for a throwaway store
+       'batchSize' (int) : finished matches queued before they are written in one transaction
+       'timeout' (float) : seconds to wait for another process's write lock
+
+    Match.end queues each match through GameSettings.scoreStore, server.GameServer calls
+    recordMatch itself from a worker thread. Every match is one row plus one update per seat,
+    written together, never per tallied card. In WAL mode, leaderboards read from other
+    processes do not block the tables writing.'''
+
+    schema = '''
+        CREATE TABLE IF NOT EXISTS players (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            points INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            matches INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (name, kind));
+        CREATE INDEX IF NOT EXISTS playersByPoints ON players (points DESC, wins DESC);
+        CREATE INDEX IF NOT EXISTS playersByWins ON players (wins DESC, points DESC);
+        CREATE INDEX IF NOT EXISTS playersByKind ON players (kind, points DESC, wins DESC);
+        CREATE INDEX IF NOT EXISTS playersByKindWins ON players (kind, wins DESC, points DESC);
+        CREATE TABLE IF NOT EXISTS matches (
+            id INTEGER PRIMARY KEY,
+            seed INTEGER,
+            tableID INTEGER,
+            winner INTEGER REFERENCES players (id),
+            points INTEGER NOT NULL,
+            turns INTEGER NOT NULL,
+            aborted INTEGER NOT NULL,
+            finished REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS seats (
+            match INTEGER NOT NULL REFERENCES matches (id),
+            seat INTEGER NOT NULL,
+            player INTEGER NOT NULL REFERENCES players (id),
+            won INTEGER NOT NULL,
+            PRIMARY KEY (match, seat));
+        CREATE INDEX IF NOT EXISTS seatsByPlayer ON seats (player, match DESC);
+    '''
+
+    orders = {'points':'points DESC, wins DESC', 'wins':'wins DESC, points DESC'}      # Leaderboard order : ORDER BY
+
+    def __init__(self, path, batchSize=1, timeout=5.0):
+        self.path = path
+        self.batchSize = max(1, batchSize)
+        self.connection = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                          check_same_thread=False)     # Callers keep to one thread at a time
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')        # WAL stays consistent, only the last commits can be lost on power failure
+        self.connection.executescript(self.schema)
+        self.pending = []                   # Match rows waiting for flush()
+        self.playerIDs = {}                 # (name, kind) : players.id
+
+    ### -\/-  Writing  -\/- ###
+
+    def recordMatch(self, match, tableID=None):
+        '''Queues a finished Match, writing the queue once it holds 'batchSize' matches.'''
+        seats = []
+        for seat, identity in enumerate(match.turnList):
+            player = match.players[identity]
+            won = identity == match.winnerID and not match.matchAbort
+            seats.append((player.getName(), player.getType(), seat, won))
+        self.pending.append((match.seed, tableID, match.points, match.turnCount, match.matchAbort, time.time(), seats))
+        if len(self.pending) >= self.batchSize:
+            self.flush()
+
+    def flush(self):
+        '''Writes every queued match in one transaction.'''
+        if not self.pending:
+            return
+        cursor = self.connection.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            for seed, tableID, points, turns, aborted, finished, seats in self.pending:
+                winner = None
+                rows = []
+                for name, kind, seat, won in seats:
+                    playerID = self.getPlayerID(cursor, name, kind)
+                    if won:
+                        winner = playerID
+                    rows.append((seat, playerID, int(won)))
+                cursor.execute('INSERT INTO matches (seed, tableID, winner, points, turns, aborted, finished) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (seed, tableID, winner, points, turns, int(aborted), finished))
+                matchID = cursor.lastrowid
+                cursor.executemany('INSERT INTO seats (match, seat, player, won) VALUES (?, ?, ?, ?)',
+                                   [(matchID, seat, playerID, won) for seat, playerID, won in rows])
+                cursor.executemany('UPDATE players SET points = points + ?, wins = wins + ?, matches = matches + 1 WHERE id = ?',
+                                   [(points if won else 0, won, playerID) for seat, playerID, won in rows])
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            self.playerIDs.clear()          # Ids inserted by the rolled back transaction are gone
+            raise
+        self.pending = []
+
+    def getPlayerID(self, cursor, name, kind):
+        key = (name, kind)
+        playerID = self.playerIDs.get(key)
+        if playerID is None:
+            cursor.execute('INSERT OR IGNORE INTO players (name, kind) VALUES (?, ?)', key)
+            playerID = cursor.execute('SELECT id FROM players WHERE name = ? AND kind = ?', key).fetchone()[0]
+            self.playerIDs[key] = playerID
+        return playerID
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    ### -\/-  Reading  -\/- ###
+
+    def getPlayer(self, name, kind='Human'):
+        '''Returns {'name', 'kind', 'points', 'wins', 'matches'}, None for an unknown player.'''
+        row = self.connection.execute('SELECT name, kind, points, wins, matches FROM players WHERE name = ? AND kind = ?', (name, kind)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('name', 'kind', 'points', 'wins', 'matches'), row))
+
+    def getPoints(self, name, kind='Human'):
+        player = self.getPlayer(name, kind)
+        return player['points'] if player else 0
+
+    def getLeaderboard(self, limit=10, order='points', kind=None):
+        '''Returns the top 'limit' players as dicts with their 'rank', read straight off an index.
+           'order' (string) : 'points' or 'wins'
+           'kind' (string) : only 'Human' or 'Computer' players when given'''
+        query = 'SELECT name, kind, points, wins, matches FROM players'
+        parameters = ()
+        if kind is not None:
+            query += ' WHERE kind = ?'
+            parameters = (kind,)
+        query += ' ORDER BY {} LIMIT ?'.format(self.orders[order])
+        rows = self.connection.execute(query, parameters + (limit,)).fetchall()
+        return [dict(zip(('rank', 'name', 'kind', 'points', 'wins', 'matches'), (rank+1,)+row)) for rank, row in enumerate(rows)]
+
+    def getHistory(self, name, kind='Human', limit=20):
+        '''Returns the player's last 'limit' matches, newest first.'''
+        rows = self.connection.execute('''
+            SELECT matches.id, matches.seed, matches.tableID, seats.won, matches.points, matches.turns, matches.aborted, matches.finished
+            FROM players JOIN seats ON seats.player = players.id JOIN matches ON matches.id = seats.match
+            WHERE players.name = ? AND players.kind = ? ORDER BY seats.match DESC LIMIT ?''', (name, kind, limit)).fetchall()
+        return [dict(zip(('match', 'seed', 'tableID', 'won', 'points', 'turns', 'aborted', 'finished'), row)) for row in rows]
+
+    @staticmethod
+    def formatLeaderboard(rows):
+        output = ''
+        for row in rows:
+            output += '{:>4}. {:<11} {:<8} {:>10} points {:>7} wins {:>7} matches\n'.format(
+                row['rank'], row['name'], row['kind'], row['points'], row['wins'], row['matches'])
+        return output
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show the leaderboard or a player\'s history from a score database.')
+    parser.add_argument('database')
+    parser.add_argument('-n', '--limit', type=int, default=10)
+    parser.add_argument('--order', default='points', choices=sorted(ScoreStore.orders))
+    parser.add_argument('--kind', choices=('Human', 'Computer'))
+    parser.add_argument('--player', help='show this player\'s recent matches instead')
+    args = parser.parse_args(argv)
+
+    store = ScoreStore(args.database)
+    if args.player:
+        player = store.getPlayer(args.player, args.kind or 'Human')
+        if player is None:
+            sys.stdout.write('No player named {}\n'.format(args.player))
+            return 1
+        sys.stdout.write('{name} ({kind}): {points} points, {wins} wins in {matches} matches\n'.format(**player))
+        for row in store.getHistory(args.player, args.kind or 'Human', args.limit):
+            sys.stdout.write('  match {:>7}  table {:>4}  {:<4} {:>5} points {:>4} turns {}\n'.format(
+                row['match'], row['tableID'] if row['tableID'] is not None else '-', 'won' if row['won'] else 'lost',
+                row['points'] if row['won'] else 0, row['turns'], time.strftime('%Y-%m-%d %H:%M', time.localtime(row['finished']))))
+    else:
+        sys.stdout.write(store.formatLeaderboard(store.getLeaderboard(args.limit, args.order, args.kind)))
+    store.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import sys
+import math
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from pyton import GameSettings, ComputerPlayer, Card, Match, GameState
+
+colorNames = ('red','yellow','green','blue')        # Card.colorIndex order
+
+def rolloutPolicy(state):
+    '''Returns a random legal colored card, else a wild in the most held color, else draw or pass.'''
+    color = state.color
+    value = state.value
+    zeroChange = state.zeroChange
+    hand = state.hands[state.turn]
+    legal = []
+    wild = -1
+    for code in hand:
+        if code >> 4 == 4:
+            if wild < 0 or code & 15 == Card.wildValue:
+                wild = code
+        elif code >> 4 == color or code & 15 == value or (zeroChange and code & 15 == 0):
+            legal.append(code)
+    if legal:
+        return legal[state.rng.randrange(len(legal))]
+    if wild < 0:
+        return GameState.drawAction if state.deck else GameState.passAction
+    colorCounts = [0, 0, 0, 0, 0]
+    for code in hand:
+        colorCounts[code >> 4] += 1
+    return wild | colorCounts.index(max(colorCounts[:4])) << 7
+
+class InformationSet():
+    '''What one seat knows about a Match: its own hand, every hand size, the deck size
+    and the cards it has not seen. determinize() deals the unseen cards at random.'''
+
+    __slots__ = ('state','seat','sizes','unseen')
+
+    @classmethod
+    def fromMatch(cls, match, player):
+        infoSet = cls.__new__(cls)
+        infoSet.seat = match.ring.getPosition(player.id)
+        state = infoSet.state = match.getState()
+        infoSet.sizes = [len(hand) for hand in state.hands]
+        state.hands = [[] for hand in state.hands]          # Only the player's own hand is known
+        state.hands[infoSet.seat] = [card.code for card in player.hand]
+        state.deck = []
+        state.rng = None
+        infoSet.unseen = match.tracker.getUnseenCodes(player.hand)
+        return infoSet
+
+    def determinize(self, rng):
+        '''Returns a GameState with the unseen cards dealt to the other hands and the deck.'''
+        pool = list(self.unseen)
+        rng.shuffle(pool)
+        state = self.state.clone()
+        start = 0
+        for seat, size in enumerate(self.sizes):
+            if seat != self.seat:
+                state.hands[seat] = pool[start:start+size]
+                start += size
+        state.deck = pool[start:]
+        state.rng = rng
+        return state
+
+class SearchNode():
+
+    __slots__ = ('action','parent','seat','children','visits','avails','wins')
+
+    def __init__(self, action=None, parent=None, seat=-1):
+        self.action = action
+        self.parent = parent
+        self.seat = seat                # Seat that made 'action'
+        self.children = {}              # Action : SearchNode
+        self.visits = 0
+        self.avails = 1                 # Times this action was legal when its parent was visited
+        self.wins = 0                   # Rollouts won by 'seat', unfinished ones count an even share
+
+class SearchTree():
+    '''Single observer information set Monte Carlo tree search.
+       'infoSet' (InformationSet) : root position
+       'rng' (random.Random) : determinizations and rollouts
+       'exploration' (float) : UCB exploration constant'''
+
+    def __init__(self, infoSet, rng, exploration=0.7, maxTurns=1000):
+        self.infoSet = infoSet
+        self.rng = rng
+        self.exploration = exploration
+        self.maxTurns = maxTurns            # Turns a rollout may play past the position it starts from
+        self.root = SearchNode()
+        self.unfinished = 0                 # Rollouts that hit maxTurns without a winner
+
+    def iterate(self):
+        state = self.infoSet.determinize(self.rng)
+        node = self.root
+        exploration = self.exploration
+
+        ### Select / Expand ###
+        while state.winner < 0:
+            actions = state.getActions()
+            children = node.children
+            untried = []
+            best = None
+            bestScore = -1.0
+            for action in actions:
+                child = children.get(action)
+                if child is None:
+                    untried.append(action)
+                    continue
+                child.avails += 1
+                score = child.wins/child.visits + exploration*math.sqrt(math.log(child.avails)/child.visits)
+                if score > bestScore:
+                    best = child
+                    bestScore = score
+            if untried:
+                action = untried[self.rng.randrange(len(untried))]
+                node = children[action] = SearchNode(action, node, state.turn)
+                state.apply(action)
+                break
+            node = best
+            state.apply(node.action)
+
+        ### Rollout / Backpropagate ###
+        winner = state.rollout(rolloutPolicy, self.maxTurns)
+        reward = 1
+        if winner < 0:
+            self.unfinished += 1
+            winner = None
+            reward = 1 / state.numSeats     # No winner, every seat gets an even share rather than a loss
+        while node is not None:
+            node.visits += 1
+            if winner is None or node.seat == winner:
+                node.wins += reward
+            node = node.parent
+
+    def search(self, iterations, timeLimit=None):
+        '''Runs until 'iterations' rollouts or 'timeLimit' seconds, returns {action:visits} at the root.'''
+        deadline = None
+        if timeLimit is not None:
+            deadline = time.perf_counter() + timeLimit
+        for i in range(iterations):
+            self.iterate()
+            if deadline is not None and i & 15 == 15 and time.perf_counter() > deadline:
+                break
+        return {action:child.visits for action, child in self.root.children.items()}
+
+def searchRoot(infoSet, iterations, timeLimit, seed, exploration):
+    '''Worker entry point, one independent tree per call.'''
+    return SearchTree(infoSet, random.Random(seed), exploration).search(iterations, timeLimit)
+
+class SearchComputerPlayer(ComputerPlayer):
+    ''''name' (string) : player name
+       'iterations' (int) : rollouts per move, split across workers
+       'timeLimit' (float) : seconds per move, None for no limit
+       'workers' (int) : independent root searches, merged by visit count
+       'executor' (Executor) : runs root searches (e.g. ProcessPoolExecutor), None runs them in turn
+       'exploration' (float) : UCB exploration constant'''
+
+    def __init__(self, name, iterations=1000, timeLimit=None, workers=1, executor=None, exploration=0.7):
+        super().__init__(name)
+        self.iterations = iterations
+        self.timeLimit = timeLimit
+        self.workers = max(1, workers)
+        self.executor = executor
+        self.exploration = exploration
+        self.wildColor = None           # Color picked by the search for the wild being played
+
+    def search(self, infoSet, rng):
+        '''Returns the most visited root action over all workers' trees.'''
+        iterations = max(1, self.iterations // self.workers)
+        seeds = [rng.getrandbits(32) for i in range(self.workers)]
+        if self.executor is None:
+            results = [searchRoot(infoSet, iterations, self.timeLimit, seed, self.exploration) for seed in seeds]
+        else:
+            futures = [self.executor.submit(searchRoot, infoSet, iterations, self.timeLimit, seed, self.exploration) for seed in seeds]
+            results = [future.result() for future in futures]
+        visits = {}
+        for result in results:
+            for action in result:
+                visits[action] = visits.get(action, 0) + result[action]
+        return max(sorted(visits), key=visits.get)
+
+    def think(self, match):
+        infoSet = InformationSet.fromMatch(match, self)
+        actions = infoSet.state.getActions()
+        if len(actions) == 1:
+            action = actions[0]
+        else:
+            action = self.search(infoSet, match.playerRandom)
+        if action < 0:
+            return 'd'              # Match passes when the deck is empty
+        code = action & 127
+        if code >> 4 == 4:
+            self.wildColor = colorNames[action >> 7]
+        card = self.hand.getFace(code)
+        self.colorsInHand[card.color] -= 1
+        return str(self.hand.indexCard(card))
+
+    def getWildColor(self, rng=None):
+        if self.wildColor is not None:
+            color = self.wildColor
+            self.wildColor = None
+            return color
+        return ComputerPlayer.getWildColor(self, rng)
+
+def playMatch(seed, numPlayers=4, iterations=1000, timeLimit=None, workers=1, executor=None):
+    '''Plays a SearchComputerPlayer in seat 1 against ComputerPlayers, returns the dict from Match.run.'''
+    gs = GameSettings()
+    gs.computerSimulation = True
+    gs.addPlayer(SearchComputerPlayer('Search', iterations, timeLimit, workers, executor))
+    for i in range(numPlayers-1):
+        i #unused
+        gs.addPlayer(ComputerPlayer(gs.getComputerName()))
+    gs.finalizePlayers()
+    return Match(gs, seed).run(gs)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Play SearchComputerPlayer against ComputerPlayers.')
+    parser.add_argument('-n', '--matches', type=int, default=50)
+    parser.add_argument('-p', '--players', type=int, default=4, choices=range(2, GameSettings.maxPlayers+1), metavar='{2-16}')
+    parser.add_argument('-i', '--iterations', type=int, default=1000)
+    parser.add_argument('-t', '--time', type=float, default=None)
+    parser.add_argument('-w', '--workers', type=int, default=1)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    executor = ProcessPoolExecutor(args.workers) if args.workers > 1 else None
+    wins = 0
+    start = time.perf_counter()
+    try:
+        for i in range(args.matches):
+            result = playMatch(args.seed+i, args.players, args.iterations, args.time, args.workers, executor)
+            wins += result['winner'] == 'play1'
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    elapsed = time.perf_counter() - start
+    sys.stdout.write('Search won {} of {} ({:.1%}, even share {:.1%}) in {:.1f}s\n'.format(
+        wins, args.matches, wins/max(1, args.matches), 1/args.players, elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import sys
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from pyton import GameSettings, Player, ComputerPlayer, Match
+from asyncmatch import AsyncMatch
+from scores import ScoreStore
+
+class Table():
+    '''One game table. Keeps its GameSettings and players between matches so scores carry over.
+       'tableID' (int) : table number'''
+
+    def __init__(self, tableID):
+        self.tableID = tableID
+        self.gs = GameSettings()
+        self.gs.tableID = tableID
+        self.match = None               # Last Match played
+        self.matches = 0                # Matches played since the table was last seated
+
+    def seat(self, name, opponents, speed='fast', points=0):
+        '''Seats a human player, starting from 'points', and 'opponents' ComputerPlayers for a new session.'''
+        gs = self.gs
+        gs.clearStaging()
+        gs.players.clear()
+        gs.computerSpeed = speed
+        player = Player(name)
+        player.addPoints(points)
+        gs.addPlayer(player)
+        for i in range(opponents):
+            i #unused
+            gs.addPlayer(ComputerPlayer(gs.getComputerName()))
+        self.matches = 0
+
+    def clear(self):
+        '''Drops the session's players so the table can be pooled.'''
+        self.gs.clearStaging()
+        self.gs.players.clear()
+        self.match = None
+        self.matches = 0
+
+    async def play(self, reader, writer, idleTimeout=None, seed=None):
+        '''Plays one match on the connection, returns the dict from Match.run.'''
+        gs = self.gs
+        gs.finalizePlayers()
+        self.matches += 1
+        self.match = Match(gs, seed)
+        return await AsyncMatch(self.match, reader, writer, idleTimeout).run(gs)
+
+class TablePool():
+    '''Hands out Tables, reusing released ones.
+       'maxTables' (int) : tables in use at once, further connections are turned away
+       'maxIdle' (int) : released tables kept for reuse'''
+
+    def __init__(self, maxTables=500, maxIdle=64):
+        self.maxTables = maxTables
+        self.maxIdle = maxIdle
+        self.idle = []
+        self.active = 0
+        self.created = 0
+
+    def acquire(self):
+        '''Returns a Table, None if the server is full.'''
+        if self.active >= self.maxTables:
+            return None
+        self.active += 1
+        if self.idle:
+            return self.idle.pop()
+        self.created += 1
+        return Table(self.created)
+
+    def release(self, table):
+        self.active -= 1
+        table.clear()
+        if len(self.idle) < self.maxIdle:
+            self.idle.append(table)
+
+class GameServer():
+    '''Telnet-style server, one Table per connection.
+       'host' (string), 'port' (int) : address to listen on, port 0 picks a free one
+       'pool' (TablePool) : tables to seat connections at
+       'idleTimeout' (float) : seconds a player may take per prompt before the table is closed
+       'speed' (string) : ComputerPlayer speed (slow, normal, fast)
+       'store' (ScoreStore) : records every table's matches and serves the leaderboard
+
+    Store calls block on SQLite, so they run one at a time on the store's own thread
+    and a slow commit only holds up the table waiting for it.'''
+
+    def __init__(self, host='127.0.0.1', port=8023, pool=None, idleTimeout=300, speed='fast', store=None):
+        self.host = host
+        self.port = port
+        self.pool = pool or TablePool()
+        self.idleTimeout = idleTimeout
+        self.speed = speed
+        self.store = store
+        self.storeThread = ThreadPoolExecutor(1, 'scores') if store is not None else None
+        self.server = None
+        self.results = 0                # Matches completed on all tables
+
+    async def ask(self, reader, writer, prompt):
+        writer.write('\033[97m{}\033[0m'.format(prompt).encode())
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), self.idleTimeout)
+        if not line:
+            raise EOFError('Connection closed')
+        return AsyncMatch.telnetPattern.sub(b'', line).decode(errors='replace').strip()
+
+    async def callStore(self, method, *args):
+        '''Runs a ScoreStore method on the store's thread.'''
+        return await asyncio.get_running_loop().run_in_executor(self.storeThread, method, *args)
+
+    async def showLeaderboard(self, writer, limit=5):
+        if self.store is None:
+            return
+        rows = await self.callStore(self.store.getLeaderboard, limit, 'points', 'Human')
+        if rows:
+            text = '\r\nLeaderboard\r\n' + self.store.formatLeaderboard(rows).replace('\n', '\r\n')
+            writer.write('\033[97m{}\033[0m'.format(text).encode())
+            await writer.drain()
+
+    async def handle(self, reader, writer):
+        table = self.pool.acquire()
+        if table is None:
+            writer.write(b'Server full, try again later.\r\n')
+            await writer.drain()
+            writer.close()
+            return
+        try:
+            name = (await self.ask(reader, writer, 'Name: '))[:11] or 'Player'
+            opponents = await self.ask(reader, writer, 'Computer opponents (1-{}): '.format(GameSettings.maxPlayers-1))
+            opponents = int(opponents) if opponents.isdigit() and 1 <= int(opponents) < GameSettings.maxPlayers else 1
+            points = 0
+            if self.store is not None:
+                points = await self.callStore(self.store.getPoints, name)
+            table.seat(name, opponents, self.speed, points)
+            while True:
+                await table.play(reader, writer, self.idleTimeout)
+                self.results += 1
+                if self.store is not None:
+                    await self.callStore(self.store.recordMatch, table.match, table.tableID)
+                if table.match.matchAbort or reader.at_eof():
+                    break
+                await self.showLeaderboard(writer)
+                again = await self.ask(reader, writer, '\r\nPlay again? (Y/n): ')
+                if again.lower()[:1] == 'n':
+                    break
+            writer.write(b'\033[0mThanks for playing.\r\n')
+            await writer.drain()
+        except (EOFError, ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.pool.release(table)
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serveForever(self):
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        '''Waits for queued store calls, the store itself is left open.'''
+        if self.storeThread is not None:
+            self.storeThread.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Host Uno tables over TCP, connect with telnet or nc.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8023)
+    parser.add_argument('-t', '--tables', type=int, default=500)
+    parser.add_argument('--idle', type=float, default=300)
+    parser.add_argument('--speed', default='fast', choices=('slow','normal','fast'))
+    parser.add_argument('--db', help='SQLite score database shared by every table (see scores.py)')
+    args = parser.parse_args(argv)
+
+    store = ScoreStore(args.db) if args.db else None
+    server = GameServer(args.host, args.port, TablePool(args.tables), args.idle, args.speed, store)
+    sys.stdout.write('Serving on {}:{}\n'.format(args.host, args.port))
+    try:
+        asyncio.run(server.serveForever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if store is not None:
+            store.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+import sys
+import asyncio
+import argparse
+
+from pyton import GameSettings, Terminal, ScreenRenderer, MatchView, Match
+from asyncmatch import AsyncMatch, newComputerGame
+
+class Spectator():
+    '''One viewer of a Broadcaster. Frames wait in a bounded queue; when it is full new frames
+    are dropped and the viewer is sent a full frame once there is room again, so a slow
+    connection only ever costs itself frames.
+       'broadcaster' (Broadcaster) : frames to watch
+       'queueSize' (int) : frames held before dropping'''
+
+    def __init__(self, broadcaster, queueSize=32):
+        self.broadcaster = broadcaster
+        self.queue = asyncio.Queue(queueSize)
+        self.stale = True                   # Missed a frame, the next one sent must be full
+        self.dropped = 0
+        self.closed = False
+
+    def offer(self, data):
+        '''Queues encoded frame 'data' without blocking, dropping it if the queue is full.'''
+        if self.queue.full():
+            self.stale = True
+            self.dropped += 1
+            return
+        if self.stale:
+            data = self.broadcaster.getKeyframe()
+            self.stale = False
+        self.queue.put_nowait(data)
+
+    async def pump(self, writer):
+        '''Writes queued frames to 'writer' until close() or the connection drops.'''
+        try:
+            while not self.closed:
+                if self.stale and self.queue.empty() and self.broadcaster.frame is not None:
+                    self.stale = False
+                    data = self.broadcaster.getKeyframe()      # Caught up, show the frame it missed
+                else:
+                    data = await self.queue.get()
+                if data is None:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.broadcaster.unsubscribe(self)
+
+    def close(self):
+        self.closed = True
+        if not self.queue.full():
+            self.queue.put_nowait(None)
+
+class Broadcaster():
+    '''Fans one Match's screen out to any number of Spectators. Each frame is drawn once by the
+    match's MatchView, diffed against the last frame once and encoded once, the same bytes are
+    then queued for every spectator.
+       'hideHands' (bool) : draw every hand face down, the public view; otherwise the view's own
+                            hiding (hideComputerHands) applies
+       'newline' (string) : line ending sent, '\\r\\n' for telnet style clients
+       'queueSize' (int) : frames each spectator may fall behind before frames are dropped'''
+
+    def __init__(self, hideHands=True, newline='\r\n', queueSize=32):
+        self.hideHands = hideHands
+        self.newline = newline
+        self.queueSize = queueSize
+        self.renderer = ScreenRenderer(Terminal(self, False))
+        self.spectators = []
+        self.output = []                    # Text the renderer wrote for the current frame
+        self.frame = None                   # Last frame published
+        self.keyframe = None                # Encoded full copy of 'frame', built when someone needs it
+        self.frames = 0
+
+    ### -\/-  Terminal Stream  -\/- ###
+
+    def write(self, text):
+        self.output.append(text)
+
+    def flush(self):
+        pass
+
+    ### -\/-  Publishing  -\/- ###
+
+    def encode(self, text):
+        return text.replace('\n', self.newline).encode()
+
+    def publish(self, frame):
+        '''Encodes 'frame' once and offers it to every spectator.'''
+        self.frame = frame
+        self.keyframe = None
+        self.frames += 1
+        if not self.spectators:
+            self.renderer.reset()           # Nobody to diff for, the next watcher starts from a full frame
+            return
+        self.renderer.render(frame)
+        data = self.encode(''.join(self.output))
+        self.output = []
+        for spectator in self.spectators:
+            spectator.offer(data)
+
+    def getKeyframe(self):
+        '''Returns the last frame encoded in full, shared by every spectator catching up on it.'''
+        if self.keyframe is None:
+            self.keyframe = self.encode(Terminal.clearSequence + (self.frame or '') + '\n')
+        return self.keyframe
+
+    def subscribe(self, queueSize=None):
+        '''Returns a new Spectator, sent the current frame in full straight away.'''
+        spectator = Spectator(self, queueSize or self.queueSize)
+        self.spectators.append(spectator)
+        if self.frame is not None:
+            spectator.offer(self.getKeyframe())
+        return spectator
+
+    def unsubscribe(self, spectator):
+        if spectator in self.spectators:
+            self.spectators.remove(spectator)
+
+    def close(self):
+        for spectator in list(self.spectators):
+            spectator.close()
+
+class SpectatorView(MatchView):
+    '''MatchView with no screen of its own, every frame goes to its Broadcaster. Prompts for
+    Enter become pauses so an unattended match keeps playing.
+       'pause' (float) : seconds an Enter prompt is shown'''
+
+    def __init__(self, match, gs, broadcaster, pause=2):
+        super().__init__(match, gs)
+        self.broadcaster = broadcaster
+        self.altScreen = False
+        self.pause = pause
+
+    def enterBreak(self):
+        yield ('sleep', self.pause)
+
+    def showScreen(self, hide=False, wildSeed=0):
+        self.broadcaster.publish(self.drawScreen(hide or self.broadcaster.hideHands, wildSeed))
+
+class ShowcaseServer():
+    '''Plays animated ComputerPlayer matches back to back and streams them to every connection.
+       'host' (string), 'port' (int) : address to listen on, port 0 picks a free one
+       'numPlayers' (int) : ComputerPlayers per match
+       'speed' (string) : ComputerPlayer speed (slow, normal, fast)
+       'broadcaster' (Broadcaster) : frames and their spectators'''
+
+    def __init__(self, host='127.0.0.1', port=8024, numPlayers=4, speed='normal', broadcaster=None):
+        self.host = host
+        self.port = port
+        self.numPlayers = numPlayers
+        self.speed = speed
+        self.broadcaster = broadcaster or Broadcaster()
+        self.server = None
+        self.matches = 0
+
+    async def handle(self, reader, writer):
+        spectator = self.broadcaster.subscribe()
+        try:
+            await spectator.pump(writer)
+        finally:
+            writer.close()
+
+    async def playMatch(self, seed=None):
+        gs = newComputerGame(self.numPlayers, self.speed, True)
+        gs.hideComputerHands = self.broadcaster.hideHands
+        match = Match(gs, seed)
+        match.subscribe(SpectatorView(match, gs, self.broadcaster))
+        result = await AsyncMatch(match).run(gs)
+        self.matches += 1
+        return result
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serveForever(self, seed=None):
+        await self.start()
+        async with self.server:
+            while True:
+                await self.playMatch(None if seed is None else seed+self.matches)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream ComputerPlayer matches to any number of viewers, connect with telnet or nc.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8024)
+    parser.add_argument('-p', '--players', type=int, default=4, choices=range(2, GameSettings.maxPlayers+1), metavar='{2-16}')
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    parser.add_argument('--speed', default='normal', choices=('slow','normal','fast'))
+    parser.add_argument('--queue', type=int, default=32, help='frames a viewer may fall behind before frames are dropped')
+    parser.add_argument('--show-hands', action='store_true', help='show the current player\'s hand instead of the public view')
+    args = parser.parse_args(argv)
+
+    server = ShowcaseServer(args.host, args.port, args.players, args.speed, Broadcaster(not args.show_hands, queueSize=args.queue))
+    sys.stdout.write('Streaming on {}:{}\n'.format(args.host, args.port))
+    try:
+        asyncio.run(server.serveForever(args.seed))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
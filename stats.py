@@ -0,0 +1,320 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+
+### Match Log Moves ###
+# MatchLog moves are seat + op + arg: '2+R6' plays a red 6, '3-G2' draws, '1=r' picks a wild
+# color (seat 0 for a forced color after every seat passed). '$' is the +4 card's ID.
+
+colorNames = {'r':'red', 'y':'yellow', 'g':'green', 'b':'blue'}
+
+def wilsonInterval(wins, trials, z=1.96):
+    '''Returns the (low, high) Wilson score interval for a win rate, 95% by default.'''
+    if trials == 0:
+        return (0.0, 1.0)
+    rate = wins / trials
+    denominator = 1 + z*z/trials
+    center = (rate + z*z/(2*trials)) / denominator
+    spread = z*math.sqrt(rate*(1-rate)/trials + z*z/(4*trials*trials)) / denominator
+    return (max(0.0, center-spread), min(1.0, center+spread))
+
+class RunningStats():
+    '''Count, mean, variance, min and max of a stream of numbers in constant memory.
+    Updated with Welford's method, merged with Chan's parallel formula.'''
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0                   # Sum of squared differences from the mean
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.min, self.max = other.count, other.mean, other.m2, other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta*delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def getVariance(self):
+        '''Sample variance, 0 with fewer than two values.'''
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count-1)
+
+    def getStdDev(self):
+        return math.sqrt(self.getVariance())
+
+    def asDict(self):
+        return {'count':self.count, 'mean':self.mean, 'm2':self.m2, 'min':self.min, 'max':self.max}
+
+    @classmethod
+    def fromDict(cls, data):
+        stats = cls()
+        stats.count, stats.mean, stats.m2, stats.min, stats.max = data['count'], data['mean'], data['m2'], data['min'], data['max']
+        return stats
+
+class Histogram():
+    '''Fixed width bins from 0, values past the last bin land in an overflow bin.
+       'width' (int) : bin width
+       'bins' (int) : bins before the overflow bin'''
+
+    def __init__(self, width, bins):
+        self.width = width
+        self.counts = [0]*(bins+1)
+
+    def add(self, value):
+        index = int(value // self.width)
+        self.counts[min(max(index, 0), len(self.counts)-1)] += 1
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        return self
+
+    def getQuantile(self, fraction):
+        '''Returns the upper edge of the bin holding the 'fraction' quantile, None past the last bin.'''
+        target = fraction * sum(self.counts)
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= target and count:
+                if index == len(self.counts)-1:
+                    return None
+                return (index+1) * self.width
+        return 0
+
+    def asDict(self):
+        return {'width':self.width, 'counts':list(self.counts)}
+
+    @classmethod
+    def fromDict(cls, data):
+        histogram = cls(data['width'], len(data['counts'])-1)
+        histogram.counts = list(data['counts'])
+        return histogram
+
+class PlayerStats():
+    '''Totals for one ComputerPlayer configuration over every seat it played.'''
+
+    def __init__(self):
+        self.seats = 0                  # Seats played, a match with two copies counts twice
+        self.wins = 0
+        self.points = RunningStats()    # Points per win
+        self.draws = RunningStats()     # Cards drawn per seat and match
+        self.drawFours = 0              # +4 cards played
+        self.wildColors = {color:0 for color in colorNames.values()}      # Colors picked for wilds
+
+    def getWinRate(self):
+        if self.seats == 0:
+            return 0.0
+        return self.wins / self.seats
+
+    def merge(self, other):
+        self.seats += other.seats
+        self.wins += other.wins
+        self.points.merge(other.points)
+        self.draws.merge(other.draws)
+        self.drawFours += other.drawFours
+        for color in other.wildColors:
+            self.wildColors[color] += other.wildColors[color]
+        return self
+
+    def asDict(self):
+        low, high = wilsonInterval(self.wins, self.seats)
+        return {'seats':self.seats, 'wins':self.wins, 'winRate':self.getWinRate(), 'winRateLow':low, 'winRateHigh':high,
+                'points':self.points.asDict(), 'draws':self.draws.asDict(), 'drawFours':self.drawFours,
+                'wildColors':dict(self.wildColors)}
+
+    @classmethod
+    def fromDict(cls, data):
+        stats = cls()
+        stats.seats = data['seats']
+        stats.wins = data['wins']
+        stats.points = RunningStats.fromDict(data['points'])
+        stats.draws = RunningStats.fromDict(data['draws'])
+        stats.drawFours = data['drawFours']
+        stats.wildColors.update(data['wildColors'])
+        return stats
+
+class StreamingStats():
+    '''Match results folded into constant memory: running mean/variance, histograms, wild
+    colors and per configuration win rates with confidence intervals. Mergeable across worker
+    processes, and saved/loaded as JSON snapshots so long runs can be watched and resumed.'''
+
+    def __init__(self):
+        self.matches = 0
+        self.aborted = 0
+        self.turns = RunningStats()
+        self.turnHistogram = Histogram(10, 50)
+        self.points = RunningStats()
+        self.pointHistogram = Histogram(25, 40)
+        self.draws = RunningStats()             # Cards drawn per match, the deal excluded
+        self.drawFours = 0
+        self.forcedColors = 0                   # Colors picked after every seat passed
+        self.players = {}                       # Configuration : PlayerStats
+        self.batches = []                       # First seed of every batch merged in, for resuming
+        self.settings = {}                      # Settings of the run that wrote it, a resume must match them
+
+    @staticmethod
+    def getKey(player):
+        '''Returns the configuration a player is counted under, "ComputerPlayer(skipFirst=False)" for parameters off their defaults.'''
+        name = type(player).__name__
+        config = player.getConfigName() if hasattr(player, 'getConfigName') else ''
+        if config:
+            return '{}({})'.format(name, config)
+        return name
+
+    def getPlayerStats(self, key):
+        stats = self.players.get(key)
+        if stats is None:
+            stats = self.players[key] = PlayerStats()
+        return stats
+
+    def addMatch(self, match):
+        '''Folds in a finished Match, reading its result and MatchLog.'''
+        self.matches += 1
+        if match.matchAbort:
+            self.aborted += 1
+            return
+        self.turns.add(match.turnCount)
+        self.turnHistogram.add(match.turnCount)
+        self.points.add(match.points)
+        self.pointHistogram.add(match.points)
+
+        seats = {}                              # Log seat : [PlayerStats, draws]
+        for identity in match.turnList:
+            player = match.players[identity]
+            stats = self.getPlayerStats(self.getKey(player))
+            stats.seats += 1
+            seats[identity[-1]] = [stats, 0]
+        winner = seats[match.winnerID[-1]][0]
+        winner.wins += 1
+        winner.points.add(match.points)
+
+        draws = 0
+        for move in match.log:
+            seat = move[0]
+            op = move[1]
+            if op == '-':
+                seats[seat][1] += 1
+                draws += 1
+            elif op == '+':
+                if move[-1] == '$' and seat != '0':
+                    seats[seat][0].drawFours += 1
+                    self.drawFours += 1
+            elif op == '=':
+                if seat == '0':
+                    self.forcedColors += 1
+                else:
+                    seats[seat][0].wildColors[colorNames[move[2]]] += 1
+        for stats, seatDraws in seats.values():
+            stats.draws.add(seatDraws)
+        self.draws.add(draws)
+
+    def merge(self, other):
+        self.matches += other.matches
+        self.aborted += other.aborted
+        self.turns.merge(other.turns)
+        self.turnHistogram.merge(other.turnHistogram)
+        self.points.merge(other.points)
+        self.pointHistogram.merge(other.pointHistogram)
+        self.draws.merge(other.draws)
+        self.drawFours += other.drawFours
+        self.forcedColors += other.forcedColors
+        for key in other.players:
+            self.getPlayerStats(key).merge(other.players[key])
+        self.batches += other.batches
+        self.settings = self.settings or dict(other.settings)
+        return self
+
+    ### -\/-  Snapshots  -\/- ###
+
+    def asDict(self):
+        return {'matches':self.matches, 'aborted':self.aborted,
+                'turns':self.turns.asDict(), 'turnHistogram':self.turnHistogram.asDict(),
+                'points':self.points.asDict(), 'pointHistogram':self.pointHistogram.asDict(),
+                'draws':self.draws.asDict(), 'drawFours':self.drawFours, 'forcedColors':self.forcedColors,
+                'players':{key:self.players[key].asDict() for key in sorted(self.players)},
+                'batches':sorted(self.batches), 'settings':dict(self.settings), 'saved':time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    @classmethod
+    def fromDict(cls, data):
+        stats = cls()
+        stats.matches = data['matches']
+        stats.aborted = data['aborted']
+        stats.turns = RunningStats.fromDict(data['turns'])
+        stats.turnHistogram = Histogram.fromDict(data['turnHistogram'])
+        stats.points = RunningStats.fromDict(data['points'])
+        stats.pointHistogram = Histogram.fromDict(data['pointHistogram'])
+        stats.draws = RunningStats.fromDict(data['draws'])
+        stats.drawFours = data['drawFours']
+        stats.forcedColors = data['forcedColors']
+        stats.players = {key:PlayerStats.fromDict(data['players'][key]) for key in data['players']}
+        stats.batches = list(data['batches'])
+        stats.settings = dict(data.get('settings', {}))
+        return stats
+
+    def save(self, path):
+        '''Writes a snapshot, replacing the old one only once the new one is complete.'''
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(self.asDict(), file, indent=1)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.fromDict(json.load(file))
+
+    def __str__(self):
+        played = self.matches - self.aborted
+        output = '{} matches ({} aborted), {:.1f} turns/match (sd {:.1f}, median <= {}), {:.1f} points (sd {:.1f})\n'.format(
+            self.matches, self.aborted, self.turns.mean, self.turns.getStdDev(), self.turnHistogram.getQuantile(.5),
+            self.points.mean, self.points.getStdDev())
+        output += '{:.1f} draws/match, {} +4 plays, {} forced colors\n'.format(self.draws.mean, self.drawFours, self.forcedColors)
+        for key in sorted(self.players, key=lambda key: self.players[key].getWinRate(), reverse=True):
+            stats = self.players[key]
+            low, high = wilsonInterval(stats.wins, stats.seats)
+            output += '  {:<22} {:>8} seats  {:6.2%} wins [{:.2%}, {:.2%}]  {:5.1f} draws/seat\n'.format(
+                key, stats.seats, stats.getWinRate(), low, high, stats.draws.mean)
+        if played == 0:
+            output += '  no finished matches\n'
+        return output
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Summarize a StreamingStats snapshot, e.g. one a running tournament is writing.')
+    parser.add_argument('snapshot', nargs='+', help='snapshot JSON files, merged when more than one')
+    parser.add_argument('--json', action='store_true', help='print the merged snapshot instead of a summary')
+    args = parser.parse_args(argv)
+
+    stats = StreamingStats()
+    for path in args.snapshot:
+        stats.merge(StreamingStats.load(path))
+    if args.json:
+        sys.stdout.write(json.dumps(stats.asDict(), indent=1)+'\n')
+    else:
+        sys.stdout.write(str(stats))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import math
+import random
+import argparse
+import itertools
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+
+from pyton import GameSettings, ComputerPlayer, Match
+from stats import RunningStats, wilsonInterval
+
+### Search Spaces ###
+
+defaultSpace = {'skipFirst':[True, False], 'reverseOnDraw':[True, False],
+                'valueChangeMargin':[-1, 0, 1, 2], 'wildColor':['most', 'random', 'tracked']}      # Parameter : values tried
+
+def parseValue(text):
+    '''Returns a command line value as a bool, int, float or string.'''
+    if text in ('True', 'False'):
+        return text == 'True'
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+def parameterGrid(space):
+    '''Returns every configuration in 'space' ({parameter : [values]}), in a stable order.'''
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*[space[name] for name in names])]
+
+def randomConfigs(space, count, rng):
+    '''Returns up to 'count' distinct configurations drawn uniformly from 'space'.'''
+    grid = parameterGrid(space)
+    if count >= len(grid):
+        return grid
+    return [grid[index] for index in sorted(rng.sample(range(len(grid)), count))]
+
+def getConfigName(config):
+    return ComputerPlayer('Sweep', config).getConfigName() or 'defaults'
+
+### Paired Matches ###
+
+def playSeat(seed, numPlayers, config, seat):
+    '''Plays one headless match seeded with 'seed', a ComputerPlayer with 'config' in 'seat' and
+    default ComputerPlayers elsewhere. Returns True if 'seat' won.'''
+    gs = GameSettings()
+    gs.computerSimulation = True
+    for index in range(numPlayers):
+        gs.addPlayer(ComputerPlayer(gs.getComputerName(), config if index == seat else None))
+    gs.finalizePlayers()
+    result = Match(gs, seed).run(gs)
+    return result['winner'] == gs.playerIdentities[seat]
+
+def playPairs(configs, baseline, seeds, numPlayers):
+    '''Worker entry point. Plays each seed with the baseline and then every candidate in the same
+    seat of the same deal (common random numbers). 'configs' is [(index, config)], returns
+    [(index, SweepResult)]. The baseline's outcome is shared by every candidate it is paired with.'''
+    results = [(index, SweepResult(config)) for index, config in configs]
+    baselineItems = dict(ComputerPlayer.defaults, **baseline)
+    for seed in seeds:
+        seat = seed % numPlayers
+        baselineWon = playSeat(seed, numPlayers, baseline, seat)
+        for index, result in results:
+            if dict(ComputerPlayer.defaults, **result.config) == baselineItems:
+                won = baselineWon
+            else:
+                won = playSeat(seed, numPlayers, result.config, seat)
+            result.add(won, baselineWon)
+    return results
+
+class SweepResult():
+    '''Paired outcomes of one configuration against the baseline. Mergeable across worker processes.'''
+
+    def __init__(self, config):
+        self.config = config
+        self.matches = 0
+        self.wins = 0
+        self.baselineWins = 0
+        self.difference = RunningStats()    # Candidate win - baseline win per seed, -1 to 1
+        self.eliminated = False
+
+    def add(self, won, baselineWon):
+        self.matches += 1
+        self.wins += won
+        self.baselineWins += baselineWon
+        self.difference.add(won - baselineWon)
+
+    def merge(self, other):
+        self.matches += other.matches
+        self.wins += other.wins
+        self.baselineWins += other.baselineWins
+        self.difference.merge(other.difference)
+        return self
+
+    def getWinRate(self):
+        if self.matches == 0:
+            return 0.0
+        return self.wins / self.matches
+
+    def getBaselineRate(self):
+        if self.matches == 0:
+            return 0.0
+        return self.baselineWins / self.matches
+
+    def getAdvantage(self):
+        '''Win rate gained over the baseline in the same seats and deals.'''
+        return self.difference.mean
+
+    def getStdError(self):
+        if self.matches < 2:
+            return float('inf')
+        return self.difference.getStdDev() / math.sqrt(self.matches)
+
+    def getPValue(self):
+        '''Two sided p-value of the paired difference, normal approximation.'''
+        error = self.getStdError()
+        if error == 0:
+            return 1.0 if self.getAdvantage() == 0 else 0.0
+        return math.erfc(abs(self.getAdvantage()/error) / math.sqrt(2))
+
+    def asDict(self):
+        low, high = wilsonInterval(self.wins, self.matches)
+        return {'config':self.config, 'name':getConfigName(self.config), 'matches':self.matches,
+                'winRate':self.getWinRate(), 'winRateLow':low, 'winRateHigh':high, 'baselineRate':self.getBaselineRate(),
+                'advantage':self.getAdvantage(), 'stdError':self.getStdError(), 'pValue':self.getPValue(),
+                'eliminated':self.eliminated}
+
+class Sweep():
+    ''''configs' (list) : ComputerPlayer configurations to rank
+       'numMatches' (int) : seeds per configuration, each played by the candidate and the baseline
+       'numPlayers' (int) : players per match (2-16), the rest are default ComputerPlayers
+       'workers' (int) : worker processes, defaults to os.cpu_count()
+       'seed' (int) : base seed, every configuration plays seeds seed to seed+numMatches-1
+       'chunkSize' (int) : seeds per task sent to a worker
+       'baseline' (dict) : configuration every candidate is paired against, the defaults if None
+       'race' (bool) : after every chunk drop configurations significantly behind the leader
+       'alpha' (float) : family-wise significance level, Bonferroni corrected over the configurations'''
+
+    def __init__(self, configs, numMatches=2000, numPlayers=4, workers=None, seed=0, chunkSize=250, baseline=None, race=False, alpha=0.05):
+        self.configs = configs
+        self.numMatches = numMatches
+        self.numPlayers = numPlayers
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.chunkSize = max(1, chunkSize)
+        self.baseline = baseline or {}
+        self.race = race
+        self.alpha = alpha
+        self.results = [SweepResult(config) for config in configs]
+
+    def getChunks(self):
+        seeds = range(self.seed, self.seed+self.numMatches)
+        return [seeds[i:i+self.chunkSize] for i in range(0, self.numMatches, self.chunkSize)]
+
+    def splitChunk(self, chunk):
+        '''Splits a chunk into one slice per worker so a racing round keeps every worker busy.'''
+        size = max(1, -(-len(chunk) // self.workers))
+        return [chunk[i:i+size] for i in range(0, len(chunk), size)]
+
+    def getCritical(self):
+        '''Returns the z score a difference must pass to be significant after the correction.'''
+        return NormalDist().inv_cdf(1 - self.alpha/max(1, len(self.configs))/2)
+
+    def isSignificant(self, result):
+        return result.getPValue() < self.alpha / max(1, len(self.configs))
+
+    def eliminate(self):
+        '''Drops the configurations whose advantage bound falls below the leader's lower bound.'''
+        z = self.getCritical()
+        active = [result for result in self.results if not result.eliminated]
+        leader = max(active, key=lambda result: result.getAdvantage())
+        floor = leader.getAdvantage() - z*leader.getStdError()
+        for result in active:
+            if result is not leader and result.getAdvantage() + z*result.getStdError() < floor:
+                result.eliminated = True
+
+    def playRound(self, executor, tasks, callback):
+        if executor is None:
+            finished = (playPairs(*task) for task in tasks)
+        else:
+            finished = executor.map(playPairs, *zip(*tasks))
+        for results in finished:
+            for index, result in results:
+                self.results[index].merge(result)
+            if callback is not None:
+                callback(self)
+
+    def run(self, callback=None):
+        '''Plays every configuration's pairs and returns the SweepResults, best advantage first.
+        'callback' is called with the sweep as each chunk streams back.'''
+        chunks = self.getChunks()
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        try:
+            if self.race:
+                for chunk in chunks:
+                    configs = [(index, result.config) for index, result in enumerate(self.results) if not result.eliminated]
+                    self.playRound(executor, [(configs, self.baseline, seeds, self.numPlayers) for seeds in self.splitChunk(chunk)], callback)
+                    self.eliminate()
+            else:
+                configs = [(index, result.config) for index, result in enumerate(self.results)]
+                self.playRound(executor, [(configs, self.baseline, seeds, self.numPlayers) for seeds in chunks], callback)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.getRanking()
+
+    def getRanking(self):
+        return sorted(self.results, key=lambda result: (not result.eliminated, result.getAdvantage()), reverse=True)
+
+    def __str__(self):
+        output = '{:<4} {:<52} {:>7} {:>20} {:>8} {:>15} {:>9}\n'.format('rank', 'configuration', 'seeds', 'win rate', 'baseline', 'advantage', 'p')
+        for rank, result in enumerate(self.getRanking()):
+            low, high = wilsonInterval(result.wins, result.matches)
+            flag = '*' if self.isSignificant(result) else ''
+            if result.eliminated:
+                flag = 'out'
+            output += '{:<4} {:<52} {:>7} {:>6.2%} [{:.1%},{:.1%}] {:>8.2%} {:>+8.2%} ±{:.2%} {:>9.2g} {}\n'.format(
+                rank+1, getConfigName(result.config), result.matches, result.getWinRate(), low, high,
+                result.getBaselineRate(), result.getAdvantage(), result.getStdError(), result.getPValue(), flag)
+        return output
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rank ComputerPlayer parameter settings against the defaults with paired self-play.')
+    parser.add_argument('-P', '--param', action='append', default=[], metavar='NAME=V1,V2', help='values to try for a parameter, may be repeated (default: all parameters)')
+    parser.add_argument('--random', type=int, help='sample this many configurations from the grid instead of playing all of it')
+    parser.add_argument('-n', '--matches', type=int, default=2000, help='seeds per configuration')
+    parser.add_argument('-p', '--players', type=int, default=4, choices=range(2, GameSettings.maxPlayers+1), metavar='{2-16}')
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-c', '--chunk', type=int, default=250)
+    parser.add_argument('--race', action='store_true', help='drop configurations significantly behind the leader after every chunk')
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('-o', '--output', help='write the ranking as JSON here')
+    args = parser.parse_args(argv)
+
+    space = {}
+    for param in args.param:
+        name, values = param.split('=', 1)
+        if name not in ComputerPlayer.defaults:
+            parser.error('unknown parameter {}, choose from {}'.format(name, ', '.join(sorted(ComputerPlayer.defaults))))
+        space[name] = [parseValue(value) for value in values.split(',')]
+        for value in space[name]:
+            try:
+                ComputerPlayer('Sweep', {name:value})
+            except ValueError as error:
+                parser.error(str(error))
+    space = space or defaultSpace
+    if args.random:
+        configs = randomConfigs(space, args.random, random.Random(args.seed))
+    else:
+        configs = parameterGrid(space)
+
+    sweep = Sweep(configs, args.matches, args.players, args.workers, args.seed, args.chunk, race=args.race, alpha=args.alpha)
+    sweep.run()
+    sys.stdout.write(str(sweep))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'players':args.players, 'seed':args.seed, 'alpha':args.alpha,
+                       'ranking':[result.asDict() for result in sweep.getRanking()]}, file, indent=1)
+
+if __name__ == '__main__':
+    main()
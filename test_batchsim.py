@@ -0,0 +1,53 @@
+import unittest
+
+from pyton import GameSettings, ComputerPlayer, Match
+from batchsim import BatchMatch, simulate
+
+def playMatches(seeds, numPlayers):
+    '''Returns the mean turns and points of seeded headless ComputerPlayer matches.'''
+    turns = points = 0
+    for seed in seeds:
+        gs = GameSettings()
+        gs.computerSimulation = True
+        for i in range(numPlayers):
+            i #unused
+            gs.addPlayer(ComputerPlayer(gs.getComputerName()))
+        gs.finalizePlayers()
+        result = Match(gs, seed).run(gs)
+        turns += result['turns']
+        points += result['points']
+    return turns/len(seeds), points/len(seeds)
+
+class BatchMatchTest(unittest.TestCase):
+
+    def checkAgainstMatch(self, numPlayers, numMatches, tolerance):
+        turns, points = playMatches(range(numMatches), numPlayers)
+        stats = simulate(10000, numPlayers, seed=3)
+        self.assertEqual(stats['aborted'], 0)
+        self.assertAlmostEqual(stats['meanTurns']/turns, 1, delta=tolerance)
+        self.assertAlmostEqual(stats['meanPoints']/points, 1, delta=tolerance)
+
+    def testMatchesSelfPlay(self):
+        '''Mean turns and points follow seeded Match self-play.'''
+        self.checkAgainstMatch(4, 1500, 0.04)
+
+    def testLargeTable(self):
+        '''Twelve seats deal from two decks, as Match does.'''
+        self.assertEqual(BatchMatch(1, 12).decks, 2)
+        self.checkAgainstMatch(12, 400, 0.06)
+
+    def testHandsStayConsistent(self):
+        '''Count arrays agree with the hands and every card is in a deck, a hand or the pile.'''
+        batch = BatchMatch(500, 6, seed=4)
+        batch.begin()
+        while len(batch.ids) > 0:
+            batch.nextTurn()
+            hands = batch.hands.astype(int).reshape(len(batch.ids), 6, 5, 13)
+            self.assertTrue((hands.sum(axis=3) == batch.colorCounts).all())
+            self.assertTrue((hands.sum(axis=(2,3)) == batch.sizes).all())
+            cards = batch.sizes.sum(axis=1) + batch.discard.sum(axis=1) + 1 + batch.deckEnd - batch.position
+            self.assertTrue((cards == 108).all())
+            batch.compact()
+
+if __name__ == '__main__':
+    unittest.main()
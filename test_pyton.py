@@ -0,0 +1,318 @@
+import random
+import unittest
+
+from pyton import GameSettings, Deck, DecisionTable, ComputerPlayer, Card, TurnRing, Match, MatchLog, GameState, MatchReplayer, ReplayError
+
+### Helpers ###
+
+def getExact(state):
+    '''Returns a copy of every rules field of a GameState, undo history and rng aside.'''
+    fields = []
+    for name in GameState.__slots__:
+        if name not in ('rng', 'history'):
+            value = getattr(state, name)
+            if name == 'hands':
+                value = [list(hand) for hand in value]
+            elif isinstance(value, list):
+                value = list(value)
+            fields.append(value)
+    return tuple(fields)
+
+def playMatch(playerClass, seed, numPlayers=4, zeroChange=False, config=None):
+    '''Plays one headless match with 'playerClass' in every seat, returns the Match.'''
+    gs = GameSettings()
+    gs.computerSimulation = True
+    gs.zeroChange = zeroChange
+    for i in range(numPlayers):
+        i #unused
+        gs.addPlayer(playerClass(gs.getComputerName(), config))
+    gs.finalizePlayers()
+    match = Match(gs, seed)
+    match.run(gs)
+    return match
+
+def playMatches(playerClass, seeds, numPlayers=4, zeroChange=False, config=None):
+    '''Plays a headless match per seed with 'playerClass' in every seat.'''
+    for seed in seeds:
+        playMatch(playerClass, seed, numPlayers, zeroChange, config)
+
+class StateRecorder(ComputerPlayer):
+    '''Keeps a GameState of every position it is asked to play.'''
+
+    states = []
+
+    def think(self, match):
+        self.states.append(match.getState())
+        return ComputerPlayer.think(self, match)
+
+class CheckedTable(DecisionTable):
+    '''DecisionTable that compares every hit with a fresh ComputerPlayer.decide().'''
+
+    def __init__(self):
+        super().__init__()
+        self.player = None
+        self.checks = 0
+        self.mismatches = []
+
+    def get(self, key):
+        code = DecisionTable.get(self, key)
+        if code is not None:
+            self.checks += 1
+            fresh = self.player.decide(*self.player.decideArgs)
+            if fresh != code:
+                self.mismatches.append((key, code, fresh))
+        return code
+
+class CheckedPlayer(ComputerPlayer):
+    '''ComputerPlayer whose memoized decisions are checked, one CheckedTable per configuration.'''
+
+    checkedTables = {}              # Configuration name : CheckedTable
+
+    def __init__(self, name, config=None):
+        super().__init__(name, config)
+        name = self.getConfigName()
+        if name not in CheckedPlayer.checkedTables:
+            CheckedPlayer.checkedTables[name] = CheckedTable()
+        self.decisions = CheckedPlayer.checkedTables[name]
+
+    def think(self, match):
+        self.decideArgs = (match.currentValue, match.zeroChange, len(match.turnList) == 2,
+                           match.getPlayer(match.getNextTurn(True)).didDraw())
+        self.decisions.player = self
+        return ComputerPlayer.think(self, match)
+
+class TurnRingTest(unittest.TestCase):
+
+    def testNextAndPrevious(self):
+        ring = TurnRing('play'+code for code in '12345')
+        self.assertEqual(len(ring), 5)
+        self.assertEqual(ring.getPosition('play3'), 2)
+        self.assertEqual(ring.getNext('play1'), 'play2')
+        self.assertEqual(ring.getNext('play5'), 'play1')
+        self.assertEqual(ring.getPrevious('play1'), 'play5')
+        self.assertEqual(ring.getNext('play4', 2), 'play1')           # The seat after a skip
+        self.assertEqual(ring.getPrevious('play2', 2), 'play5')
+
+    def testReverse(self):
+        ring = TurnRing('play'+code for code in '1234')
+        self.assertTrue(ring.reverse())
+        self.assertEqual(ring.getNext('play1'), 'play4')
+        self.assertEqual(ring.getPrevious('play4'), 'play1')
+        self.assertEqual(ring.getNext('play2', 2), 'play4')
+        self.assertFalse(ring.reverse())
+        self.assertEqual(ring.getNext('play1'), 'play2')
+
+    def testWindow(self):
+        ring = TurnRing('play'+code for code in GameSettings.seatCodes)
+        self.assertEqual(ring.getWindow('play1', 3), ['playg', 'play1', 'play2'])
+        self.assertEqual(ring.getWindow('playa', 4), ['play9', 'playa', 'playb', 'playc'])
+        small = TurnRing(['play1', 'play2'])
+        self.assertEqual(small.getWindow('play2', 6), ['play1', 'play2'])
+
+    def testDeckCount(self):
+        '''One deck per eight seats unless GameSettings.decks is set.'''
+        for numPlayers, decks in ((2, 1), (8, 1), (9, 2), (16, 2)):
+            gs = GameSettings()
+            gs.computerSimulation = True
+            for i in range(numPlayers):
+                i #unused
+                gs.addPlayer(ComputerPlayer(gs.getComputerName()))
+            gs.finalizePlayers()
+            self.assertEqual(gs.getDeckCount(), decks)
+            self.assertEqual(len(Match(gs, 1).deck), 108*decks)
+        gs.decks = 3
+        self.assertEqual(gs.getDeckCount(), 3)
+
+class DeckTest(unittest.TestCase):
+
+    def testRingWraparound(self):
+        '''insert() wraps the start back past slot 0, draw() and place() work across the seam.'''
+        cards = [Card.intern('red', value) for value in '012345']
+        deck = Deck(False, capacity=4)
+        deck.place(cards[0])
+        deck.place(cards[1])
+        deck.insert(cards[2])
+        self.assertEqual(deck.start, 3)
+        self.assertEqual(list(deck), [cards[2], cards[0], cards[1]])
+        self.assertIs(deck[0], cards[2])
+        self.assertIs(deck[-1], cards[1])
+        deck.insert(cards[3])
+        self.assertEqual(list(deck), [cards[3], cards[2], cards[0], cards[1]])
+        self.assertIs(deck.draw(), cards[1])
+        deck.place(cards[4])
+        self.assertEqual(len(deck.cards), 4)
+        deck.insert(cards[5])                   # Full, the buffer grows and keeps the order
+        self.assertEqual(list(deck), [cards[5], cards[3], cards[2], cards[0], cards[4]])
+        self.assertEqual(len(deck.cards), 8)
+        with self.assertRaises(IndexError):
+            deck[5]
+
+    def testTruncate(self):
+        deck = Deck(False, capacity=4)
+        for value in '0123':
+            deck.insert(Card.intern('blue', value))
+        deck.truncate(1)
+        self.assertEqual(list(deck), [Card.intern('blue', '3')])
+
+    def testRefill(self):
+        '''The pile keeps its top card, every other card is shuffled in with wilds uncolored again.'''
+        deck = Deck(True, random.Random(5))
+        pile = Deck(False, random.Random(6))
+        while len(deck) > 0:
+            card = deck.draw()
+            if card.isWild():
+                card = card.changeColor(random.Random(len(deck)).choice(Deck.colors))
+            pile.insert(card)
+        top = pile[0]
+        under = [card if not card.isWild() else Card.intern('wild', card.value) for card in list(pile)[1:]]
+        self.assertTrue(any(card.isWild() and card.color != 'wild' for card in pile))
+        deck.refill(pile)
+        self.assertEqual(list(pile), [top])
+        self.assertEqual(len(deck), 107)
+        self.assertEqual(sorted(card.code for card in deck), sorted(card.code for card in under))
+        self.assertTrue(all(card.color == 'wild' for card in deck if card.isWild()))
+        self.assertNotEqual([card.code for card in deck], [card.code for card in reversed(under)])
+
+    def testDecks(self):
+        deck = Deck(True, random.Random(7), 216, 2)
+        self.assertEqual(len(deck), 216)
+        self.assertEqual(sum(card.isWild() for card in deck), 16)
+
+class ComputerPlayerTest(unittest.TestCase):
+
+    def testConfigTypes(self):
+        '''Parameters must have their default's exact type, so command line strings and floats are refused.'''
+        for config in ({'valueChangeMargin':'1'}, {'valueChangeMargin':0.5}, {'valueChangeMargin':True},
+                       {'skipFirst':1}, {'reverseOnDraw':'False'}, {'wildColor':2}, {'wildColor':'best'}, {'margin':1}):
+            with self.assertRaises(ValueError):
+                ComputerPlayer('Test', config)
+        player = ComputerPlayer('Test', {'valueChangeMargin':-1, 'skipFirst':False, 'wildColor':'tracked'})
+        self.assertEqual(player.getConfigName(), 'skipFirst=False,valueChangeMargin=-1,wildColor=tracked')
+
+class DecisionTableTest(unittest.TestCase):
+
+    def testHitsMatchDecide(self):
+        '''Every decision served from the table is the one decide() makes for that position.'''
+        CheckedPlayer.checkedTables = {}
+        for config in (None, {'valueChangeMargin':1}, {'skipFirst':False, 'reverseOnDraw':False}):
+            for numPlayers in (2, 3, 4):
+                for zeroChange in (False, True):
+                    playMatches(CheckedPlayer, range(25), numPlayers, zeroChange, config)
+        checks = sum(table.checks for table in CheckedPlayer.checkedTables.values())
+        mismatches = [mismatch for table in CheckedPlayer.checkedTables.values() for mismatch in table.mismatches]
+        self.assertGreater(checks, 10000)
+        self.assertEqual(mismatches, [])
+
+    def testLargeCountsKeepKeysApart(self):
+        '''With a valueChangeMargin, color counts past 127 do not share a key with smaller ones.'''
+        CheckedPlayer.checkedTables = {}
+        gs = GameSettings()
+        gs.computerSimulation = True
+        gs.decks = 8
+        for i in range(2):
+            i #unused
+            gs.addPlayer(CheckedPlayer(gs.getComputerName(), {'valueChangeMargin':1}))
+        gs.finalizePlayers()
+        match = Match(gs, 1)
+        match.currentColor = 'red'
+        match.currentValue = '7'
+        match.turn = 'play1'
+        player = match.players['play1']
+        for red, yellow in ((130, 0), (2, 1)):          # Red 130 packs like red 2, yellow 1 in 7 bit fields
+            player.discardHand()
+            for color, value, count in (('red', '5', red), ('yellow', '5', yellow), ('blue', '7', 4)):
+                for i in range(count):
+                    player.addCard(Card.intern(color, value))
+            player.think(match)
+        table = CheckedPlayer.checkedTables['valueChangeMargin=1']
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.mismatches, [])
+
+class GameStateTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        StateRecorder.states = []
+        playMatches(StateRecorder, range(20))
+        playMatches(StateRecorder, range(20, 25), 12)
+        cls.states = StateRecorder.states
+
+    def testUndoRestoresState(self):
+        '''push() then undo() gives back the exact state, through forced draws and refills.'''
+        rng = random.Random(12)
+        undos = 0
+        for state in self.states:
+            state = state.clone()
+            state.rng = random.Random(rng.random())
+            before = getExact(state)
+            snapshots = []
+            while state.winner < 0 and len(snapshots) < 40:
+                snapshots.append(getExact(state))
+                state.push(rng.choice(state.getActions()))
+            while snapshots:
+                state.undo()
+                undos += 1
+                self.assertEqual(getExact(state), snapshots.pop())
+            self.assertEqual(getExact(state), before)
+        self.assertGreater(undos, 1000)
+
+    def testCloneIsIndependent(self):
+        rng = random.Random(13)
+        for state in self.states[::10]:
+            before = getExact(state)
+            copy = state.clone()
+            copy.rng = random.Random(rng.random())
+            copy.rollout(lambda state: rng.choice(state.getActions()))
+            self.assertEqual(getExact(state), before)
+
+    def testRolloutBoundIsRelative(self):
+        '''A state far into a match still plays its rollout turns.'''
+        state = self.states[0].clone()
+        state.rng = random.Random(14)
+        state.turnCount = 5000
+        state.rollout(lambda state: state.getActions()[0], 10)
+        self.assertGreater(state.turnCount, 5000)
+
+class MatchLogTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.matches = [playMatch(ComputerPlayer, 3), playMatch(ComputerPlayer, 4, zeroChange=True), playMatch(ComputerPlayer, 5, 12)]
+
+    def testRoundTrip(self):
+        for match in self.matches:
+            log = MatchLog.loads(match.log.dumps())
+            for name in ('seed', 'players', 'zeroChange', 'decks', 'moves'):
+                self.assertEqual(getattr(log, name), getattr(match.log, name))
+        self.assertEqual(self.matches[2].log.decks, 2)
+
+    def testReplayReproducesMatch(self):
+        for match in self.matches:
+            replayed = MatchReplayer(MatchLog.loads(match.log.dumps())).replay()
+            self.assertEqual(replayed.winnerID, match.winnerID)
+            self.assertEqual(replayed.turnCount, match.turnCount)
+            self.assertEqual(replayed.points, match.points)
+            self.assertEqual(replayed.log.moves, match.log.moves)
+
+    def testTamperedMoveRaises(self):
+        '''Changing a drawn card makes the replay fail at that move.'''
+        log = MatchLog.loads(self.matches[0].log.dumps())
+        index = [i for i, move in enumerate(log.moves) if move[1] == '-'][3]
+        move = log.moves[index]
+        log.moves[index] = move[:2] + ('R1' if move[2:] != 'R1' else 'R2')
+        with self.assertRaises(ReplayError) as raised:
+            MatchReplayer(log).replay()
+        self.assertTrue(str(raised.exception).startswith('Move {}:'.format(index)))
+
+    def testStopAt(self):
+        '''replay(stopAt) stops at the first turn boundary past 'stopAt' moves, on the recorded path.'''
+        match = self.matches[0]
+        stopAt = len(match.log) // 2
+        stopped = MatchReplayer(MatchLog.loads(match.log.dumps())).replay(stopAt)
+        self.assertFalse(stopped.matchComplete)
+        self.assertGreaterEqual(len(stopped.log), stopAt)
+        self.assertEqual(stopped.log.moves, match.log.moves[:len(stopped.log)])
+        self.assertLess(stopped.turnCount, match.turnCount)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import sqlite3
+import unittest
+
+from pyton import GameSettings, ComputerPlayer, Match
+from scores import ScoreStore
+
+def queueMatch(store, points, seats, seed=0):
+    '''Queues a match row as recordMatch would. 'seats' is [(name, kind, won)].'''
+    store.pending.append((seed, None, points, 10, False, 0.0, [(name, kind, seat, won) for seat, (name, kind, won) in enumerate(seats)]))
+
+class ScoreStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = ScoreStore(':memory:', batchSize=10)
+        self.addCleanup(self.store.connection.close)
+
+    def testRecordMatch(self):
+        gs = GameSettings()
+        gs.computerSimulation = True
+        gs.scoreStore = self.store
+        for i in range(3):
+            i #unused
+            gs.addPlayer(ComputerPlayer(gs.getComputerName()))
+        gs.finalizePlayers()
+        result = Match(gs, 8).run(gs)
+        self.assertEqual(len(self.store.pending), 1)
+        self.store.flush()
+        winner = self.store.getPlayer(gs.players[result['winner']].getName(), 'Computer')
+        self.assertEqual((winner['points'], winner['wins'], winner['matches']), (result['points'], 1, 1))
+        history = self.store.getHistory(winner['name'], 'Computer')
+        self.assertEqual([(row['seed'], row['won'], row['turns']) for row in history], [(8, 1, result['turns'])])
+
+    def testFlushRollbackKeepsPending(self):
+        '''A failed flush writes nothing and leaves every queued match to retry.'''
+        queueMatch(self.store, 40, [('Ann', 'Human', True), ('Bob', 'Human', False)])
+        queueMatch(self.store, 25, [('Bob', 'Human', True), ('Cy', 'Human', False)])
+        self.store.pending[-1][6][1] = ('Cy', 'Human', 0, False)           # Seat 0 twice breaks the seats primary key
+        pending = list(self.store.pending)
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.store.flush()
+        self.assertEqual(self.store.pending, pending)
+        self.assertEqual(self.store.playerIDs, {})
+        for table in ('players', 'matches', 'seats'):
+            self.assertEqual(self.store.connection.execute('SELECT COUNT(*) FROM {}'.format(table)).fetchone()[0], 0)
+
+        self.store.pending.pop()
+        self.store.flush()
+        self.assertEqual(self.store.pending, [])
+        self.assertEqual(self.store.getPlayer('Ann')['points'], 40)
+        self.assertEqual(self.store.getPlayer('Bob')['matches'], 1)
+        self.assertIsNone(self.store.getPlayer('Cy'))
+
+    def testLeaderboardOrder(self):
+        queueMatch(self.store, 100, [('Ann', 'Human', True), ('Bob', 'Human', False), ('Hal', 'Computer', False)])
+        queueMatch(self.store, 30, [('Ann', 'Human', False), ('Bob', 'Human', True), ('Hal', 'Computer', False)])
+        queueMatch(self.store, 30, [('Ann', 'Human', False), ('Bob', 'Human', True), ('Hal', 'Computer', False)])
+        queueMatch(self.store, 200, [('Cy', 'Human', False), ('Hal', 'Computer', True)])
+        self.store.flush()
+
+        byPoints = self.store.getLeaderboard()
+        self.assertEqual([(row['rank'], row['name'], row['points']) for row in byPoints], [(1, 'Hal', 200), (2, 'Ann', 100), (3, 'Bob', 60), (4, 'Cy', 0)])
+        byWins = self.store.getLeaderboard(order='wins')
+        self.assertEqual([(row['name'], row['wins']) for row in byWins], [('Bob', 2), ('Hal', 1), ('Ann', 1), ('Cy', 0)])
+        humans = self.store.getLeaderboard(2, 'wins', 'Human')
+        self.assertEqual([row['name'] for row in humans], ['Bob', 'Ann'])
+        self.assertEqual(self.store.getPoints('Hal'), 0)            # Only a Computer named Hal
+        self.assertEqual(self.store.getPoints('Hal', 'Computer'), 200)
+
+if __name__ == '__main__':
+    unittest.main()
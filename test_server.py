@@ -0,0 +1,222 @@
+import asyncio
+import threading
+import unittest
+
+from scores import ScoreStore
+from server import TablePool, GameServer
+
+class QuietPool(TablePool):
+    '''TablePool whose tables skip the animations and remember every table handed out.'''
+
+    def __init__(self, maxTables=500, maxIdle=64):
+        super().__init__(maxTables, maxIdle)
+        self.handedOut = []
+
+    def acquire(self):
+        table = TablePool.acquire(self)
+        if table is not None:
+            table.gs.displayEffects = False
+            self.handedOut.append(table)
+        return table
+
+class ThreadCheckedStore(ScoreStore):
+    '''ScoreStore that notes the threads its server calls come from.'''
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = set()
+
+    def recordMatch(self, match, tableID=None):
+        self.threads.add(threading.get_ident())
+        ScoreStore.recordMatch(self, match, tableID)
+
+    def getPoints(self, name, kind='Human'):
+        self.threads.add(threading.get_ident())
+        return ScoreStore.getPoints(self, name, kind)
+
+    def getLeaderboard(self, limit=10, order='points', kind=None):
+        self.threads.add(threading.get_ident())
+        return ScoreStore.getLeaderboard(self, limit, order, kind)
+
+class Client():
+    '''Plays the human seat over a real connection, reading the Table's match to pick legal cards.
+       'pool' (QuietPool) : the server's pool, the client's table is the one seating 'name'
+       'matches' (int) : matches to play before answering 'n' to play again
+       'name' (string) : human player's name, unique among clients playing at once'''
+
+    prompts = (b'Name: ', b'opponents', b'Press Enter', b'Selection: ', b'Color Change: ', b'Play again?', b'Thanks for playing.')
+
+    def __init__(self, pool, matches=1, name='Tester'):
+        self.pool = pool
+        self.matches = matches
+        self.name = name
+        self.played = 0
+        self.table = None
+        self.human = None               # The client's Player on the server
+        self.seen = []                  # Matches the client played a card in
+        self.output = b''
+        self.received = b''
+
+    async def nextPrompt(self, reader):
+        '''Reads until one of the prompts arrives, returns it.'''
+        while True:
+            found = [(self.output.find(prompt), prompt) for prompt in self.prompts if prompt in self.output]
+            if found:
+                index, prompt = min(found)
+                self.output = self.output[index+len(prompt):]
+                return prompt
+            data = await reader.read(65536)
+            if not data:
+                return None
+            self.output += data
+            self.received += data
+
+    def findTable(self):
+        for table in self.pool.handedOut:
+            if table.match is not None and any(player.getName() == self.name for player in table.match.players.values()):
+                return table
+
+    def getSelection(self):
+        self.table = self.findTable()
+        match = self.table.match
+        if match not in self.seen:
+            self.seen.append(match)
+        player = match.players[match.turn]
+        self.human = player
+        if player.getForceDraws() > 0 and len(match.deck) > 0:
+            return 'd'
+        valid = player.getAllValidCards()
+        for index in range(player.getCardNum()):
+            if player.checkCard(index) in valid:
+                if index // 10 != match.handPosition:
+                    return '>'
+                return str(index % 10)
+        return 'd' if len(match.deck) > 0 else 's'
+
+    async def play(self, host, port, opponents=1):
+        '''Plays a whole session, returns the last prompt seen (b'Thanks for playing.' when it ended normally).'''
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while True:
+                prompt = await self.nextPrompt(reader)
+                if prompt is None or prompt == b'Thanks for playing.':
+                    return prompt
+                if prompt == b'Name: ':
+                    line = self.name
+                elif prompt == b'opponents':
+                    line = str(opponents)
+                elif prompt == b'Press Enter':
+                    line = ''
+                elif prompt == b'Selection: ':
+                    line = self.getSelection()
+                elif prompt == b'Color Change: ':
+                    line = 'r'
+                else:
+                    self.played += 1
+                    line = 'y' if self.played < self.matches else 'n'
+                writer.write((line+'\r\n').encode())
+                await writer.drain()
+        finally:
+            writer.close()
+
+async def readAll(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    data = await reader.read()
+    writer.close()
+    return data
+
+class GameServerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def startServer(self, maxTables=4, maxIdle=2, store=None):
+        self.pool = QuietPool(maxTables, maxIdle)
+        self.server = GameServer(port=0, pool=self.pool, idleTimeout=10, store=store)
+        await self.server.start()
+        self.addAsyncCleanup(self.stopServer)
+
+    async def stopServer(self):
+        self.server.server.close()
+        await self.server.server.wait_closed()
+        self.server.close()
+
+    async def waitReleased(self):
+        '''Waits for the server to release every table, it may still be closing after its last write.'''
+        while self.pool.active:
+            await asyncio.sleep(.01)
+
+    def checkFinished(self, client, matches):
+        self.assertEqual(len(client.seen), matches)
+        for match in client.seen:
+            self.assertTrue(match.matchComplete)
+            self.assertFalse(match.matchAbort)
+            self.assertIn(match.winnerID, match.turnList)
+
+    async def testMatchesPlayToTheEnd(self):
+        '''Play again keeps the table, a later connection gets the released table back.'''
+        await self.startServer()
+        client = Client(self.pool, 2)
+        self.assertEqual(await asyncio.wait_for(client.play(self.server.host, self.server.port), 60), b'Thanks for playing.')
+        await self.waitReleased()
+        self.checkFinished(client, 2)
+        self.assertEqual(self.server.results, 2)
+        self.assertEqual(client.played, 2)
+        self.assertEqual(client.table.gs.players, {})
+        self.assertIn(client.table, self.pool.idle)
+
+        second = Client(self.pool)
+        await asyncio.wait_for(second.play(self.server.host, self.server.port, 3), 60)
+        await self.waitReleased()
+        self.checkFinished(second, 1)
+        self.assertEqual(len(second.seen[0].turnList), 4)
+        self.assertIs(second.table, client.table)
+        self.assertEqual(self.pool.created, 1)
+        self.assertEqual(self.server.results, 3)
+
+    async def testFullPoolTurnsAway(self):
+        await self.startServer(1, 1)
+        reader, writer = await asyncio.open_connection(self.server.host, self.server.port)
+        self.assertEqual(await reader.readuntil(b'Name: '), b'\033[97mName: ')
+        turnedAway = await asyncio.wait_for(readAll(self.server.host, self.server.port), 10)
+        self.assertEqual(turnedAway, b'Server full, try again later.\r\n')
+        writer.close()
+        await writer.wait_closed()
+        await self.waitReleased()
+        self.assertEqual(self.pool.created, 1)
+        self.assertEqual(len(self.pool.idle), 1)
+
+    async def testIdleCap(self):
+        '''Tables released past 'maxIdle' are dropped, none stay active.'''
+        await self.startServer(4, 2)
+        clients = [Client(self.pool, name='Tester{}'.format(i)) for i in range(4)]
+        results = await asyncio.wait_for(asyncio.gather(*[client.play(self.server.host, self.server.port) for client in clients]), 120)
+        self.assertEqual(results, [b'Thanks for playing.']*4)
+        await self.waitReleased()
+        for client in clients:
+            self.checkFinished(client, 1)
+        self.assertEqual(self.server.results, 4)
+        self.assertEqual(self.pool.created, 4)
+        self.assertEqual(len(self.pool.idle), 2)
+
+    async def testScoreStore(self):
+        '''Store calls run off the event loop's thread, matches are recorded and points carry over.'''
+        store = ThreadCheckedStore(':memory:')
+        self.addCleanup(store.close)
+        await self.startServer(store=store)
+        first = Client(self.pool, 2)
+        await asyncio.wait_for(first.play(self.server.host, self.server.port), 60)
+        await self.waitReleased()
+        self.assertIn(b'Leaderboard', first.received)
+        player = store.getPlayer('Tester')
+        self.assertEqual(player['matches'], 2)
+        self.assertEqual(player['points'], first.human.getPoints())
+
+        second = Client(self.pool)
+        await asyncio.wait_for(second.play(self.server.host, self.server.port), 60)
+        await self.waitReleased()
+        self.assertEqual(len(store.threads), 1)
+        self.assertNotIn(threading.get_ident(), store.threads)
+        player = store.getPlayer('Tester')
+        self.assertEqual(player['matches'], 3)
+        self.assertEqual(player['points'], second.human.getPoints())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+
+from pyton import Terminal
+from spectate import Broadcaster
+
+class CountingBroadcaster(Broadcaster):
+    '''Broadcaster that counts the keyframes it encodes.'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.keyframes = 0
+
+    def getKeyframe(self):
+        if self.keyframe is None:
+            self.keyframes += 1
+        return Broadcaster.getKeyframe(self)
+
+class Collector():
+    '''StreamWriter stand-in keeping every write.'''
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+
+    async def drain(self):
+        await asyncio.sleep(0)
+
+def getFrame(number):
+    return 'frame {}\nline {}\n'.format(number, number*2)
+
+class BroadcasterTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.broadcaster = CountingBroadcaster(queueSize=2)
+        self.spectators = [self.broadcaster.subscribe() for i in range(3)]
+
+    def getQueued(self, spectator):
+        return [spectator.queue.get_nowait() for i in range(spectator.queue.qsize())]
+
+    async def testDropThenKeyframe(self):
+        '''A full queue drops the frame, the next frame that fits is one keyframe shared by every stale viewer.'''
+        broadcaster = self.broadcaster
+        broadcaster.publish(getFrame(1))
+        broadcaster.publish(getFrame(2))
+        self.assertEqual(broadcaster.keyframes, 1)
+        self.assertTrue(all(spectator.queue.full() for spectator in self.spectators))
+
+        broadcaster.publish(getFrame(3))
+        for spectator in self.spectators:
+            self.assertEqual(spectator.dropped, 1)
+            self.assertTrue(spectator.stale)
+            spectator.queue.get_nowait()
+        broadcaster.publish(getFrame(4))
+        self.assertEqual(broadcaster.keyframes, 2)
+
+        queued = [self.getQueued(spectator) for spectator in self.spectators]
+        self.assertEqual([len(frames) for frames in queued], [2, 2, 2])      # Frame 2's diff then frame 4 in full, frame 3 is gone
+        for frames in queued:
+            self.assertIs(frames[0], queued[0][0])
+            self.assertIs(frames[1], queued[0][1])
+        self.assertFalse(queued[0][0].startswith(Terminal.clearSequence.encode()))
+        self.assertTrue(queued[0][1].startswith(Terminal.clearSequence.encode()))
+        self.assertIn(b'frame 4\r\nline 8', queued[0][1])
+        self.assertFalse(any(spectator.stale for spectator in self.spectators))
+
+    async def testPumpCatchesUp(self):
+        '''A viewer that drained its queue after a drop is sent the frame it missed in full.'''
+        broadcaster = self.broadcaster
+        for number in (1, 2, 3):
+            broadcaster.publish(getFrame(number))
+        spectator = self.spectators[0]
+        writer = Collector()
+        pump = asyncio.create_task(spectator.pump(writer))
+        while len(writer.writes) < 3:
+            await asyncio.sleep(0)
+        self.assertTrue(writer.writes[0].startswith(Terminal.clearSequence.encode()))
+        self.assertIn(b'frame 1', writer.writes[0])
+        self.assertFalse(writer.writes[1].startswith(Terminal.clearSequence.encode()))     # Frame 2 as a diff
+        self.assertIs(writer.writes[2], broadcaster.getKeyframe())
+        self.assertIn(b'frame 3', writer.writes[2])
+        self.assertEqual(broadcaster.keyframes, 2)
+
+        broadcaster.publish(getFrame(4))
+        while len(writer.writes) < 4:
+            await asyncio.sleep(0)
+        self.assertFalse(writer.writes[3].startswith(Terminal.clearSequence.encode()))      # Back to diffs
+        spectator.close()
+        await asyncio.wait_for(pump, 5)
+        self.assertNotIn(spectator, broadcaster.spectators)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pyton import GameSettings, ComputerPlayer, Match
+from profiler import MatchProfiler, profileMatch
+from stats import StreamingStats
+
+def playMatch(seed, numPlayers=4, profiler=None, stream=None):
+    '''Plays one headless ComputerPlayer match seeded with 'seed', timed by 'profiler' and
+    folded into the StreamingStats 'stream' if given.
+    Returns the dict from Match.run with the winner's name added.'''
+    gs = GameSettings()
+    gs.computerSimulation = True
+    for i in range(numPlayers):
+        i #unused
+        gs.addPlayer(ComputerPlayer(gs.getComputerName()))
+    gs.finalizePlayers()
+    match = Match(gs, seed)
+    if profiler is None:
+        result = match.run(gs)
+    else:
+        result = profileMatch(match, gs, profiler)[0]
+    if stream is not None:
+        stream.addMatch(match)
+    result['name'] = gs.players[result['winner']].getName()
+    return result
+
+def playBatch(seeds, numPlayers=4, profile=False, stream=False):
+    '''Worker entry point. Plays a chunk of matches and returns their merged stats.'''
+    stats = TournamentStats()
+    if profile:
+        stats.profile = MatchProfiler()
+    if stream:
+        stats.stream = StreamingStats()
+    for seed in seeds:
+        stats.addResult(playMatch(seed, numPlayers, stats.profile, stats.stream))
+    if stream:
+        stats.stream.batches.append(seeds[0])
+    return stats
+
+class TournamentStats():
+    '''Aggregate results of many matches. Mergeable across worker processes.'''
+
+    def __init__(self):
+        self.matches = 0
+        self.wins = {}                  # Name : Matches won
+        self.points = {}                # Name : Points won
+        self.turns = 0                  # Total turns over all matches
+        self.minTurns = None
+        self.maxTurns = 0
+        self.profile = None             # MatchProfiler totals when profiling
+        self.stream = None              # StreamingStats when streaming
+
+    def addResult(self, result):
+        name = result['name']
+        self.matches += 1
+        self.wins[name] = self.wins.get(name, 0) + 1
+        self.points[name] = self.points.get(name, 0) + result['points']
+        self.turns += result['turns']
+        if self.minTurns is None or result['turns'] < self.minTurns:
+            self.minTurns = result['turns']
+        if result['turns'] > self.maxTurns:
+            self.maxTurns = result['turns']
+
+    def merge(self, other):
+        self.matches += other.matches
+        for name in other.wins:
+            self.wins[name] = self.wins.get(name, 0) + other.wins[name]
+        for name in other.points:
+            self.points[name] = self.points.get(name, 0) + other.points[name]
+        self.turns += other.turns
+        if other.minTurns is not None:
+            if self.minTurns is None or other.minTurns < self.minTurns:
+                self.minTurns = other.minTurns
+        self.maxTurns = max(self.maxTurns, other.maxTurns)
+        if other.profile is not None:
+            if self.profile is None:
+                self.profile = MatchProfiler()
+            self.profile.merge(other.profile)
+        if other.stream is not None:
+            if self.stream is None:
+                self.stream = StreamingStats()
+            self.stream.merge(other.stream)
+        return self
+
+    def getWinRate(self, name):
+        if self.matches == 0:
+            return 0.0
+        return self.wins.get(name, 0) / self.matches
+
+    def getMeanTurns(self):
+        if self.matches == 0:
+            return 0.0
+        return self.turns / self.matches
+
+    def asDict(self):
+        return {'matches':self.matches, 'wins':dict(self.wins), 'points':dict(self.points),
+                'meanTurns':self.getMeanTurns(), 'minTurns':self.minTurns, 'maxTurns':self.maxTurns}
+
+    def __str__(self):
+        output = '{} matches, {:.1f} turns/match (min {}, max {})\n'.format(self.matches, self.getMeanTurns(), self.minTurns, self.maxTurns)
+        for name in sorted(self.wins, key=self.wins.get, reverse=True):
+            output += '  {:<11} {:>7} wins  {:6.2%}  {:>9} points\n'.format(name, self.wins[name], self.getWinRate(name), self.points[name])
+        return output
+
+class Tournament():
+    ''''numMatches' (int) : matches to play
+       'numPlayers' (int) : ComputerPlayers per match (2-16)
+       'workers' (int) : worker processes, defaults to os.cpu_count()
+       'seed' (int) : base seed, match i is seeded with seed+i
+       'chunkSize' (int) : matches per task sent to a worker
+       'profile' (bool) : time each match's phases into stats.profile (see MatchProfiler)
+       'stream' (bool) : fold each match into stats.stream (see StreamingStats)'''
+
+    def __init__(self, numMatches, numPlayers=4, workers=None, seed=0, chunkSize=250, profile=False, stream=False):
+        self.numMatches = numMatches
+        self.numPlayers = numPlayers
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.chunkSize = max(1, chunkSize)
+        self.profile = profile
+        self.stream = stream
+        self.stats = TournamentStats()
+        if stream:
+            self.stats.stream = StreamingStats()
+            self.stats.stream.settings = self.getSettings()
+        self.resumed = False            # 'stats' then only covers this session, 'stats.stream' the whole tournament
+
+    def getSettings(self):
+        '''Returns what decides which matches a chunk holds, recorded in the stream snapshot.'''
+        return {'seed':self.seed, 'chunkSize':self.chunkSize, 'numPlayers':self.numPlayers}
+
+    def resume(self, stream):
+        '''Continues from a StreamingStats snapshot of this tournament, skipping the chunks it
+        already holds. Raises ValueError if the snapshot was written with other settings.'''
+        settings = self.getSettings()
+        if stream.settings != settings:
+            raise ValueError('Snapshot was written with {}, not {}'.format(stream.settings or 'unknown settings', settings))
+        self.stream = True
+        self.stats.stream = stream
+        self.resumed = True
+
+    def getChunks(self):
+        done = set(self.stats.stream.batches) if self.stats.stream is not None else ()
+        seeds = range(self.seed, self.seed+self.numMatches)
+        for i in range(0, self.numMatches, self.chunkSize):
+            if seeds[i] not in done:
+                yield seeds[i:i+self.chunkSize]
+
+    def run(self, callback=None):
+        '''Plays every match and returns the merged TournamentStats.
+        'callback' is called with the running stats as each chunk streams back.'''
+        if self.workers == 1:
+            for chunk in self.getChunks():
+                self.stats.merge(playBatch(chunk, self.numPlayers, self.profile, self.stream))
+                if callback is not None:
+                    callback(self.stats)
+            return self.stats
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(playBatch, chunk, self.numPlayers, self.profile, self.stream) for chunk in self.getChunks()]
+            for future in as_completed(futures):
+                self.stats.merge(future.result())
+                if callback is not None:
+                    callback(self.stats)
+        return self.stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless ComputerPlayer self-play tournament.')
+    parser.add_argument('-n', '--matches', type=int, default=10000)
+    parser.add_argument('-p', '--players', type=int, default=4, choices=range(2, GameSettings.maxPlayers+1), metavar='{2-16}')
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-c', '--chunk', type=int, default=250)
+    parser.add_argument('--profile', help='time match phases, .json for the totals, any other name for collapsed stacks')
+    parser.add_argument('--stats', help='stream match statistics into this JSON snapshot (see stats.py)')
+    parser.add_argument('--interval', type=float, default=30.0, help='seconds between --stats snapshots')
+    parser.add_argument('--resume', action='store_true', help='continue from the --stats snapshot, skipping finished chunks')
+    args = parser.parse_args(argv)
+
+    tournament = Tournament(args.matches, args.players, args.workers, args.seed, args.chunk, args.profile is not None, args.stats is not None)
+    if args.resume and args.stats and os.path.exists(args.stats):
+        try:
+            tournament.resume(StreamingStats.load(args.stats))
+        except ValueError as error:
+            parser.error('cannot resume: {}'.format(error))
+    lastSnapshot = [time.monotonic()]
+
+    def snapshot(stats):
+        if args.stats and time.monotonic() - lastSnapshot[0] >= args.interval:
+            stats.stream.save(args.stats)
+            lastSnapshot[0] = time.monotonic()
+
+    start = time.perf_counter()
+    stats = tournament.run(snapshot)
+    elapsed = time.perf_counter() - start
+    if tournament.resumed:
+        sys.stdout.write('This session only, the statistics below cover the whole tournament:\n')
+    sys.stdout.write(str(stats))
+    sys.stdout.write('{:.0f} matches/s on {} workers\n'.format(stats.matches/elapsed if elapsed else 0, tournament.workers))
+    if stats.profile is not None:
+        stats.profile.save(args.profile)
+        sys.stdout.write(str(stats.profile))
+    if stats.stream is not None:
+        stats.stream.save(args.stats)
+        sys.stdout.write(str(stats.stream))
+
+if __name__ == '__main__':
+    main()